@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import UserToken, Video, Tag, VideoTag
+from django.http import StreamingHttpResponse
+from .models import UserToken, Video, Tag, VideoTag, SyncState, SyncDeadLetter, Channel
+from .exports import export_rows, csv_lines
 
 @admin.register(UserToken)
 class UserTokenAdmin(admin.ModelAdmin):
@@ -10,9 +12,19 @@ class UserTokenAdmin(admin.ModelAdmin):
 @admin.register(Video)
 class VideoAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'video_id', 'published_at', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('title', 'video_id', 'user__username')
     list_filter = ('created_at', 'published_at')
     readonly_fields = ('created_at', 'updated_at')
+    # Skip the unfiltered COUNT(*) over every user's videos on each changelist page
+    show_full_result_count = False
+    actions = ['export_csv']
+
+    @admin.action(description="Export selected videos as CSV")
+    def export_csv(self, request, queryset):
+        response = StreamingHttpResponse(csv_lines(export_rows(videos=queryset)), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="videos.csv"'
+        return response
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -25,3 +37,25 @@ class VideoTagAdmin(admin.ModelAdmin):
     list_display = ('video', 'tag', 'created_at')
     search_fields = ('video__title', 'tag__name', 'video__user__username')
     list_filter = ('created_at',)
+
+
+@admin.register(SyncState)
+class SyncStateAdmin(admin.ModelAdmin):
+    list_display = ('user', 'source', 'last_finished_at', 'last_success', 'consecutive_failures', 'next_sync_at')
+    search_fields = ('user__username',)
+    list_filter = ('source', 'last_success')
+
+
+@admin.register(SyncDeadLetter)
+class SyncDeadLetterAdmin(admin.ModelAdmin):
+    list_display = ('video_id', 'user', 'source', 'attempts', 'error', 'last_attempt_at')
+    search_fields = ('video_id', 'user__username')
+    list_filter = ('source',)
+    list_select_related = ('user',)
+
+
+@admin.register(Channel)
+class ChannelAdmin(admin.ModelAdmin):
+    list_display = ('title', 'user', 'video_count', 'liked_count', 'saved_count', 'tagged_count', 'updated_at')
+    search_fields = ('title', 'channel_id', 'user__username')
+    list_select_related = ('user',)
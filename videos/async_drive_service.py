@@ -0,0 +1,256 @@
+import json
+import logging
+import datetime
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from .models import UserToken, Tag, VideoTag, Video
+from .drive_service import GoogleDriveService
+from .counters import refresh_tag_counts, refresh_channel_counts, bump_library_version
+from .async_youtube_api import get_async_client
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGoogleDriveService:
+    """Async counterpart of GoogleDriveService for use from ASGI views"""
+
+    DRIVE_API_BASE_URL = GoogleDriveService.DRIVE_API_BASE_URL
+    UPLOAD_API_URL = GoogleDriveService.UPLOAD_API_URL
+    APP_FOLDER_NAME = GoogleDriveService.APP_FOLDER_NAME
+    TAGS_FILE_NAME = GoogleDriveService.TAGS_FILE_NAME
+
+    def __init__(self, user, user_token, client=None):
+        """Initialize with user and token; use for_user() to look the token up"""
+        self.user = user
+        self.user_token = user_token
+        self.client = client or get_async_client()
+
+    @classmethod
+    async def for_user(cls, user, client=None):
+        """Build an instance for a user, loading their token with the async ORM"""
+        try:
+            user_token = await UserToken.objects.aget(user=user)
+        except UserToken.DoesNotExist:
+            user_token = None
+        return cls(user, user_token, client=client)
+
+    def _auth_headers(self, content_type=None):
+        headers = {"Authorization": f"Bearer {self.user_token.access_token}"}
+        if content_type:
+            headers["Content-Type"] = content_type
+        return headers
+
+    async def ensure_valid_token(self):
+        """Ensure the access token is valid, refreshing if needed"""
+        if not self.user_token:
+            logger.error("No user token available")
+            return False
+
+        # Check if token is expired or will expire in the next 5 minutes
+        if self.user_token.expires_at <= timezone.now() + datetime.timedelta(minutes=5):
+            return await self._refresh_access_token()
+
+        return True
+
+    async def _refresh_access_token(self):
+        """Refresh the access token using the refresh token"""
+        if not self.user_token or not self.user_token.refresh_token:
+            logger.error("No refresh token available")
+            return False
+
+        payload = {
+            'client_id': settings.GOOGLE_CLIENT_ID,
+            'client_secret': settings.GOOGLE_CLIENT_SECRET,
+            'refresh_token': self.user_token.refresh_token,
+            'grant_type': 'refresh_token'
+        }
+
+        response = await self.client.post("https://oauth2.googleapis.com/token", data=payload)
+
+        if response.status_code != 200:
+            logger.error(f"Token refresh failed: {response.text}")
+            return False
+
+        token_data = response.json()
+
+        # Update the stored tokens
+        self.user_token.access_token = token_data['access_token']
+        expires_in = token_data.get('expires_in', 3600)  # Default to 1 hour
+        self.user_token.expires_at = timezone.now() + datetime.timedelta(seconds=expires_in)
+        await self.user_token.asave()
+
+        return True
+
+    async def _find_file(self, query):
+        """Return the ID of the first Drive file matching query, or None"""
+        response = await self.client.get(
+            f"{self.DRIVE_API_BASE_URL}/files",
+            params={"q": query, "fields": "files(id, name)"},
+            headers=self._auth_headers()
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Failed to search Drive: {response.text}")
+            return None
+
+        files = response.json().get("files", [])
+        return files[0]["id"] if files else None
+
+    async def _get_app_folder(self):
+        """Get or create the app folder in Drive"""
+        if not await self.ensure_valid_token():
+            return None
+
+        folder_id = await self._find_file(
+            f"name='{self.APP_FOLDER_NAME}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        )
+        if folder_id:
+            return folder_id
+
+        response = await self.client.post(
+            f"{self.DRIVE_API_BASE_URL}/files",
+            headers=self._auth_headers("application/json"),
+            json={"name": self.APP_FOLDER_NAME, "mimeType": "application/vnd.google-apps.folder"}
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Failed to create app folder: {response.text}")
+            return None
+
+        return response.json().get("id")
+
+    async def _get_tags_file(self, folder_id):
+        """Get the tags file if it exists"""
+        if not folder_id:
+            return None
+        return await self._find_file(
+            f"name='{self.TAGS_FILE_NAME}' and '{folder_id}' in parents and trashed=false"
+        )
+
+    async def _build_export(self):
+        """Collect the user's tags and tagged videos in two queries: the tags, then their video links"""
+        tags_data = {}
+        async for tag in Tag.objects.filter(user=self.user):
+            tags_data[tag.name] = {
+                "id": tag.id,
+                "created_at": tag.created_at.isoformat() if tag.created_at else None,
+                "videos": []
+            }
+
+        video_tags = VideoTag.objects.filter(tag__user=self.user).select_related('video', 'tag')
+        async for video_tag in video_tags:
+            video = video_tag.video
+            tags_data[video_tag.tag.name]["videos"].append({
+                "video_id": video.video_id,
+                "title": video.title,
+                "thumbnail_url": video.thumbnail_url,
+                "custom_description": video.custom_description,
+                "added_at": video_tag.created_at.isoformat() if video_tag.created_at else None
+            })
+
+        return {
+            "user": self.user.username,
+            "exported_at": timezone.now().isoformat(),
+            "tags": tags_data
+        }
+
+    async def save_tags_to_drive(self):
+        """Save user's tags and video tags to Google Drive"""
+        logger.info(f"Saving tags to Drive for user: {self.user.username}")
+
+        folder_id = await self._get_app_folder()
+        if not folder_id:
+            logger.error("Failed to get or create app folder")
+            return False
+
+        json_data = json.dumps(await self._build_export(), indent=2)
+
+        file_id = await self._get_tags_file(folder_id)
+
+        if not file_id:
+            # Create the file metadata first, then upload content below
+            response = await self.client.post(
+                f"{self.DRIVE_API_BASE_URL}/files",
+                headers=self._auth_headers("application/json"),
+                json={"name": self.TAGS_FILE_NAME, "parents": [folder_id], "mimeType": "application/json"}
+            )
+            if response.status_code != 200:
+                logger.error(f"Failed to create tags file metadata: {response.text}")
+                return False
+            file_id = response.json().get("id")
+
+        response = await self.client.patch(
+            f"{self.UPLOAD_API_URL}/{file_id}?uploadType=media",
+            headers=self._auth_headers("application/json"),
+            content=json_data
+        )
+
+        if response.status_code not in (200, 204):
+            logger.error(f"Failed to upload tags file: {response.text}")
+            return False
+
+        logger.info(f"Saved tags file in Drive for user: {self.user.username}")
+        return True
+
+    async def load_tags_from_drive(self):
+        """Load user's tags from Google Drive and restore them"""
+        logger.info(f"Loading tags from Drive for user: {self.user.username}")
+
+        folder_id = await self._get_app_folder()
+        if not folder_id:
+            logger.error("Failed to get app folder")
+            return False
+
+        file_id = await self._get_tags_file(folder_id)
+        if not file_id:
+            logger.info("No tags file found in Drive")
+            return False
+
+        if not await self.ensure_valid_token():
+            return False
+
+        response = await self.client.get(
+            f"{self.DRIVE_API_BASE_URL}/files/{file_id}?alt=media",
+            headers=self._auth_headers()
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Failed to download tags file: {response.text}")
+            return False
+
+        try:
+            tags_data = response.json()
+
+            imported_count = 0
+            for tag_name, tag_info in tags_data.get("tags", {}).items():
+                tag, created = await Tag.objects.aget_or_create(
+                    user=self.user,
+                    name=tag_name
+                )
+
+                for video_data in tag_info.get("videos", []):
+                    try:
+                        video = await Video.objects.aget(user=self.user, video_id=video_data.get("video_id"))
+                    except Video.DoesNotExist:
+                        # We don't have this video yet, it might be synced later
+                        continue
+
+                    await VideoTag.objects.aget_or_create(video=video, tag=tag)
+
+                    custom_description = video_data.get("custom_description")
+                    if custom_description and not video.custom_description:
+                        video.custom_description = custom_description
+                        await video.asave(update_fields=["custom_description"])
+
+                    imported_count += 1
+
+            await sync_to_async(refresh_tag_counts)(user_id=self.user.id)
+            await sync_to_async(refresh_channel_counts)(self.user.id)
+            await sync_to_async(bump_library_version)(self.user.id)
+            logger.info(f"Imported {imported_count} tag-video relationships from Drive")
+            return True
+
+        except Exception as e:
+            logger.exception(f"Error parsing tags data: {str(e)}")
+            return False
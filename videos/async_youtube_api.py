@@ -0,0 +1,397 @@
+import asyncio
+import datetime
+import logging
+import weakref
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from .models import UserToken, Video, Playlist
+from .counters import refresh_playlist_counts, refresh_library_stats, bump_library_version, sync_channels
+from .recent import push_recent, RECENT
+from .sync_state import record_sync_started, record_sync_finished
+from .sync_checkpoint import record_dead_letter
+from .sync_archive import archiving_enabled, archive_response
+from .library_gc import remove_missing_playlists, unlink_playlist_videos
+from .shared_cache import is_shareable, response_key, ashared_get
+from .youtube_api import YouTubeAPI, video_defaults_from_snippet
+
+logger = logging.getLogger(__name__)
+
+# One pooled HTTP/2 client per event loop, so every sync running in a worker
+# shares the same connections to googleapis.com
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """
+    Return the shared httpx.AsyncClient for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+        _clients[loop] = client
+    return client
+
+
+class AsyncYouTubeAPI:
+    """
+    Async counterpart of YouTubeAPI for use from ASGI views
+    """
+    API_BASE_URL = 'https://www.googleapis.com/youtube/v3'
+    TOKEN_URL = YouTubeAPI.TOKEN_URL
+    WATCH_LATER_PLAYLIST_ID = YouTubeAPI.WATCH_LATER_PLAYLIST_ID
+    MAX_CONCURRENT_REQUESTS = 8
+
+    def __init__(self, user_token, client=None):
+        """
+        Initialize with a user_token; use AsyncYouTubeAPI.for_user() to look one up
+        """
+        self.user_token = user_token
+        self.client = client or get_async_client()
+        self.client_id = settings.GOOGLE_CLIENT_ID
+        self.client_secret = settings.GOOGLE_CLIENT_SECRET
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        self.channel_titles = {}
+        # Videos new to the library this sync, in the order the API listed them
+        self.added_video_ids = []
+
+    @classmethod
+    async def for_user(cls, user, client=None):
+        """
+        Build an instance for a user, loading their token with the async ORM
+        """
+        try:
+            user_token = await UserToken.objects.aget(user=user)
+        except UserToken.DoesNotExist:
+            user_token = None
+        return cls(user_token, client=client)
+
+    async def refresh_access_token(self):
+        """
+        Refresh the access token using the refresh token
+        """
+        if not self.user_token or not self.user_token.refresh_token:
+            logger.error("No refresh token available")
+            return False
+
+        payload = {
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'refresh_token': self.user_token.refresh_token,
+            'grant_type': 'refresh_token'
+        }
+
+        response = await self.client.post(self.TOKEN_URL, data=payload)
+
+        if response.status_code != 200:
+            logger.error(f"Token refresh failed: {response.text}")
+            return False
+
+        token_data = response.json()
+
+        # Update the stored tokens
+        self.user_token.access_token = token_data['access_token']
+        expires_in = token_data.get('expires_in', 3600)  # Default to 1 hour
+        self.user_token.expires_at = timezone.now() + datetime.timedelta(seconds=expires_in)
+        await self.user_token.asave()
+
+        return True
+
+    async def ensure_valid_token(self):
+        """
+        Ensure the access token is valid, refreshing if needed
+        """
+        if not self.user_token:
+            logger.error("No user token available")
+            return False
+
+        # Check if token is expired or will expire in the next 5 minutes
+        if self.user_token.expires_at <= timezone.now() + datetime.timedelta(minutes=5):
+            return await self.refresh_access_token()
+
+        return True
+
+    async def _get(self, endpoint, params, public=False):
+        """
+        GET a YouTube API endpoint, bounded by the per-sync concurrency limit
+
+        Public resources are shared between users and successful pages
+        archived, like the sync client's.
+        """
+        headers = {'Authorization': f'Bearer {self.user_token.access_token}'}
+
+        async def fetch():
+            async with self._semaphore:
+                return await self.client.get(f"{self.API_BASE_URL}/{endpoint}", params=params, headers=headers)
+
+        if is_shareable(endpoint, params, public):
+            response = await ashared_get(response_key(endpoint, params), fetch)
+        else:
+            response = await fetch()
+        if response.status_code == 200 and archiving_enabled():
+            await sync_to_async(archive_response, thread_sensitive=False)(
+                self.user_token.user_id, f"{self.API_BASE_URL}/{endpoint}", params, response.content
+            )
+        return response
+
+    async def _fetch_all_pages(self, endpoint, params, label, forbidden_ok=False, public=False):
+        """
+        Fetch every page of a list endpoint
+
+        Returns None if any page fails (or [] for a 403 on the first page
+        when forbidden_ok): a partial list would clear the liked and saved
+        flags of every video on the missing pages.
+        """
+        params = dict(params, maxResults=50)
+        all_items = []
+        page_count = 0
+
+        while True:
+            page_count += 1
+            response = await self._get(endpoint, params, public)
+
+            if response.status_code == 403 and forbidden_ok and page_count == 1:
+                logger.warning(f"Access to {label} is forbidden")
+                return []
+
+            if response.status_code != 200:
+                logger.error(f"Failed to fetch page {page_count} of {label}: {response.text}")
+                return None
+
+            data = response.json()
+            all_items.extend(data.get('items', []))
+
+            next_page_token = data.get('nextPageToken')
+            if not next_page_token:
+                break
+            params['pageToken'] = next_page_token
+
+        logger.info(f"Fetched {len(all_items)} {label} in {page_count} page(s)")
+        return all_items
+
+    async def sync_videos_for_user(self):
+        """
+        Sync the user's playlists, liked videos and Watch Later concurrently
+        """
+        if not self.user_token:
+            logger.error("No user token available")
+            return False
+
+        if not await self.ensure_valid_token():
+            logger.error("Failed to ensure valid token")
+            return False
+
+        logger.info(f"Starting async video sync for user id: {self.user_token.user_id}")
+
+        await asyncio.gather(
+            self.sync_source('playlists'),
+            self.sync_source('liked'),
+            self.sync_source('saved'),
+        )
+
+        return True
+
+    async def sync_source(self, source):
+        """Sync one source and record the outcome, like YouTubeAPI.sync_source"""
+        if not self.user_token:
+            logger.error("No user token available")
+            return False
+
+        sync_methods = {
+            'playlists': self.sync_user_playlists,
+            'liked': self._sync_liked_videos,
+            'saved': self._sync_watch_later_videos,
+        }
+        user_id = self.user_token.user_id
+        await sync_to_async(record_sync_started)(user_id, source)
+        success = False
+        try:
+            success = await self.ensure_valid_token() and bool(await sync_methods[source]())
+            if success:
+                await sync_to_async(sync_channels)(user_id, self.channel_titles)
+                # Sources run concurrently, so take only what's been added so far
+                added, self.added_video_ids = self.added_video_ids, []
+                await sync_to_async(push_recent)(user_id, RECENT, reversed(added))
+        finally:
+            await sync_to_async(record_sync_finished)(user_id, source, success)
+        return success
+
+    async def sync_user_playlists(self):
+        """Fetch and sync the user's playlists, then their items in parallel"""
+        if not await self.ensure_valid_token():
+            logger.error("Failed to ensure valid token")
+            return False
+
+        try:
+            all_playlists = await self._fetch_all_pages(
+                'playlists', {'part': 'snippet,contentDetails,status', 'mine': 'true'}, 'playlists'
+            )
+            if all_playlists is None:
+                return False
+
+            to_sync = []
+            for playlist_data in all_playlists:
+                playlist_id = playlist_data.get('id')
+                snippet = playlist_data.get('snippet', {})
+                content_details = playlist_data.get('contentDetails', {})
+
+                # Make sure to handle system playlists with user-friendly names
+                if playlist_id == 'WL':
+                    snippet['title'] = 'Watch Later'
+                elif playlist_id == 'LL':
+                    snippet['title'] = 'Liked Videos'
+
+                await Playlist.objects.aupdate_or_create(
+                    user_id=self.user_token.user_id,
+                    playlist_id=playlist_id,
+                    defaults={
+                        'title': snippet.get('title', 'Untitled Playlist'),
+                        'description': snippet.get('description', ''),
+                        'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
+                        'item_count': content_details.get('itemCount', 0),
+                        'youtube_channel_id': snippet.get('channelId', '')
+                    }
+                )
+                public = playlist_data.get('status', {}).get('privacyStatus') == 'public'
+                to_sync.append(self._sync_playlist_videos(playlist_id, snippet.get('title'), public))
+
+            synced = await asyncio.gather(*to_sync)
+            await sync_to_async(remove_missing_playlists)(
+                self.user_token.user_id, [playlist.get('id') for playlist in all_playlists]
+            )
+            await sync_to_async(refresh_playlist_counts)(self.user_token.user_id)
+            await sync_to_async(bump_library_version)(self.user_token.user_id)
+
+            if not all(synced):
+                logger.error(f"{synced.count(False)} of {len(all_playlists)} playlists failed to sync")
+                return False
+            logger.info(f"Successfully synced {len(all_playlists)} playlists")
+            return True
+
+        except Exception as e:
+            logger.exception(f"Error syncing playlists: {str(e)}")
+            return False
+
+    async def _sync_playlist_videos(self, playlist_id, playlist_name, public=False):
+        """Sync videos from a specific playlist"""
+        try:
+            items = await self._fetch_all_pages(
+                'playlistItems',
+                {'part': 'snippet,contentDetails', 'playlistId': playlist_id},
+                f"items of playlist {playlist_id}",
+                public=public
+            )
+            if items is None:
+                return False
+
+            listed = set()
+            for item in items:
+                snippet = item.get('snippet', {})
+                video_id = snippet.get('resourceId', {}).get('videoId')
+                if not video_id:
+                    continue
+                listed.add(video_id)
+                await self._save_video('playlists', video_id, snippet, {
+                    'playlist_id': playlist_id,
+                    'playlist_name': playlist_name
+                })
+
+            # Videos removed from the playlist on YouTube
+            await sync_to_async(unlink_playlist_videos)(self.user_token.user_id, playlist_id, listed)
+            return True
+
+        except Exception as e:
+            logger.exception(f"Exception while fetching playlist videos: {str(e)}")
+            return False
+
+    async def _sync_liked_videos(self):
+        """Sync liked videos and clear the flag on videos no longer liked"""
+        try:
+            items = await self._fetch_all_pages(
+                'videos', {'part': 'snippet,contentDetails', 'myRating': 'like'}, 'liked videos'
+            )
+            if items is None:
+                return False
+
+            currently_liked = set()
+            for item in items:
+                video_id = item.get('id')
+                if not video_id:
+                    continue
+                currently_liked.add(video_id)
+                await self._save_video('liked', video_id, item.get('snippet', {}), {'is_liked': True})
+
+            await Video.objects.filter(
+                user_id=self.user_token.user_id,
+                is_liked=True
+            ).exclude(video_id__in=currently_liked).aupdate(is_liked=False)
+            await sync_to_async(refresh_library_stats)(self.user_token.user_id)
+            await sync_to_async(bump_library_version)(self.user_token.user_id)
+
+            return True
+
+        except Exception as e:
+            logger.exception(f"Exception while fetching liked videos: {str(e)}")
+            return False
+
+    async def _sync_watch_later_videos(self):
+        """Sync Watch Later and clear the saved flag on removed videos"""
+        try:
+            # The API often forbids Watch Later access; treat that as empty
+            # like the sync client does
+            items = await self._fetch_all_pages(
+                'playlistItems',
+                {'part': 'snippet,contentDetails', 'playlistId': self.WATCH_LATER_PLAYLIST_ID},
+                'Watch Later videos',
+                forbidden_ok=True
+            )
+            if items is None:
+                return False
+
+            current_saved = set()
+            for item in items:
+                snippet = item.get('snippet', {})
+                video_id = snippet.get('resourceId', {}).get('videoId')
+                if not video_id:
+                    continue
+                current_saved.add(video_id)
+                await self._save_video('saved', video_id, snippet, {
+                    'is_saved': True,
+                    'playlist_id': self.WATCH_LATER_PLAYLIST_ID,
+                    'playlist_name': 'Watch Later'
+                })
+
+            await Video.objects.filter(
+                user_id=self.user_token.user_id,
+                is_saved=True
+            ).exclude(video_id__in=current_saved).aupdate(is_saved=False)
+            await sync_to_async(refresh_library_stats)(self.user_token.user_id)
+            await sync_to_async(bump_library_version)(self.user_token.user_id)
+
+            return True
+
+        except Exception as e:
+            logger.exception(f"Exception while syncing Watch Later videos: {str(e)}")
+            return False
+
+    async def _save_video(self, source, video_id, snippet, extra_defaults):
+        """Create or update one video row, dead-lettering items that fail"""
+        try:
+            defaults = video_defaults_from_snippet(snippet)
+            video, created = await Video.objects.aupdate_or_create(
+                user_id=self.user_token.user_id,
+                video_id=video_id,
+                defaults={**defaults, **extra_defaults}
+            )
+            self.channel_titles[defaults['channel_id']] = defaults['channel_title']
+            if created:
+                self.added_video_ids.append(video.id)
+        except Exception as e:
+            logger.error(f"Error processing video {video_id}: {str(e)}")
+            await sync_to_async(record_dead_letter)(self.user_token.user_id, source, video_id, snippet, extra_defaults, e)
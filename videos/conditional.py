@@ -0,0 +1,75 @@
+import hashlib
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .models import UserLibraryStats
+
+
+def user_library_version(user):
+    """
+    The user's library version, read through user.library_stats
+
+    The stats row is cached on the user object, so pages that also render
+    the sidebar counters pay for it once.
+    """
+    try:
+        return user.library_stats.version
+    except UserLibraryStats.DoesNotExist:
+        return 0
+
+
+def user_similarity_version(user):
+    """The user's similarity index version, read through user.library_stats like the library version"""
+    try:
+        return user.library_stats.similarity_version
+    except UserLibraryStats.DoesNotExist:
+        return 0
+
+
+def _versions_etag(request, fields):
+    user = request.user
+    if not user.is_authenticated:
+        return None
+
+    versions = UserLibraryStats.objects.filter(user=user).values_list(*fields).first() or (0,) * len(fields)
+    key = ':'.join([
+        str(user.id),
+        *(str(version) for version in versions),
+        request.get_full_path(),
+        request.META.get('CSRF_COOKIE', ''),
+        settings.RELEASE_VERSION,
+    ])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def library_etag(request, *args, **kwargs):
+    """
+    Cheap per-user validator for pages and API lists built from the library
+
+    Combines the user's library and watch versions (bumped by every write path) with the
+    request path and query, the CSRF secret embedded in rendered forms, and
+    the deployed release, so one indexed lookup decides whether the client's
+    copy is still current.
+    """
+    return _versions_etag(request, ('version', 'watch_version'))
+
+
+def similarity_etag(request, *args, **kwargs):
+    """library_etag that also changes with the similarity version, for responses built from the index"""
+    return _versions_etag(request, ('version', 'watch_version', 'similarity_version'))
+
+
+def library_conditional(view_func):
+    """Answer If-None-Match with 304 before running the view; clients must revalidate"""
+    return cache_control(private=True, no_cache=True)(condition(etag_func=library_etag)(view_func))
+
+
+def similarity_conditional(view_func):
+    """library_conditional for views that read the similarity index"""
+    return cache_control(private=True, no_cache=True)(condition(etag_func=similarity_etag)(view_func))
+
+
+# For DRF viewset methods
+library_conditional_method = method_decorator(library_conditional)
+similarity_conditional_method = method_decorator(similarity_conditional)
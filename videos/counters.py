@@ -0,0 +1,161 @@
+import logging
+from django.db.models import Count, F, Max, OuterRef, Subquery, Q
+from django.db.models.functions import Coalesce
+from .models import Video, Tag, VideoTag, Playlist, UserLibraryStats, Channel
+
+logger = logging.getLogger(__name__)
+
+# Denormalized counters read by the sidebar and dashboard shelves. Each
+# refresh recomputes the affected counts with a single UPDATE, so callers can
+# run them inside the same transaction as the writes that changed them.
+
+
+def _count_subquery(queryset, group_field):
+    """Correlated COUNT(*) subquery over queryset grouped by group_field"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(group_field).annotate(c=Count('*')).values('c')[:1]
+        ),
+        0
+    )
+
+
+def refresh_tag_counts(tag_ids=None, user_id=None):
+    """Recompute Tag.video_count for the given tags, or all of a user's tags"""
+    tags = Tag.objects.all()
+    if tag_ids is not None:
+        tags = tags.filter(id__in=tag_ids)
+    if user_id is not None:
+        tags = tags.filter(user_id=user_id)
+
+    return tags.update(
+        video_count=_count_subquery(VideoTag.objects.filter(tag_id=OuterRef('pk')), 'tag_id')
+    )
+
+
+def refresh_playlist_counts(user_id):
+    """Recompute Playlist.video_count from the user's local Video rows"""
+    videos = Video.objects.filter(user_id=user_id, playlist_id=OuterRef('playlist_id'))
+    return Playlist.objects.filter(user_id=user_id).update(
+        video_count=_count_subquery(videos, 'playlist_id')
+    )
+
+
+def refresh_library_stats(user_id):
+    """Recompute the user's liked and saved totals"""
+    totals = Video.objects.filter(user_id=user_id).aggregate(
+        liked_count=Count('id', filter=Q(is_liked=True)),
+        saved_count=Count('id', filter=Q(is_saved=True)),
+    )
+    stats, _ = UserLibraryStats.objects.update_or_create(user_id=user_id, defaults=totals)
+    return stats
+
+
+def upsert_channels(user_id, titles):
+    """Create or rename the user's channels from {channel_id: title} in one statement"""
+    titles = {channel_id: title for channel_id, title in titles.items() if channel_id}
+    Channel.objects.bulk_create(
+        [Channel(user_id=user_id, channel_id=channel_id, title=title or 'Unknown Channel')
+         for channel_id, title in titles.items()],
+        update_conflicts=True,
+        unique_fields=['user', 'channel_id'],
+        update_fields=['title', 'updated_at']
+    )
+
+
+def refresh_channel_counts(user_id, channel_ids=None):
+    """Recompute the video, liked, saved and tagged counts of the user's channels"""
+    channels = Channel.objects.filter(user_id=user_id)
+    if channel_ids is not None:
+        channels = channels.filter(channel_id__in=channel_ids)
+
+    videos = Video.objects.filter(user_id=user_id, channel_id=OuterRef('channel_id'))
+    tagged = VideoTag.objects.filter(
+        video__user_id=user_id, video__channel_id=OuterRef('channel_id')
+    ).order_by().values('video__channel_id').annotate(c=Count('video_id', distinct=True)).values('c')[:1]
+
+    return channels.update(
+        video_count=_count_subquery(videos, 'channel_id'),
+        liked_count=_count_subquery(videos.filter(is_liked=True), 'channel_id'),
+        saved_count=_count_subquery(videos.filter(is_saved=True), 'channel_id'),
+        tagged_count=Coalesce(Subquery(tagged), 0),
+    )
+
+
+def refresh_video_channel_counts(user_id, video_ids):
+    """Recompute counts for just the channels of the given videos, e.g. after tagging them"""
+    channel_ids = Video.objects.filter(user_id=user_id, id__in=video_ids).values('channel_id')
+    return refresh_channel_counts(user_id, channel_ids)
+
+
+def sync_channels(user_id, titles):
+    """Record the channels seen during a sync and refresh every channel's counts"""
+    upsert_channels(user_id, titles)
+    refresh_channel_counts(user_id)
+
+
+def rebuild_channels(user_id):
+    """
+    Rebuild the user's channels from their videos, dropping channels with no videos left
+
+    Existing channels keep their title; only syncs, which see the current
+    name, rename a channel.
+    """
+    titles = dict(
+        Video.objects.filter(user_id=user_id).exclude(channel_id__isnull=True).exclude(channel_id='')
+        .order_by().values('channel_id').annotate(title=Max('channel_title')).values_list('channel_id', 'title')
+    )
+    Channel.objects.bulk_create(
+        [Channel(user_id=user_id, channel_id=channel_id, title=title or 'Unknown Channel')
+         for channel_id, title in titles.items()],
+        ignore_conflicts=True
+    )
+    Channel.objects.filter(user_id=user_id).exclude(channel_id__in=titles).delete()
+    refresh_channel_counts(user_id)
+
+
+def bump_library_version(user_id):
+    """
+    Mark the user's library as changed
+
+    Every write path that changes what the user's pages or API lists show
+    calls this; conditional.py derives ETags from the version.
+    """
+    if not UserLibraryStats.objects.filter(user_id=user_id).update(version=F('version') + 1):
+        UserLibraryStats.objects.get_or_create(user_id=user_id, defaults={'version': 1})
+
+
+def bump_watch_versions(user_ids):
+    """
+    Mark the users' watch shelves as changed
+
+    Kept apart from the library version so a watched video refreshes page
+    ETags without invalidating the tag, query and similarity indexes.
+    """
+    user_ids = set(user_ids)
+    if UserLibraryStats.objects.filter(user_id__in=user_ids).update(watch_version=F('watch_version') + 1) < len(user_ids):
+        existing = set(UserLibraryStats.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        for user_id in user_ids - existing:
+            UserLibraryStats.objects.get_or_create(user_id=user_id, defaults={'watch_version': 1})
+
+
+def bump_similarity_version(user_id):
+    """
+    Mark the user's similarity index as rebuilt
+
+    Kept apart from the library version so a new build refreshes related
+    videos and tag suggestions without invalidating the sidebar, tag and
+    query indexes or the ETags of every page.
+    """
+    if not UserLibraryStats.objects.filter(user_id=user_id).update(similarity_version=F('similarity_version') + 1):
+        UserLibraryStats.objects.get_or_create(user_id=user_id, defaults={'similarity_version': 1})
+
+
+def reconcile_user_counters(user_id):
+    """Recompute every denormalized counter for a user"""
+    refresh_tag_counts(user_id=user_id)
+    refresh_playlist_counts(user_id)
+    refresh_library_stats(user_id)
+    rebuild_channels(user_id)
+    bump_library_version(user_id)
+    logger.info(f"Reconciled counters for user id {user_id}")
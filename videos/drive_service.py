@@ -4,7 +4,10 @@ import requests
 from django.conf import settings
 from django.utils import timezone
 import datetime
+from django.db import transaction
 from .models import UserToken, Tag, VideoTag, Video
+from .counters import refresh_tag_counts, refresh_channel_counts, bump_library_version
+from .exports import stream_queryset
 
 logger = logging.getLogger(__name__)
 
@@ -153,30 +156,30 @@ class GoogleDriveService:
             logger.error("Failed to get or create app folder")
             return False
         
-        # Collect all user tags and their associated videos
+        # Collect all user tags and their associated videos, streaming the
+        # tag links in chunks rather than loading one query per tag
         tags_data = {}
         
-        user_tags = Tag.objects.filter(user=self.user)
-        for tag in user_tags:
-            video_tags = VideoTag.objects.filter(tag=tag)
-            videos = []
-            
-            for video_tag in video_tags:
-                video = video_tag.video
-                videos.append({
-                    "video_id": video.video_id,
-                    "title": video.title,
-                    "thumbnail_url": video.thumbnail_url,
-                    "custom_description": video.custom_description,
-                    "added_at": video_tag.created_at.isoformat() if video_tag.created_at else None
-                })
-            
-            tags_data[tag.name] = {
-                "id": tag.id,
-                "created_at": tag.created_at.isoformat() if tag.created_at else None,
-                "videos": videos
+        for tag_id, name, created_at in Tag.objects.filter(user=self.user).values_list('id', 'name', 'created_at'):
+            tags_data[name] = {
+                "id": tag_id,
+                "created_at": created_at.isoformat() if created_at else None,
+                "videos": []
             }
         
+        video_tags = VideoTag.objects.filter(tag__user=self.user).order_by('id').values_list(
+            'tag__name', 'video__video_id', 'video__title', 'video__thumbnail_url',
+            'video__custom_description', 'created_at'
+        )
+        for tag_name, video_id, title, thumbnail_url, custom_description, added_at in stream_queryset(video_tags):
+            tags_data[tag_name]["videos"].append({
+                "video_id": video_id,
+                "title": title,
+                "thumbnail_url": thumbnail_url,
+                "custom_description": custom_description,
+                "added_at": added_at.isoformat() if added_at else None
+            })
+        
         # Export data as JSON
         export_data = {
             "user": self.user.username,
@@ -289,40 +292,45 @@ class GoogleDriveService:
             # Parse JSON data
             tags_data = response.json()
             
-            # Import tags
+            # Import tags and refresh tag counters in one transaction
             imported_count = 0
-            for tag_name, tag_info in tags_data.get("tags", {}).items():
-                # Create tag if it doesn't exist
-                tag, created = Tag.objects.get_or_create(
-                    user=self.user,
-                    name=tag_name
-                )
+            with transaction.atomic():
+                for tag_name, tag_info in tags_data.get("tags", {}).items():
+                    # Create tag if it doesn't exist
+                    tag, created = Tag.objects.get_or_create(
+                        user=self.user,
+                        name=tag_name
+                    )
                 
-                # Process videos for this tag
-                for video_data in tag_info.get("videos", []):
-                    video_id = video_data.get("video_id")
+                    # Process videos for this tag
+                    for video_data in tag_info.get("videos", []):
+                        video_id = video_data.get("video_id")
                     
-                    # Check if we have this video
-                    try:
-                        video = Video.objects.get(user=self.user, video_id=video_id)
+                        # Check if we have this video
+                        try:
+                            video = Video.objects.get(user=self.user, video_id=video_id)
                         
-                        # Create video tag relation if it doesn't exist
-                        video_tag, created = VideoTag.objects.get_or_create(
-                            video=video,
-                            tag=tag
-                        )
+                            # Create video tag relation if it doesn't exist
+                            video_tag, created = VideoTag.objects.get_or_create(
+                                video=video,
+                                tag=tag
+                            )
                         
-                        # Update custom description if available
-                        custom_description = video_data.get("custom_description")
-                        if custom_description and not video.custom_description:
-                            video.custom_description = custom_description
-                            video.save(update_fields=["custom_description"])
+                            # Update custom description if available
+                            custom_description = video_data.get("custom_description")
+                            if custom_description and not video.custom_description:
+                                video.custom_description = custom_description
+                                video.save(update_fields=["custom_description"])
                         
-                        imported_count += 1
+                            imported_count += 1
                         
-                    except Video.DoesNotExist:
-                        # We don't have this video yet, it might be synced later
-                        pass
+                        except Video.DoesNotExist:
+                            # We don't have this video yet, it might be synced later
+                            pass
+
+                refresh_tag_counts(user_id=self.user.id)
+                refresh_channel_counts(self.user.id)
+                bump_library_version(self.user.id)
             
             logger.info(f"Imported {imported_count} tag-video relationships from Drive")
             return True
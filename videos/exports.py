@@ -0,0 +1,99 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import Video
+from .tagging import tag_links
+
+# Rows fetched per round trip (and per tag prefetch) when streaming
+EXPORT_CHUNK_SIZE = 500
+
+EXPORT_FIELDS = (
+    'video_id', 'title', 'description', 'youtube_description', 'custom_description', 'thumbnail_url',
+    'channel_title', 'channel_id', 'published_at', 'playlist_id', 'playlist_name',
+    'is_liked', 'is_saved', 'is_history', 'tags',
+)
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def stream_queryset(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterate a queryset in chunks without caching it
+
+    On Postgres this reads through a server-side cursor. Prefetches run
+    once per chunk, so memory use doesn't grow with the number of rows.
+    """
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def export_rows(user_id=None, videos=None):
+    """
+    Yield one dict per video in the user's library (or in the given queryset)
+
+    Videos are read as plain tuples a chunk at a time, with one query per
+    chunk for their tags.
+    """
+    if videos is None:
+        videos = Video.objects.filter(user_id=user_id)
+    columns = tuple(field for field in EXPORT_FIELDS if field != 'tags')
+    videos = videos.select_related(None).order_by('id').values_list('id', *columns)
+
+    for chunk in batched(stream_queryset(videos), EXPORT_CHUNK_SIZE):
+        tags = defaultdict(list)
+        for video_pk, _, tag_name in tag_links([values[0] for values in chunk]):
+            tags[video_pk].append(tag_name)
+
+        for values in chunk:
+            row = dict(zip(columns, values[1:]))
+            row['published_at'] = row['published_at'].isoformat() if row['published_at'] else None
+            row['tags'] = sorted(tags[values[0]])
+            yield row
+
+
+def json_array_lines(items):
+    """Encode an iterable of JSON-serializable items as a streamed JSON array"""
+    yield '['
+    separator = ''
+    for item in items:
+        yield separator + json.dumps(item, cls=DjangoJSONEncoder)
+        separator = ','
+    yield ']'
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo:
+    """File-like object whose write() returns the line, so csv.writer can feed a generator"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            ['|'.join(row[field]) if field == 'tags' else row[field] for field in EXPORT_FIELDS]
+        )
+
+
+EXPORT_WRITERS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+}
@@ -0,0 +1,126 @@
+import datetime
+import logging
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from .models import Playlist, Video, VideoTag, Tag, WatchEvent, WatchRollup
+from .counters import reconcile_user_counters
+from .tagging import VideoTagsThrough
+
+logger = logging.getLogger(__name__)
+
+GC_BATCH_SIZE = 500
+
+# Videos changed more recently than this are never collected, so a sync that's
+# still setting a video's flags can't lose it
+GC_MIN_AGE = datetime.timedelta(days=7)
+
+# Tables that shrink when playlists and videos are collected, vacuumed on PostgreSQL
+GC_MODELS = (Video, VideoTagsThrough, VideoTag, Playlist, Tag, WatchEvent, WatchRollup)
+
+
+def remove_missing_playlists(user_id, playlist_ids):
+    """
+    Delete the user's playlists missing from a complete playlist listing
+
+    Their videos are unlinked from them in the same bulk update, so they
+    become orphans if nothing else references them. Returns how many
+    playlists were removed.
+    """
+    removed = list(
+        Playlist.objects.filter(user_id=user_id).exclude(playlist_id__in=playlist_ids).values_list('playlist_id', flat=True)
+    )
+    if removed:
+        with transaction.atomic():
+            Video.objects.filter(user_id=user_id, playlist_id__in=removed).update(
+                playlist_id=None, playlist_name=None, updated_at=timezone.now()
+            )
+            Playlist.objects.filter(user_id=user_id, playlist_id__in=removed).delete()
+        logger.info(f"Removed {len(removed)} playlists deleted on YouTube for user id {user_id}")
+    return len(removed)
+
+
+def unlink_playlist_videos(user_id, playlist_id, video_ids):
+    """
+    Unlink the videos still pointing at a playlist that a complete listing of it didn't include
+
+    updated_at is bumped, as with every unlink, so a video that's in another
+    playlist too has until GC_MIN_AGE for a sync of that one to relink it.
+    """
+    return Video.objects.filter(user_id=user_id, playlist_id=playlist_id).exclude(
+        video_id__in=video_ids
+    ).update(playlist_id=None, playlist_name=None, updated_at=timezone.now())
+
+
+def orphaned_videos(user_id, min_age=GC_MIN_AGE):
+    """
+    The user's videos that nothing references any more
+
+    That is, videos that are not liked, saved or in the watch history, not
+    in one of the user's playlists, and not tagged or given a custom
+    description, and that haven't changed within min_age.
+    """
+    return Video.objects.filter(
+        user_id=user_id,
+        is_liked=False,
+        is_saved=False,
+        is_history=False,
+        updated_at__lt=timezone.now() - min_age,
+    ).filter(
+        Q(custom_description__isnull=True) | Q(custom_description='')
+    ).exclude(
+        Exists(Playlist.objects.filter(user_id=user_id, playlist_id=OuterRef('playlist_id')))
+    ).exclude(
+        Exists(VideoTagsThrough.objects.filter(video_id=OuterRef('pk')))
+    ).exclude(
+        Exists(VideoTag.objects.filter(video_id=OuterRef('pk')))
+    )
+
+
+def collect_garbage(user_id, dry_run=False, min_age=GC_MIN_AGE, batch_size=GC_BATCH_SIZE):
+    """
+    Delete the user's orphaned videos in batches, returning how many were (or would be) deleted
+
+    Each batch is checked against the orphan conditions again as it's
+    deleted, so a video referenced in the meantime survives. Counters are
+    reconciled once at the end.
+    """
+    orphans = orphaned_videos(user_id, min_age)
+    if dry_run:
+        return orphans.count()
+
+    deleted = 0
+    while True:
+        ids = list(orphans.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            _, per_model = orphans.filter(id__in=ids).delete()
+        batch_deleted = per_model.get(Video._meta.label, 0)
+        if not batch_deleted:
+            break
+        deleted += batch_deleted
+
+    if deleted:
+        reconcile_user_counters(user_id)
+        logger.info(f"Collected {deleted} orphaned videos for user id {user_id}")
+    return deleted
+
+
+def vacuum_database():
+    """
+    Reclaim the space freed by collection and refresh planner statistics
+
+    SQLite rewrites the whole file with VACUUM, then runs ANALYZE.
+    PostgreSQL gets VACUUM ANALYZE on each table GC touches. Both must run
+    outside a transaction.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('VACUUM')
+            cursor.execute('ANALYZE')
+        elif connection.vendor == 'postgresql':
+            for model in GC_MODELS:
+                cursor.execute(f'VACUUM ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        else:
+            logger.info(f"No vacuum step for {connection.vendor} databases")
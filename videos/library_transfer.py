@@ -0,0 +1,230 @@
+import gzip
+import io
+import json
+import logging
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Video, VideoTag, make_description_snippet
+from .tagging import get_or_create_tags, VideoTagsThrough
+from .counters import reconcile_user_counters
+from .exports import EXPORT_CHUNK_SIZE, EXPORT_FIELDS, export_rows, batched
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet is optional; gzip NDJSON always works
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Whole-library backup formats, for moving a library between environments
+LIBRARY_FORMATS = ('ndjson.gz', 'parquet')
+LIBRARY_CONTENT_TYPES = {
+    'ndjson.gz': 'application/gzip',
+    'parquet': 'application/vnd.apache.parquet',
+}
+IMPORT_BATCH_SIZE = 1000
+
+# Columns an import overwrites on videos the user already has
+IMPORT_UPDATE_FIELDS = (
+    'title', 'description', 'youtube_description', 'custom_description', 'description_snippet',
+    'thumbnail_url', 'channel_title', 'channel_id', 'published_at', 'playlist_id', 'playlist_name',
+    'is_liked', 'is_saved', 'is_history', 'updated_at',
+)
+
+# Columns an empty or missing value in the file doesn't overwrite, so importing
+# an older export never clears a description added since
+IMPORT_KEEP_FIELDS = ('youtube_description', 'custom_description')
+
+
+class LibraryTransferError(Exception):
+    """Raised for unknown or unavailable library formats and unreadable files"""
+
+
+def available_library_formats():
+    return tuple(fmt for fmt in LIBRARY_FORMATS if fmt != 'parquet' or pa is not None)
+
+
+def library_format_for(filename):
+    """Pick a library format from a file name, e.g. backup.ndjson.gz"""
+    for fmt in LIBRARY_FORMATS:
+        if filename.endswith(f".{fmt}"):
+            return fmt
+    raise LibraryTransferError(f"Can't tell the format of '{filename}'; expected one of {', '.join(LIBRARY_FORMATS)}")
+
+
+def _check_format(fmt):
+    if fmt not in LIBRARY_FORMATS:
+        raise LibraryTransferError(f"Unknown library format '{fmt}'")
+    if fmt not in available_library_formats():
+        raise LibraryTransferError("Parquet support needs pyarrow (pip install pyarrow)")
+
+
+def _gzip_ndjson_chunks(rows):
+    """Gzip-compressed NDJSON, yielded one compressed chunk per batch of rows"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip container
+    for batch in batched(rows, EXPORT_CHUNK_SIZE):
+        lines = ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in batch)
+        chunk = compressor.compress(lines.encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema():
+    string_fields = {'video_id', 'title', 'description', 'youtube_description', 'custom_description',
+                     'thumbnail_url', 'channel_title', 'channel_id', 'published_at', 'playlist_id', 'playlist_name'}
+    fields = []
+    for field in EXPORT_FIELDS:
+        if field == 'tags':
+            fields.append(pa.field(field, pa.list_(pa.string())))
+        elif field in string_fields:
+            fields.append(pa.field(field, pa.string()))
+        else:
+            fields.append(pa.field(field, pa.bool_()))
+    return pa.schema(fields)
+
+
+def _parquet_chunks(rows):
+    """Parquet file, yielded one row group at a time"""
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    for batch in batched(rows, EXPORT_CHUNK_SIZE):
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def library_export_chunks(user_id, fmt):
+    """Yield a user's library as bytes in the given format, a chunk at a time"""
+    _check_format(fmt)
+    rows = export_rows(user_id)
+    if fmt == 'parquet':
+        return _parquet_chunks(rows)
+    return _gzip_ndjson_chunks(rows)
+
+
+def read_library_rows(fileobj, fmt):
+    """Yield row dicts from an exported library file"""
+    _check_format(fmt)
+    try:
+        if fmt == 'parquet':
+            for batch in pq.ParquetFile(fileobj).iter_batches(batch_size=IMPORT_BATCH_SIZE):
+                yield from batch.to_pylist()
+        else:
+            with gzip.open(fileobj, 'rt', encoding='utf-8') as lines:
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+    except (OSError, ValueError, EOFError) as e:
+        raise LibraryTransferError(f"Unreadable {fmt} file: {str(e)}")
+
+
+def _video_from_row(user, row, existing):
+    published_at = row.get('published_at')
+    if isinstance(published_at, str):
+        published_at = parse_datetime(published_at)
+    kept = {field: row.get(field) or existing.get(field) for field in IMPORT_KEEP_FIELDS}
+    return Video(
+        user=user,
+        video_id=row['video_id'],
+        title=(row.get('title') or 'Untitled Video')[:255],
+        description=row.get('description'),
+        **kept,
+        description_snippet=make_description_snippet(kept['custom_description'], row.get('description')),
+        thumbnail_url=row.get('thumbnail_url'),
+        channel_title=row.get('channel_title'),
+        channel_id=row.get('channel_id'),
+        published_at=published_at or timezone.now(),
+        playlist_id=row.get('playlist_id'),
+        playlist_name=row.get('playlist_name'),
+        is_liked=bool(row.get('is_liked')),
+        is_saved=bool(row.get('is_saved')),
+        is_history=bool(row.get('is_history')),
+    )
+
+
+def _import_batch(user, rows):
+    # Last row wins if a video appears twice, as one upsert can't touch a row twice
+    rows = list({row['video_id']: row for row in rows if row.get('video_id')}.values())
+    existing = {
+        values['video_id']: values
+        for values in Video.objects.filter(
+            user=user, video_id__in=[row['video_id'] for row in rows]
+        ).values('video_id', *IMPORT_KEEP_FIELDS)
+    }
+    Video.objects.bulk_create(
+        [_video_from_row(user, row, existing.get(row['video_id'], {})) for row in rows],
+        update_conflicts=True,
+        unique_fields=['user', 'video_id'],
+        update_fields=IMPORT_UPDATE_FIELDS
+    )
+
+    # bulk_create doesn't return ids for updated rows, so look them all up at once
+    video_ids = dict(
+        Video.objects.filter(user=user, video_id__in=[row['video_id'] for row in rows])
+        .values_list('video_id', 'id')
+    )
+    tag_ids = {
+        tag.name: tag.id
+        for tag in get_or_create_tags(user, {name for row in rows for name in row.get('tags') or ()})
+    }
+    links = {
+        (video_ids[row['video_id']], tag_ids[name])
+        for row in rows for name in row.get('tags') or ()
+        if name in tag_ids
+    }
+    VideoTag.objects.bulk_create(
+        [VideoTag(video_id=v, tag_id=t) for v, t in links], ignore_conflicts=True
+    )
+    VideoTagsThrough.objects.bulk_create(
+        [VideoTagsThrough(video_id=v, tag_id=t) for v, t in links], ignore_conflicts=True
+    )
+    return len(rows)
+
+
+def import_library(user, rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Merge exported rows into a user's library, returning the number of videos imported
+
+    Videos are upserted in batches with one INSERT ... ON CONFLICT each;
+    tags from the file are added but existing tags are never removed, and
+    empty descriptions in the file never clear existing ones.
+    """
+    imported = 0
+    with transaction.atomic():
+        for batch in batched(rows, batch_size):
+            imported += _import_batch(user, batch)
+        reconcile_user_counters(user.id)
+
+    logger.info(f"Imported {imported} videos into the library of user {user.username}")
+    return imported
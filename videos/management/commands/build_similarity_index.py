@@ -0,0 +1,30 @@
+from collections import Counter
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.similarity import available, update_similarity_index
+
+
+class Command(BaseCommand):
+    help = "Build or update the similar video and tag suggestion indexes (normally done after each sync)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only index this username")
+        parser.add_argument('--full', action='store_true', help="Rebuild from scratch instead of updating changed videos")
+
+    def handle(self, *args, **options):
+        if not available():
+            raise CommandError("NumPy is required to build similarity indexes (pip install numpy)")
+
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        modes = Counter()
+        for user_id in users.values_list('id', flat=True).iterator():
+            modes[update_similarity_index(user_id, full=options['full']) or 'failed'] += 1
+
+        summary = ', '.join(f"{count} {mode}" for mode, count in sorted(modes.items()))
+        self.stdout.write(self.style.SUCCESS(f"Indexed {sum(modes.values())} user(s): {summary or 'none'}"))
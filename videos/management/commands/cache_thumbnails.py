@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.models import Video
+from videos.thumbnails import Image, cache_thumbnails_for_user
+
+
+class Command(BaseCommand):
+    help = "Cache card-sized thumbnails for videos that don't have them yet (normally done by the sync scheduler)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only cache this username's thumbnails")
+        parser.add_argument(
+            '--limit', type=int, default=settings.THUMBNAIL_CACHE_BATCH_SIZE,
+            help="Most thumbnails to fetch per user (default: THUMBNAIL_CACHE_BATCH_SIZE); 0 for no limit"
+        )
+
+    def handle(self, *args, **options):
+        if Image is None:
+            raise CommandError("Caching thumbnails needs Pillow (pip install Pillow)")
+
+        users = User.objects.filter(id__in=Video.objects.filter(thumbnail_hash='').values('user_id'))
+        if options['user']:
+            if not User.objects.filter(username=options['user']).exists():
+                raise CommandError(f"User '{options['user']}' does not exist")
+            users = users.filter(username=options['user'])
+
+        cached = 0
+        for user_id in users.values_list('id', flat=True):
+            cached += cache_thumbnails_for_user(user_id, limit=options['limit'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Cached thumbnails for {cached} video(s)"))
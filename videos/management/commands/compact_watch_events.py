@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.watch_events import compact_watch_events, watch_event_buffer
+
+
+class Command(BaseCommand):
+    help = "Apply retention to watch events and their hourly and daily rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--event-days', type=int, default=settings.WATCH_EVENT_RETENTION_DAYS,
+            help=f"Keep raw watch events this many days (default {settings.WATCH_EVENT_RETENTION_DAYS})"
+        )
+        parser.add_argument(
+            '--hourly-days', type=int, default=settings.WATCH_HOURLY_ROLLUP_RETENTION_DAYS,
+            help=f"Keep hourly rollups this many days (default {settings.WATCH_HOURLY_ROLLUP_RETENTION_DAYS})"
+        )
+        parser.add_argument(
+            '--daily-days', type=int, default=settings.WATCH_DAILY_ROLLUP_RETENTION_DAYS,
+            help=f"Keep daily rollups this many days (default {settings.WATCH_DAILY_ROLLUP_RETENTION_DAYS})"
+        )
+
+    def handle(self, *args, **options):
+        # The last day's rollups are recomputed from its events and hours, and
+        # daily rollups are summed from hourly ones, so those must be kept
+        if min(options['event_days'], options['hourly_days']) < 2:
+            raise CommandError("--event-days and --hourly-days must be at least 2")
+        if options['daily_days'] < options['hourly_days']:
+            raise CommandError("--daily-days can't be shorter than --hourly-days")
+
+        watch_event_buffer.flush()
+        events, hourly, daily = compact_watch_events(
+            options['event_days'], options['hourly_days'], options['daily_days']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {events} watch events, {hourly} hourly and {daily} daily rollups"
+        ))
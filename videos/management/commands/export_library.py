@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.library_transfer import (
+    LIBRARY_FORMATS, LibraryTransferError, library_export_chunks, library_format_for
+)
+
+
+class Command(BaseCommand):
+    help = "Write a user's library (videos, flags, tags, custom descriptions) to a gzip NDJSON or Parquet file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="Username whose library to export")
+        parser.add_argument('output', help="Output file, e.g. library.ndjson.gz or library.parquet")
+        parser.add_argument(
+            '--format', choices=LIBRARY_FORMATS, default=None,
+            help="File format (default: taken from the output file name)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        try:
+            fmt = options['format'] or library_format_for(options['output'])
+            size = 0
+            with open(options['output'], 'wb') as output:
+                for chunk in library_export_chunks(user.id, fmt):
+                    output.write(chunk)
+                    size += len(chunk)
+        except LibraryTransferError as e:
+            raise CommandError(str(e))
+
+        videos = user.videos.count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {videos} videos for {user.username} to {options['output']} ({size} bytes)"
+        ))
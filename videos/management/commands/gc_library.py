@@ -0,0 +1,58 @@
+import datetime
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.library_gc import GC_BATCH_SIZE, GC_MIN_AGE, collect_garbage, vacuum_database
+from videos.sync_lock import run_exclusive_sync
+
+
+class Command(BaseCommand):
+    help = "Delete videos nothing references any more (not liked, saved, in a playlist or tagged), then vacuum"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only collect this username's library")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be deleted without deleting it")
+        parser.add_argument(
+            '--min-age-days', type=int, default=GC_MIN_AGE.days,
+            help=f"Only collect videos unchanged for this many days (default {GC_MIN_AGE.days})"
+        )
+        parser.add_argument('--batch-size', type=int, default=GC_BATCH_SIZE)
+        parser.add_argument('--skip-vacuum', action='store_true', help="Don't VACUUM/ANALYZE afterwards")
+
+    def handle(self, *args, **options):
+        if options['min_age_days'] < 1:
+            raise CommandError("--min-age-days must be at least 1")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        dry_run = options['dry_run']
+        min_age = datetime.timedelta(days=options['min_age_days'])
+        total = 0
+        for user in users.only('id', 'username').iterator():
+            result = {}
+
+            def collect():
+                result['count'] = collect_garbage(user.id, dry_run, min_age, options['batch_size'])
+                return True
+
+            # Holding the sync lock keeps a sync from relinking videos mid-collection
+            started, _ = run_exclusive_sync(user.id, 'gc', collect)
+            if not started:
+                self.stdout.write(f"{user.username}: sync running, skipped")
+                continue
+            if result['count']:
+                self.stdout.write(f"{user.username}: {result['count']} orphaned videos{' (dry run)' if dry_run else ''}")
+            total += result['count']
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Would delete {total} orphaned videos"))
+            return
+        if total and not options['skip_vacuum']:
+            vacuum_database()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} orphaned videos"))
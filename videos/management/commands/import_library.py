@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.library_transfer import (
+    IMPORT_BATCH_SIZE, LIBRARY_FORMATS, LibraryTransferError, import_library,
+    library_format_for, read_library_rows
+)
+
+
+class Command(BaseCommand):
+    help = "Merge a library file written by export_library into a user's library"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="Username to import into")
+        parser.add_argument('input', help="Library file, e.g. library.ndjson.gz or library.parquet")
+        parser.add_argument(
+            '--format', choices=LIBRARY_FORMATS, default=None,
+            help="File format (default: taken from the input file name)"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help=f"Videos upserted per INSERT (default: {IMPORT_BATCH_SIZE})"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        try:
+            fmt = options['format'] or library_format_for(options['input'])
+            imported = import_library(
+                user, read_library_rows(options['input'], fmt), batch_size=options['batch_size']
+            )
+        except (LibraryTransferError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} videos into {user.username}'s library"))
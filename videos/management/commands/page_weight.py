@@ -0,0 +1,47 @@
+import gzip
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from videos.models import Video
+
+# Static bundles a page with video cards downloads once and then caches
+CARD_BUNDLES = ('videos/css/video_card.css', 'videos/js/video_card.js')
+
+
+class Command(BaseCommand):
+    help = "Measure the HTML weight of a user's video cards, as rendered on category pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="Username whose videos to render")
+        parser.add_argument('--limit', type=int, default=500, help="Number of cards to render (default 500)")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        videos = list(Video.objects.filter(user=user).order_by('-published_at').for_list()[:options['limit']])
+        if not videos:
+            raise CommandError(f"User '{user.username}' has no videos")
+
+        html = ''.join(
+            render_to_string('videos/components/video_card.html', {'video': video}) for video in videos
+        )
+        size = len(html.encode())
+        compressed = len(gzip.compress(html.encode()))
+        self.stdout.write(
+            f"{len(videos)} cards: {size} bytes of HTML ({size // len(videos)} per card), "
+            f"{compressed} bytes gzipped ({compressed // len(videos)} per card)"
+        )
+
+        for bundle in CARD_BUNDLES:
+            path = finders.find(bundle)
+            if path:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.stdout.write(
+                    f"{bundle}: {len(data)} bytes ({len(gzip.compress(data))} gzipped), downloaded once per deploy"
+                )
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.sync_archive import prune_archive
+
+
+class Command(BaseCommand):
+    help = "Delete archived API pages older than the retention period, and blobs no page refers to"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SYNC_ARCHIVE_RETENTION_DAYS,
+            help=f"Keep pages archived within this many days (default: SYNC_ARCHIVE_RETENTION_DAYS, currently {settings.SYNC_ARCHIVE_RETENTION_DAYS})"
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1")
+        pages, blobs = prune_archive(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {pages} archived pages and {blobs} blobs"))
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from videos.thumbnails import cache_size, evict_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Evict least recently used cached thumbnails until the cache fits its disk budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-bytes', type=int, default=None,
+            help=f"Disk budget in bytes (default: THUMBNAIL_CACHE_MAX_BYTES, currently {settings.THUMBNAIL_CACHE_MAX_BYTES})"
+        )
+
+    def handle(self, *args, **options):
+        freed = evict_thumbnails(options['max_bytes'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Freed {freed} bytes; thumbnail cache is now {cache_size()} bytes"
+        ))
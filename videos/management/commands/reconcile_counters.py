@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.counters import reconcile_user_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized tag, playlist and liked/saved counters from the source rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only reconcile this username")
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        count = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            reconcile_user_counters(user_id)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters for {count} user(s)"))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.similarity import update_similarity_index
+from videos.sync_archive import replay_archive
+
+
+class Command(BaseCommand):
+    help = "Rebuild videos and playlists from archived API pages, without calling the YouTube API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only replay this username's library")
+
+    def handle(self, *args, **options):
+        if not settings.SYNC_ARCHIVE_DIR:
+            raise CommandError("SYNC_ARCHIVE_DIR is not set, so there is no archive to replay")
+
+        users = User.objects.filter(archived_responses__isnull=False).distinct()
+        if options['user']:
+            if not User.objects.filter(username=options['user']).exists():
+                raise CommandError(f"User '{options['user']}' does not exist")
+            users = users.filter(username=options['user'])
+
+        for user in users:
+            try:
+                videos, playlists, skipped = replay_archive(user)
+            except OSError as e:
+                raise CommandError(f"Couldn't read the archive for {user.username}: {str(e)}")
+            update_similarity_index(user.id)
+            self.stdout.write(self.style.SUCCESS(
+                f"Replayed {videos} videos and {playlists} playlists for {user.username}"
+                + (f" ({skipped} unparseable items skipped)" if skipped else "")
+            ))
@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.models import SyncDeadLetter, UserToken
+from videos.sync_checkpoint import MAX_DEAD_LETTER_ATTEMPTS
+from videos.youtube_api import YouTubeAPI
+
+
+class Command(BaseCommand):
+    help = "Retry saving items that earlier syncs couldn't parse (normally done after each successful sync)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only retry this username's items")
+
+    def handle(self, *args, **options):
+        letters = SyncDeadLetter.objects.filter(attempts__lt=MAX_DEAD_LETTER_ATTEMPTS)
+        if options['user']:
+            if not User.objects.filter(username=options['user']).exists():
+                raise CommandError(f"User '{options['user']}' does not exist")
+            letters = letters.filter(user__username=options['user'])
+
+        saved = failed = 0
+        user_ids = letters.values_list('user_id', flat=True).distinct()
+        for user_token in UserToken.objects.filter(user_id__in=user_ids).select_related('user'):
+            user_saved, user_failed = YouTubeAPI(user_token=user_token).retry_dead_letters()
+            saved += user_saved
+            failed += user_failed
+            if user_failed:
+                self.stdout.write(f"{user_token.user.username}: {user_failed} item(s) still failing")
+
+        self.stdout.write(self.style.SUCCESS(f"Saved {saved} dead-lettered item(s); {failed} still failing"))
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from videos.scheduler import SyncScheduler
+
+
+class Command(BaseCommand):
+    help = "Resync users' playlists, liked and Watch Later videos in the background as they become due"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Run the syncs that are currently due, wait for them and exit (e.g. from cron)"
+        )
+        parser.add_argument(
+            '--max-concurrent', type=int, default=None,
+            help=f"Concurrent syncs (default: SYNC_SCHEDULER_MAX_CONCURRENT_SYNCS, currently {settings.SYNC_SCHEDULER_MAX_CONCURRENT_SYNCS})"
+        )
+        parser.add_argument(
+            '--calls-per-minute', type=int, default=None,
+            help=f"YouTube API call budget (default: SYNC_SCHEDULER_MAX_API_CALLS_PER_MINUTE, currently {settings.SYNC_SCHEDULER_MAX_API_CALLS_PER_MINUTE})"
+        )
+
+    def handle(self, *args, **options):
+        scheduler = SyncScheduler(
+            max_concurrent_syncs=options['max_concurrent'],
+            max_api_calls_per_minute=options['calls_per_minute'],
+        )
+        try:
+            if options['once']:
+                started = scheduler.run_once()
+                self.stdout.write(self.style.SUCCESS(f"Ran {started} scheduled sync(s)"))
+            else:
+                scheduler.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; waiting for running syncs to finish")
+        finally:
+            scheduler.shutdown()
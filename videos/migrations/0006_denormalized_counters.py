@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Tag = apps.get_model('videos', 'Tag')
+    VideoTag = apps.get_model('videos', 'VideoTag')
+    Playlist = apps.get_model('videos', 'Playlist')
+    Video = apps.get_model('videos', 'Video')
+    UserLibraryStats = apps.get_model('videos', 'UserLibraryStats')
+
+    Tag.objects.update(video_count=Coalesce(Subquery(
+        VideoTag.objects.filter(tag_id=OuterRef('pk')).order_by()
+        .values('tag_id').annotate(c=Count('*')).values('c')[:1]
+    ), 0))
+    Playlist.objects.update(video_count=Coalesce(Subquery(
+        Video.objects.filter(user_id=OuterRef('user_id'), playlist_id=OuterRef('playlist_id')).order_by()
+        .values('playlist_id').annotate(c=Count('*')).values('c')[:1]
+    ), 0))
+
+    totals = Video.objects.order_by().values('user_id').annotate(
+        liked_count=Count('id', filter=Q(is_liked=True)),
+        saved_count=Count('id', filter=Q(is_saved=True)),
+    )
+    UserLibraryStats.objects.bulk_create([UserLibraryStats(**row) for row in totals])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_alter_tag_options_video_tags_alter_tag_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playlist',
+            name='video_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='video_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='UserLibraryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('liked_count', models.IntegerField(default=0)),
+                ('saved_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='library_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:33
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def backfill_snippets(apps, schema_editor):
+    Video = apps.get_model('videos', 'Video')
+    batch = []
+    for video in Video.objects.only('id', 'description', 'custom_description').iterator(chunk_size=1000):
+        video.description_snippet = Truncator(video.custom_description or video.description or '').chars(120)
+        batch.append(video)
+        if len(batch) >= 1000:
+            Video.objects.bulk_update(batch, ['description_snippet'])
+            batch = []
+    if batch:
+        Video.objects.bulk_update(batch, ['description_snippet'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='description_snippet',
+            field=models.CharField(blank=True, default='', max_length=120),
+        ),
+        migrations.RunPython(backfill_snippets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_video_thumbnail_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userlibrarystats',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0011_synclock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['user', 'channel_id', '-published_at'], name='video_user_channel_idx'),
+        ),
+    ]
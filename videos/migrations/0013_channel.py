@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_channels(apps, schema_editor):
+    Channel = apps.get_model('videos', 'Channel')
+    Video = apps.get_model('videos', 'Video')
+    VideoTag = apps.get_model('videos', 'VideoTag')
+
+    channels = Video.objects.exclude(channel_id__isnull=True).exclude(channel_id='').order_by().values(
+        'user_id', 'channel_id'
+    ).annotate(
+        title=Max('channel_title'),
+        video_count=Count('id'),
+        liked_count=Count('id', filter=Q(is_liked=True)),
+        saved_count=Count('id', filter=Q(is_saved=True)),
+    )
+    Channel.objects.bulk_create(
+        [Channel(**{**row, 'title': row['title'] or 'Unknown Channel'}) for row in channels],
+        batch_size=500
+    )
+    Channel.objects.update(tagged_count=Coalesce(Subquery(
+        VideoTag.objects.filter(video__user_id=OuterRef('user_id'), video__channel_id=OuterRef('channel_id'))
+        .order_by().values('video__channel_id').annotate(c=Count('video_id', distinct=True)).values('c')[:1]
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0012_video_user_channel_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Channel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel_id', models.CharField(max_length=100)),
+                ('title', models.CharField(max_length=255)),
+                ('video_count', models.IntegerField(default=0)),
+                ('liked_count', models.IntegerField(default=0)),
+                ('saved_count', models.IntegerField(default=0)),
+                ('tagged_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='channels', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['title'],
+                'indexes': [models.Index(fields=['user', '-video_count'], name='channel_user_video_count_idx')],
+                'unique_together': {('user', 'channel_id')},
+            },
+        ),
+        migrations.RunPython(backfill_channels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0013_channel'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userlibrarystats',
+            name='watch_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='WatchEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(default='app', max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_events', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_events', to='videos.video')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-watched_at'], name='watch_event_user_idx'), models.Index(fields=['video', '-watched_at'], name='watch_event_video_idx'), models.Index(fields=['watched_at'], name='watch_event_watched_at_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WatchRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('period_start', models.DateTimeField()),
+                ('watch_count', models.IntegerField(default=0)),
+                ('last_watched_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_rollups', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_rollups', to='videos.video')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'period', '-last_watched_at'], name='watch_rollup_recent_idx'), models.Index(fields=['user', 'period', 'period_start'], name='watch_rollup_period_idx'), models.Index(fields=['period', 'period_start'], name='watch_rollup_retention_idx')],
+                'unique_together': {('user', 'video', 'period', 'period_start')},
+            },
+        ),
+    ]
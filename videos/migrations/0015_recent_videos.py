@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:12
+
+import struct
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+# videos.recent.RING_SIZE when this migration was written
+RING_SIZE = 200
+
+
+def backfill_rings(apps, schema_editor):
+    RecentVideos = apps.get_model('videos', 'RecentVideos')
+    Video = apps.get_model('videos', 'Video')
+    WatchEvent = apps.get_model('videos', 'WatchEvent')
+
+    def pack(ids):
+        return struct.pack(f'<{len(ids)}q', *ids)
+
+    rings = []
+    for user_id in Video.objects.order_by().values_list('user_id', flat=True).distinct():
+        recent = list(
+            Video.objects.filter(user_id=user_id).order_by('-created_at', '-id').values_list('id', flat=True)[:RING_SIZE]
+        )
+        rings.append(RecentVideos(user_id=user_id, kind='recent', video_ids=pack(recent)))
+
+        history = list(
+            WatchEvent.objects.filter(user_id=user_id).values('video_id').annotate(last=Max('watched_at'))
+            .order_by('-last').values_list('video_id', flat=True)[:RING_SIZE]
+        )
+        if len(history) < RING_SIZE:
+            history += list(
+                Video.objects.filter(user_id=user_id, is_history=True).exclude(id__in=history)
+                .order_by('-updated_at').values_list('id', flat=True)[:RING_SIZE - len(history)]
+            )
+        rings.append(RecentVideos(user_id=user_id, kind='history', video_ids=pack(history)))
+    RecentVideos.objects.bulk_create(rings, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0014_watch_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecentVideos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('history', 'Watch history'), ('recent', 'Recently added')], max_length=10)),
+                ('video_ids', models.BinaryField(default=b'')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recent_videos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'kind')},
+            },
+        ),
+        migrations.RunPython(backfill_rings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0015_recent_videos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_playlists', models.JSONField(default=list)),
+                ('playlist_id', models.CharField(blank=True, max_length=100)),
+                ('page_token', models.CharField(blank=True, max_length=255)),
+                ('items_written', models.IntegerField(default=0)),
+                ('items_failed', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_checkpoints', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'source')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncDeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20)),
+                ('video_id', models.CharField(blank=True, max_length=100)),
+                ('extra', models.JSONField(default=dict)),
+                ('payload', models.JSONField(default=dict)),
+                ('error', models.TextField()),
+                ('attempts', models.IntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_dead_letters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'attempts'], name='dead_letter_user_attempts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0016_sync_checkpoints'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=50)),
+                ('resource', models.CharField(max_length=255)),
+                ('page_token', models.CharField(blank=True, max_length=255)),
+                ('etag', models.CharField(blank=True, max_length=100)),
+                ('blob', models.CharField(max_length=100)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_responses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fetched_at'], name='archived_response_fetched_idx')],
+                'unique_together': {('user', 'endpoint', 'resource', 'page_token', 'etag')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0017_sync_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userlibrarystats',
+            name='similarity_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
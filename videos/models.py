@@ -1,6 +1,18 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.text import Truncator
+
+DESCRIPTION_SNIPPET_LENGTH = 120
+
+
+def make_description_snippet(custom_description, description):
+    """Short card text: the custom description if set, else the YouTube one"""
+    text = custom_description or description or ''
+    if len(text) <= DESCRIPTION_SNIPPET_LENGTH:
+        return text
+    # Only the start of the text can affect the result; skip normalizing the rest
+    return Truncator(text[:DESCRIPTION_SNIPPET_LENGTH * 2]).chars(DESCRIPTION_SNIPPET_LENGTH)
 
 
 class UserToken(models.Model):
@@ -29,6 +41,7 @@ class Playlist(models.Model):
     thumbnail_url = models.URLField(blank=True, null=True)
     item_count = models.IntegerField(default=0)
     youtube_channel_id = models.CharField(max_length=100, blank=True, null=True)
+    video_count = models.IntegerField(default=0)  # Local Video rows, maintained by counters.py
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -39,6 +52,44 @@ class Playlist(models.Model):
         return self.title
 
 
+class Channel(models.Model):
+    """A YouTube channel in a user's library, with counters maintained by counters.py"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='channels')
+    channel_id = models.CharField(max_length=100)
+    title = models.CharField(max_length=255)
+    video_count = models.IntegerField(default=0)
+    liked_count = models.IntegerField(default=0)
+    saved_count = models.IntegerField(default=0)
+    tagged_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'channel_id')
+        ordering = ['title']
+        indexes = [
+            models.Index(fields=['user', '-video_count'], name='channel_user_video_count_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class VideoQuerySet(models.QuerySet):
+    # Columns the video cards and list serializer need; the large description
+    # columns stay deferred and only load on the detail page
+    LIST_FIELDS = (
+        'id', 'user_id', 'video_id', 'title', 'description_snippet', 'thumbnail_url', 'thumbnail_hash',
+        'channel_title', 'channel_id', 'published_at', 'is_liked', 'is_history',
+        'is_saved', 'playlist_id', 'playlist_name',
+    )
+
+    def for_list(self):
+        """Compact projection for list pages and dashboard shelves"""
+        return self.only(*self.LIST_FIELDS).prefetch_related(
+            models.Prefetch('tags', queryset=Tag.objects.only('id', 'name'))
+        )
+
+
 class Video(models.Model):
     """Store YouTube video data"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='videos')
@@ -47,7 +98,9 @@ class Video(models.Model):
     description = models.TextField(blank=True, null=True)
     youtube_description = models.TextField(blank=True, null=True)
     custom_description = models.TextField(blank=True, null=True)
+    description_snippet = models.CharField(max_length=DESCRIPTION_SNIPPET_LENGTH, blank=True, default='')
     thumbnail_url = models.URLField(blank=True, null=True)
+    thumbnail_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)  # Local cache key, see thumbnails.py
     channel_title = models.CharField(max_length=255, blank=True, null=True)
     channel_id = models.CharField(max_length=100, blank=True, null=True)
     published_at = models.DateTimeField()
@@ -65,19 +118,35 @@ class Video(models.Model):
     
     # Tags
     tags = models.ManyToManyField('Tag', related_name='videos', blank=True)
+
+    objects = VideoQuerySet.as_manager()
     
     class Meta:
         unique_together = ('user', 'video_id')
         ordering = ['-published_at']
+        indexes = [
+            # Same-channel lookups for the related videos panel
+            models.Index(fields=['user', 'channel_id', '-published_at'], name='video_user_channel_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Keep the card snippet in step with the descriptions it's derived from
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'description', 'custom_description'} & set(update_fields):
+            self.description_snippet = make_description_snippet(self.custom_description, self.description)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'description_snippet'}
+        super().save(*args, **kwargs)
+
 
 class Tag(models.Model):
     """Store tags for videos"""
     name = models.CharField(max_length=50, unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags')
+    video_count = models.IntegerField(default=0)  # Maintained by counters.py
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -99,3 +168,181 @@ class VideoTag(models.Model):
 
     def __str__(self):
         return f"{self.video.title} - {self.tag.name}"
+
+
+class UserLibraryStats(models.Model):
+    """Denormalized per-user library totals, maintained by counters.py"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='library_stats')
+    liked_count = models.IntegerField(default=0)
+    saved_count = models.IntegerField(default=0)
+    version = models.PositiveBigIntegerField(default=0)  # Bumped on every library change, used for ETags
+    watch_version = models.PositiveBigIntegerField(default=0)  # Bumped when watch rollups change, also in ETags
+    similarity_version = models.PositiveBigIntegerField(default=0)  # Bumped when a similarity index build is written
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Library stats for {self.user.username}"
+
+
+class SyncState(models.Model):
+    """Last sync outcome and next scheduled sync for one user and source"""
+    SOURCE_CHOICES = [
+        ('playlists', 'Playlists'),
+        ('liked', 'Liked videos'),
+        ('saved', 'Watch Later'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_states')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_success = models.BooleanField(null=True)
+    consecutive_failures = models.IntegerField(default=0)
+    next_sync_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'source')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.source}"
+
+
+class SyncCheckpoint(models.Model):
+    """Progress of one user/source sync, kept until it completes so a failed run can resume (see sync_checkpoint.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_checkpoints')
+    source = models.CharField(max_length=20)
+    started_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_playlists = models.JSONField(default=list)  # Playlist ids whose videos are fully synced
+    playlist_id = models.CharField(max_length=100, blank=True)  # Playlist in progress, if any
+    page_token = models.CharField(max_length=255, blank=True)  # Next page to fetch for it (or for the source)
+    items_written = models.IntegerField(default=0)
+    items_failed = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'source')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.source} checkpoint"
+
+
+class SyncDeadLetter(models.Model):
+    """An item a sync couldn't save, kept to be retried in a batch (see sync_checkpoint.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_dead_letters')
+    source = models.CharField(max_length=20)
+    video_id = models.CharField(max_length=100, blank=True)  # YouTube id, if the item had one
+    extra = models.JSONField(default=dict)  # Source-specific Video fields, e.g. {'is_liked': True}
+    payload = models.JSONField(default=dict)  # The item as the API returned it
+    error = models.TextField()
+    attempts = models.IntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_attempt_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'attempts'], name='dead_letter_user_attempts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.source} - {self.video_id or 'unknown'}"
+
+
+class ArchivedResponse(models.Model):
+    """One raw YouTube API page kept for replay; the body is a compressed blob on disk (see sync_archive.py)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_responses')
+    endpoint = models.CharField(max_length=50)  # e.g. 'playlistItems'
+    resource = models.CharField(max_length=255)  # The listed resource, e.g. 'playlistId=PL...' or 'myRating=like'
+    page_token = models.CharField(max_length=255, blank=True)  # Blank for the first page
+    etag = models.CharField(max_length=100, blank=True)
+    blob = models.CharField(max_length=100)  # Path under SYNC_ARCHIVE_DIR, named by the body's SHA-256
+    fetched_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user', 'endpoint', 'resource', 'page_token', 'etag')
+        indexes = [
+            models.Index(fields=['fetched_at'], name='archived_response_fetched_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.endpoint} {self.resource} {self.page_token or 'first page'}"
+
+
+class SyncLock(models.Model):
+    """Per-user sync lease shared by every web worker and the scheduler (see sync_lock.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='sync_lock')
+    owner = models.CharField(max_length=64, blank=True)  # Empty while no sync is running
+    sync_type = models.CharField(max_length=20, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_success = models.BooleanField(null=True)
+
+    def __str__(self):
+        return f"Sync lock for {self.user.username}"
+
+
+class RecentVideos(models.Model):
+    """A user's most recent video ids, newest first, capped and maintained by recent.py"""
+    HISTORY = 'history'
+    RECENT = 'recent'
+    KIND_CHOICES = [
+        (HISTORY, 'Watch history'),
+        (RECENT, 'Recently added'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recent_videos')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    video_ids = models.BinaryField(default=b'')  # Packed little-endian int64 ids
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'kind')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.kind}"
+
+
+class WatchEvent(models.Model):
+    """One opening of a video from the app; append-only, written in batches by watch_events.py"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='watch_events')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='watch_events')
+    watched_at = models.DateTimeField(default=timezone.now)
+    source = models.CharField(max_length=50, default='app')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-watched_at'], name='watch_event_user_idx'),
+            models.Index(fields=['video', '-watched_at'], name='watch_event_video_idx'),
+            models.Index(fields=['watched_at'], name='watch_event_watched_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} watched {self.video_id} at {self.watched_at}"
+
+
+class WatchRollup(models.Model):
+    """Watch counts per user, video and hour or day, maintained from WatchEvent by watch_events.py"""
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = [
+        (HOUR, 'Hourly'),
+        (DAY, 'Daily'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='watch_rollups')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='watch_rollups')
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateTimeField()
+    watch_count = models.IntegerField(default=0)
+    last_watched_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'video', 'period', 'period_start')
+        indexes = [
+            models.Index(fields=['user', 'period', '-last_watched_at'], name='watch_rollup_recent_idx'),
+            models.Index(fields=['user', 'period', 'period_start'], name='watch_rollup_period_idx'),
+            models.Index(fields=['period', 'period_start'], name='watch_rollup_retention_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.video_id} - {self.period} {self.period_start}"
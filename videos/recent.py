@@ -0,0 +1,54 @@
+import struct
+from django.db import transaction
+from .models import RecentVideos, Video
+
+# Entries kept per ring; older ones fall off the end
+RING_SIZE = 200
+
+HISTORY = RecentVideos.HISTORY
+RECENT = RecentVideos.RECENT
+
+
+def unpack_ids(data):
+    data = bytes(data)
+    return list(struct.unpack(f'<{len(data) // 8}q', data))
+
+
+def pack_ids(ids):
+    return struct.pack(f'<{len(ids)}q', *ids)
+
+
+def push_recent(user_id, kind, video_ids):
+    """
+    Move video_ids to the front of one of the user's rings, the last one first
+
+    A video already in the ring moves rather than repeats. The ring is one
+    row holding at most RING_SIZE packed ids, so a push costs the same
+    however large the library is.
+    """
+    video_ids = list(video_ids)
+    if not video_ids:
+        return
+
+    front = list(dict.fromkeys(reversed(video_ids)))
+    with transaction.atomic():
+        ring, _ = RecentVideos.objects.select_for_update().get_or_create(user_id=user_id, kind=kind)
+        pushed = set(front)
+        entries = front + [video_id for video_id in unpack_ids(ring.video_ids) if video_id not in pushed]
+        ring.video_ids = pack_ids(entries[:RING_SIZE])
+        ring.save(update_fields=['video_ids', 'updated_at'])
+
+
+def recent_videos(user_id, kind, limit=RING_SIZE):
+    """
+    Videos in one of the user's rings, newest first
+
+    Reads the ring row and fetches its videos by primary key; videos deleted
+    since they were pushed are skipped.
+    """
+    ring = RecentVideos.objects.filter(user_id=user_id, kind=kind).values_list('video_ids', flat=True).first()
+    if not ring:
+        return []
+    ids = unpack_ids(ring)[:limit]
+    videos = Video.objects.filter(user_id=user_id, id__in=ids).for_list().in_bulk()
+    return [videos[video_id] for video_id in ids if video_id in videos]
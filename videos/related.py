@@ -0,0 +1,71 @@
+from collections import Counter
+from django.core.cache import cache
+from django.db.models import Count
+from .models import Video, VideoTag
+from .similarity import similar_videos
+
+RELATED_VIDEOS_LIMIT = 8
+RELATED_CACHE_SECONDS = 60 * 60
+
+# A shared tag says more about relatedness than a shared channel; a near-identical
+# title and description (similarity close to 1) counts like two shared tags
+SHARED_TAG_WEIGHT = 2
+SAME_CHANNEL_WEIGHT = 1
+TEXT_SIMILARITY_WEIGHT = 4
+
+# Columns the related videos panel renders
+RELATED_FIELDS = ('id', 'video_id', 'title', 'thumbnail_url', 'thumbnail_hash', 'channel_title', 'published_at')
+
+
+def _related_video_ids(video, limit, similar=()):
+    """
+    Score other videos by shared tags, same channel and text similarity, best first
+
+    Both lookups are index scans: VideoTag links by tag_id (the table tag
+    counts and tag pages read, with the video's own tags as a subquery),
+    and the user's videos by (user, channel_id, published_at). Text
+    similarities come precomputed from the similarity index.
+    """
+    scores = Counter()
+
+    for video_pk, similarity in similar:
+        scores[video_pk] += similarity * TEXT_SIMILARITY_WEIGHT
+
+    shared_tags = (
+        VideoTag.objects.filter(tag_id__in=VideoTag.objects.filter(video_id=video.id).values('tag_id'))
+        .exclude(video_id=video.id)
+        .values('video_id').annotate(shared=Count('tag_id'))
+        .order_by('-shared')[:limit * 4]
+    )
+    for row in shared_tags:
+        scores[row['video_id']] += row['shared'] * SHARED_TAG_WEIGHT
+
+    if video.channel_id:
+        same_channel = (
+            Video.objects.filter(user_id=video.user_id, channel_id=video.channel_id)
+            .exclude(id=video.id)
+            .order_by('-published_at')
+            .values_list('id', flat=True)[:limit * 4]
+        )
+        for video_pk in same_channel:
+            scores[video_pk] += SAME_CHANNEL_WEIGHT
+
+    return [video_pk for video_pk, _ in scores.most_common(limit)]
+
+
+def get_related_videos(video, library_version, similarity_version, limit=RELATED_VIDEOS_LIMIT):
+    """
+    Videos related to video, cached per video, library and similarity version
+
+    Any change to the library bumps its version, and every similarity index
+    build bumps the other, so cached panels never outlive the tags, videos
+    and neighbours they were built from.
+    """
+    key = f"related-videos:{video.id}:{library_version}:{similarity_version}:{limit}"
+    related = cache.get(key)
+    if related is None:
+        ids = _related_video_ids(video, limit, similar_videos(video, similarity_version))
+        videos = Video.objects.filter(id__in=ids).only(*RELATED_FIELDS).in_bulk()
+        related = [videos[video_pk] for video_pk in ids if video_pk in videos]
+        cache.set(key, related, RELATED_CACHE_SECONDS)
+    return related
@@ -0,0 +1,156 @@
+import datetime
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import SyncState, UserToken
+from .youtube_api import YouTubeAPI
+from .sync_state import ensure_sync_states, postpone_sync, record_sync_finished
+from .thumbnails import cache_thumbnails_for_user
+from .similarity import update_similarity_index
+from .sync_lock import locked_user_ids, run_exclusive_sync
+
+logger = logging.getLogger(__name__)
+
+
+class ApiRateLimiter:
+    """
+    Thread-safe token bucket capping YouTube API calls per minute
+
+    Allows short bursts of up to a tenth of the per-minute budget.
+    """
+
+    def __init__(self, calls_per_minute):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = max(1, calls_per_minute // 10)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class SyncScheduler:
+    """
+    Resyncs users' sources in the background as they become due
+
+    Sources are picked most-overdue first. At most max_concurrent_syncs run at
+    once, never two for the same user, and every YouTube API call made by
+    them shares one per-minute budget.
+    """
+
+    def __init__(self, max_concurrent_syncs=None, max_api_calls_per_minute=None, poll_seconds=None):
+        self.max_concurrent_syncs = max_concurrent_syncs or settings.SYNC_SCHEDULER_MAX_CONCURRENT_SYNCS
+        self.poll_seconds = poll_seconds or settings.SYNC_SCHEDULER_POLL_SECONDS
+        YouTubeAPI.rate_limiter = ApiRateLimiter(
+            max_api_calls_per_minute or settings.SYNC_SCHEDULER_MAX_API_CALLS_PER_MINUTE
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_syncs, thread_name_prefix='sync'
+        )
+        self.running = {}  # future -> (user_id, source)
+
+    def due_states(self, limit, exclude_user_ids=()):
+        """The most overdue sources, at most one per user"""
+        states = SyncState.objects.filter(
+            Q(next_sync_at__isnull=True) | Q(next_sync_at__lte=timezone.now())
+        ).exclude(
+            user_id__in=exclude_user_ids
+        ).order_by(F('next_sync_at').asc(nulls_first=True)).values_list('user_id', 'source')
+
+        picked = {}
+        for user_id, source in states.iterator():
+            if user_id not in picked:
+                picked[user_id] = source
+                if len(picked) >= limit:
+                    break
+        return list(picked.items())
+
+    def run_pending(self):
+        """Start syncs for due sources while there are free slots; returns how many started"""
+        self.running = {future: job for future, job in self.running.items() if not future.done()}
+        free_slots = self.max_concurrent_syncs - len(self.running)
+        if free_slots <= 0:
+            return 0
+
+        ensure_sync_states()
+        # Users synced by this scheduler or, holding the sync lock, by a request or another worker
+        busy_user_ids = {user_id for user_id, _ in self.running.values()} | locked_user_ids()
+        due = self.due_states(free_slots, exclude_user_ids=busy_user_ids)
+        for user_id, source in due:
+            future = self.executor.submit(self.sync, user_id, source)
+            self.running[future] = (user_id, source)
+        return len(due)
+
+    def sync(self, user_id, source):
+        """Sync one user's source in a worker thread"""
+        try:
+            user_token = UserToken.objects.filter(user_id=user_id).select_related('user').first()
+            if user_token is None:
+                record_sync_finished(user_id, source, False)
+                return False
+
+            youtube_api = YouTubeAPI(user_token=user_token)
+            started, success = run_exclusive_sync(user_id, source, lambda: youtube_api.sync_source(source))
+            if not started:
+                # A request or another worker took the lock after due_states ran; retry after
+                # the next poll rather than picking the source straight back up
+                postpone_sync(user_id, source, datetime.timedelta(seconds=self.poll_seconds))
+                logger.info(f"Sync already running for user {user_token.user.username}; postponing {source}")
+                return False
+
+            logger.info(f"Scheduled sync of {source} for user {user_token.user.username}: {'ok' if success else 'failed'}")
+            if success:
+                # Thumbnails and the similarity index are only refreshed here, outside
+                # the sync lock and never in a request. Thumbnails are bounded so a big
+                # new library can't hold a sync slot for long; the rest follow later syncs
+                cache_thumbnails_for_user(user_id, limit=settings.THUMBNAIL_CACHE_BATCH_SIZE)
+                update_similarity_index(user_id)
+            return success
+        except Exception as e:
+            logger.exception(f"Scheduled sync of {source} failed for user id {user_id}: {str(e)}")
+            return False
+        finally:
+            connection.close()
+
+    def run_once(self):
+        """Run every currently due sync, returning how many ran"""
+        started = 0
+        while True:
+            started += self.run_pending()
+            if not self.running:
+                return started
+            wait(list(self.running), return_when=FIRST_COMPLETED)
+
+    def run_forever(self, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        logger.info(
+            f"Sync scheduler started: {self.max_concurrent_syncs} concurrent syncs, "
+            f"polling every {self.poll_seconds}s"
+        )
+        while not stop_event.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.exception(f"Sync scheduler pass failed: {str(e)}")
+            finally:
+                connection.close()
+            stop_event.wait(self.poll_seconds)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Video, Tag, VideoTag, UserToken
+from .tagging import BULK_TAG_OPERATIONS, BulkTagError, apply_bulk_tags
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -26,6 +27,7 @@ class VideoTagSerializer(serializers.ModelSerializer):
 
 
 class VideoSerializer(serializers.ModelSerializer):
+    youtube_id = serializers.CharField(source='video_id', read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     tag_ids = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
@@ -36,16 +38,17 @@ class VideoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Video
-        fields = ['id', 'youtube_id', 'title', 'description', 'thumbnail_url', 
-                 'playlist_id', 'playlist_name', 'tags', 'tag_ids', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'youtube_id', 'thumbnail_url', 'playlist_id', 
+        fields = ['id', 'youtube_id', 'title', 'description', 'custom_description',
+                 'description_snippet', 'thumbnail_url', 'playlist_id', 'playlist_name',
+                 'tags', 'tag_ids', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'youtube_id', 'description_snippet', 'thumbnail_url', 'playlist_id', 
                            'playlist_name', 'created_at', 'updated_at']
 
     def create(self, validated_data):
         tag_ids = validated_data.pop('tag_ids', [])
         video = Video.objects.create(**validated_data)
         if tag_ids:
-            video.tags.set(tag_ids)
+            self._set_tags(video, tag_ids)
         return video
 
     def update(self, instance, validated_data):
@@ -55,9 +58,16 @@ class VideoSerializer(serializers.ModelSerializer):
         instance.save()
         
         if tag_ids is not None:
-            instance.tags.set(tag_ids)
+            self._set_tags(instance, tag_ids)
         return instance
 
+    def _set_tags(self, video, tags):
+        # Through apply_bulk_tags, so both link tables and the tag and channel counts stay in step
+        try:
+            apply_bulk_tags(video.user, [video.id], tag_ids=[tag.id for tag in tags], operation='replace')
+        except BulkTagError as e:
+            raise serializers.ValidationError({'tag_ids': str(e)})
+
 
 class VideoDetailSerializer(serializers.ModelSerializer):
     tags = serializers.SerializerMethodField()
@@ -82,18 +92,19 @@ class VideoListSerializer(serializers.ModelSerializer):
         model = Video
         fields = (
             'id', 'video_id', 'title', 'thumbnail_url',
-            'published_at', 'channel_title', 'custom_description', 'tags'
+            'published_at', 'channel_title', 'description_snippet', 'tags'
         )
 
     def get_tags(self, obj):
-        video_tags = VideoTag.objects.filter(video=obj)
-        return VideoTagSerializer(video_tags, many=True).data
+        # Reads the video_tags prefetch made by VideoViewSet, so a list costs no query per row
+        return VideoTagSerializer(obj.video_tags.all(), many=True).data
 
 
 class VideoUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Video
-        fields = ('custom_description',)
+        fields = ('custom_description', 'description_snippet')
+        read_only_fields = ('description_snippet',)
 
 
 class TagCreateSerializer(serializers.ModelSerializer):
@@ -119,4 +130,18 @@ class VideoTagCreateSerializer(serializers.ModelSerializer):
         # Ensure the tag belongs to the current user
         if data['tag'].user != self.context['request'].user:
             raise serializers.ValidationError("You don't have permission to use this tag.")
-        return data 
\ No newline at end of file
+        return data
+
+
+class BulkTagSerializer(serializers.Serializer):
+    video_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    tag_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=50), required=False, default=list
+    )
+    operation = serializers.ChoiceField(choices=BULK_TAG_OPERATIONS, default='add')
+
+    def validate(self, data):
+        if not data['tag_ids'] and not data['tag_names'] and data['operation'] != 'replace':
+            raise serializers.ValidationError("Provide tag_ids or tag_names.")
+        return data
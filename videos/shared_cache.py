@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import weakref
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# System playlists are private to their owner whatever their privacy status says
+PRIVATE_PLAYLIST_IDS = ('WL', 'HL', 'LL')
+
+# Query parameters that make a response specific to the caller
+PRIVATE_PARAMS = ('mine', 'myRating')
+
+
+def _cache():
+    return caches['youtube']
+
+
+def is_shareable(endpoint, params, public):
+    """
+    Whether a response can be served to every user asking for the same resource
+
+    Only requests the caller has marked public (a playlist whose privacy
+    status is 'public') qualify; anything listing the user's own resources
+    never does.
+    """
+    params = params or {}
+    return (
+        public
+        and not any(params.get(name) for name in PRIVATE_PARAMS)
+        and params.get('playlistId') not in PRIVATE_PLAYLIST_IDS
+        and endpoint in ('playlistItems', 'videos')
+    )
+
+
+def response_key(endpoint, params):
+    """Cache key for a request, from every parameter that affects its response"""
+    query = '&'.join(f"{name}={value}" for name, value in sorted((params or {}).items()))
+    return f"response:{endpoint}:{hashlib.sha256(query.encode()).hexdigest()}"
+
+
+def _store(set_value, *args):
+    # A full or unwritable cache directory costs the sharing, not the sync
+    try:
+        set_value(*args)
+    except OSError as e:
+        logger.warning(f"Couldn't write to the shared YouTube response cache: {str(e)}")
+
+
+def video_key(video_id, part):
+    return f"video:{part}:{video_id}"
+
+
+class CachedResponse:
+    """A cached 200 response, with the parts of requests/httpx responses the sync clients read"""
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+        self.content = json.dumps(data).encode()
+        self.text = self.content.decode()
+
+    def json(self):
+        return self._data
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def shared_get(key, fetch):
+    """
+    The response for key from the shared cache, or from fetch() on a miss
+
+    Concurrent misses in one process are coalesced: the first caller
+    fetches while the rest wait for its response. Only 200s are cached or
+    handed to waiters: a failure may be the leader's own (an expired token),
+    so if its request fails or raises each waiter makes its own.
+    """
+    data = _cache().get(key)
+    if data is not None:
+        return CachedResponse(data)
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        flight.done.wait()
+        if flight.response is not None and flight.response.status_code == 200:
+            return flight.response
+        return fetch()
+
+    try:
+        flight.response = fetch()
+        if flight.response.status_code == 200:
+            _store(_cache().set, key, flight.response.json())
+        return flight.response
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+# {event loop: {key: future}}
+_async_flights = weakref.WeakKeyDictionary()
+
+
+async def ashared_get(key, fetch):
+    """shared_get for the async client; coalesces within the running event loop"""
+    data = await _cache().aget(key)
+    if data is not None:
+        return CachedResponse(data)
+
+    flights = _async_flights.setdefault(asyncio.get_running_loop(), {})
+    flight = flights.get(key)
+    if flight is not None:
+        try:
+            response = await asyncio.shield(flight)
+            if response.status_code == 200:
+                return response
+        except asyncio.CancelledError:
+            if not flight.cancelled():
+                raise  # This waiter was cancelled, not the leader
+        except Exception:
+            pass
+        # The leader failed, raised or was cancelled; make our own request, like shared_get
+        return await fetch()
+
+    flight = flights[key] = asyncio.get_running_loop().create_future()
+    try:
+        response = await fetch()
+        if response.status_code == 200:
+            await _cache().aset(key, response.json())
+        flight.set_result(response)
+        return response
+    except Exception as e:
+        flight.set_exception(e)
+        # Mark the exception retrieved so a future nobody waited on doesn't warn
+        flight.exception()
+        raise
+    finally:
+        del flights[key]
+        if not flight.done():
+            # The leader was cancelled
+            flight.cancel()
+
+
+def cache_video_snippets(items):
+    """Keep the public snippets of video resources (e.g. from the liked list) for any user"""
+    snippets = {
+        video_key(item['id'], 'snippet'): item['snippet']
+        for item in items if item.get('id') and item.get('snippet')
+    }
+    if snippets:
+        _store(_cache().set_many, snippets)
+
+
+def cached_video_snippets(video_ids):
+    """{video_id: snippet} for the ids whose snippets are cached"""
+    cached = _cache().get_many([video_key(video_id, 'snippet') for video_id in video_ids])
+    return {key.rsplit(':', 1)[1]: snippet for key, snippet in cached.items()}
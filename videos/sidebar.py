@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .conditional import user_library_version
+from .models import Tag, Playlist
+
+SIDEBAR_CACHE_SECONDS = 24 * 60 * 60
+
+# Liked and Watch Later have their own sidebar links
+SYSTEM_PLAYLIST_IDS = ('LL', 'WL')
+
+
+def get_sidebar_payload(user_id, library_version):
+    """
+    The user's tags and playlists as plain dicts, cached per library version
+
+    Tag and playlist writes bump the library version, so a stale payload is
+    never read again and simply expires.
+    """
+    key = f"sidebar-payload:{user_id}:{library_version}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = {
+            'tags': list(
+                Tag.objects.filter(user_id=user_id).order_by('name').values('id', 'name', 'video_count')
+            ),
+            'playlists': list(
+                Playlist.objects.filter(user_id=user_id).exclude(playlist_id__in=SYSTEM_PLAYLIST_IDS)
+                .order_by('title').values('playlist_id', 'title', 'video_count')
+            ),
+        }
+        cache.set(key, payload, SIDEBAR_CACHE_SECONDS)
+    return payload
+
+
+def get_sidebar_html(user_id, library_version):
+    """The rendered playlists and tags sidebar sections, cached like the payload"""
+    key = f"sidebar-html:{user_id}:{library_version}"
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            'videos/components/sidebar_sections.html', get_sidebar_payload(user_id, library_version)
+        )
+        cache.set(key, html, SIDEBAR_CACHE_SECONDS)
+    return mark_safe(html)
+
+
+def sidebar(request):
+    """Context processor providing base.html's cached sidebar sections"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'sidebar_html': get_sidebar_html(user.id, user_library_version(user))}
@@ -0,0 +1,574 @@
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, OrderedDict
+from pathlib import Path
+from django.conf import settings
+from .models import Tag, Video, VideoTag
+from .counters import bump_similarity_version
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; related videos fall back to shared tags and channel
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Neighbours kept per video and per tag
+SIMILAR_VIDEOS_K = 20
+RELATED_TAGS_K = 10
+SUGGESTED_TAGS_LIMIT = 8
+
+# Term weights: a title word counts double, and a shared channel like a shared title word
+TITLE_WEIGHT = 2
+CHANNEL_WEIGHT = 2
+# Only the start of a description is indexed; the rest is mostly links and sponsor copy
+DESCRIPTION_CHARS = 2000
+# Terms in more than this share of a library say nothing about similarity
+MAX_DOCUMENT_SHARE = 0.5
+
+# Changed videos are folded into the existing index while they (plus earlier
+# incremental changes) stay under this share of the library; beyond it the
+# vocabulary and neighbours are rebuilt from scratch
+INCREMENTAL_MAX_SHARE = 0.1
+INCREMENTAL_MAX_ROWS = 500
+
+# Similarities are computed this many cells (rows x videos) at a time
+BLOCK_CELLS = 4_000_000
+
+# Users whose index is kept open per process
+INDEX_CACHE_SIZE = 64
+
+# Builds left behind by a crashed update are removed after this long
+STALE_BUILD_SECONDS = 60 * 60
+
+URL_PATTERN = re.compile(r'https?://\S+')
+WORD_PATTERN = re.compile(r'[^\W\d_][^\W_]+')
+STOP_WORDS = frozenset('''
+    a an and are as at be but by for from has have how i if in into is it its my no not of on or our so
+    that the their this to was we what when who why will with you your
+'''.split())
+
+
+def available():
+    """Whether this install can build indexes"""
+    return np is not None
+
+
+def _words(text):
+    return [
+        word for word in WORD_PATTERN.findall(URL_PATTERN.sub(' ', text.lower()))
+        if word not in STOP_WORDS
+    ]
+
+
+def _document(title, description, channel_id):
+    """Weighted term counts of one video"""
+    counts = Counter()
+    for word in _words(title or ''):
+        counts[word] += TITLE_WEIGHT
+    for word in _words((description or '')[:DESCRIPTION_CHARS]):
+        counts[word] += 1
+    if channel_id:
+        counts[f'channel:{channel_id}'] += CHANNEL_WEIGHT
+    return counts
+
+
+def _text_hash(title, description, channel_id):
+    text = '\x1f'.join((title or '', (description or '')[:DESCRIPTION_CHARS], channel_id or ''))
+    return zlib.crc32(text.encode())
+
+
+def _library(user_id):
+    """(video ids, text hashes, documents) of the user's videos, by id"""
+    ids, hashes, documents = [], [], []
+    rows = (
+        Video.objects.filter(user_id=user_id).order_by('id')
+        .values_list('id', 'title', 'youtube_description', 'channel_id')
+        .iterator(chunk_size=2000)
+    )
+    for video_id, title, description, channel_id in rows:
+        ids.append(video_id)
+        hashes.append(_text_hash(title, description, channel_id))
+        documents.append(_document(title, description, channel_id))
+    return ids, hashes, documents
+
+
+def _fit(documents):
+    """
+    Vocabulary and idf weights for a library
+
+    Terms found in a single video can't link two videos, and terms found in
+    most of them link everything, so both are left out.
+    """
+    frequencies = Counter()
+    for counts in documents:
+        frequencies.update(counts.keys())
+    most = max(2, int(len(documents) * MAX_DOCUMENT_SHARE))
+    terms = sorted(term for term, frequency in frequencies.items() if 2 <= frequency <= most)
+    idf = np.array(
+        [math.log((1 + len(documents)) / (1 + frequencies[term])) + 1 for term in terms], dtype=np.float32
+    )
+    return terms, idf
+
+
+def _vectorize(documents, vocabulary, idf):
+    """(rows, columns, weights) of L2-normalized TF-IDF vectors, with sublinear term frequency"""
+    rows, columns, counts = [], [], []
+    for row, document in enumerate(documents):
+        for term, count in document.items():
+            column = vocabulary.get(term)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+                counts.append(count)
+    rows = np.array(rows, dtype=np.int64)
+    columns = np.array(columns, dtype=np.int32)
+    weights = (1 + np.log(np.array(counts, dtype=np.float32))) * idf[columns]
+    norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(documents)))
+    return rows, columns, (weights / norms[rows]).astype(np.float32)
+
+
+def _sparse(rows, columns, weights, size):
+    """CSR arrays (indptr, indices, data) from triplets"""
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, columns[order].astype(np.int32), weights[order].astype(np.float32)
+
+
+def _triplets(matrix):
+    indptr, indices, data = matrix
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr)), indices, data
+
+
+def _postings(matrix, columns):
+    """Column-major copy of a CSR matrix: for each term, the rows containing it"""
+    rows, indices, data = _triplets(matrix)
+    return _sparse(indices.astype(np.int64), rows, data, columns)
+
+
+def _ranges(starts, lengths):
+    """The concatenated ranges starts[i] .. starts[i] + lengths[i]"""
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+def _similarities(rows, matrix, postings, size):
+    """
+    Dot products of the given rows with every row, as a dense (len(rows), size) array
+
+    Each term of a row is multiplied against that term's postings, and the
+    products are summed per (row, video) cell, so the work is proportional to
+    the overlap between rows rather than to the vocabulary.
+    """
+    indptr, indices, data = matrix
+    column_indptr, column_rows, column_data = postings
+    lengths = indptr[rows + 1] - indptr[rows]
+    entries = _ranges(indptr[rows], lengths)
+    terms, weights = indices[entries], data[entries]
+
+    posting_lengths = column_indptr[terms + 1] - column_indptr[terms]
+    matches = _ranges(column_indptr[terms], posting_lengths)
+    cells = np.repeat(np.repeat(np.arange(len(rows)), lengths), posting_lengths) * size + column_rows[matches]
+    products = np.repeat(weights, posting_lengths) * column_data[matches]
+    return np.bincount(cells, weights=products, minlength=len(rows) * size).reshape(len(rows), size)
+
+
+def _top_k(scores, candidates, k):
+    """Best k candidates of each row by score, best first; missing neighbours are -1"""
+    size = scores.shape[1]
+    positions = np.full((scores.shape[0], k), -1, dtype=np.int32)
+    best_scores = np.zeros((scores.shape[0], k), dtype=np.float32)
+    take = min(k, size)
+    if take == 0:
+        return positions, best_scores
+    best = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+    best = np.take_along_axis(best, np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind='stable'), axis=1)
+    top_scores = np.take_along_axis(scores, best, axis=1)
+    top = np.take_along_axis(candidates, best, axis=1) if candidates is not None else best
+    found = top_scores > 0
+    positions[:, :take] = np.where(found, top, -1)
+    best_scores[:, :take] = np.where(found, top_scores, 0)
+    return positions, best_scores
+
+
+def _neighbours(rows, matrix, postings, size, k):
+    """Top k most similar other rows for each of rows, computed a block at a time"""
+    positions = np.full((len(rows), k), -1, dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    block = max(1, BLOCK_CELLS // max(size, 1))
+    for start in range(0, len(rows), block):
+        chunk = rows[start:start + block]
+        similarities = _similarities(chunk, matrix, postings, size)
+        similarities[np.arange(len(chunk)), chunk] = 0
+        positions[start:start + block], scores[start:start + block] = _top_k(similarities, None, k)
+    return positions, scores
+
+
+def _tag_neighbours(user_id, video_ids):
+    """
+    Sorted tag ids and each tag's most co-occurring tags
+
+    Tags are compared by cosine similarity of the videos they're on, so a
+    pair used together on most of their videos scores near 1.
+    """
+    rows_by_video = {video_id: row for row, video_id in enumerate(video_ids) if video_id >= 0}
+    links = [
+        (tag_id, rows_by_video[video_id])
+        for tag_id, video_id in VideoTag.objects.filter(video__user_id=user_id).values_list('tag_id', 'video_id')
+        if video_id in rows_by_video
+    ]
+    tag_ids = np.array(sorted({tag_id for tag_id, _ in links}), dtype=np.int64)
+    if not links:
+        return tag_ids, np.full((0, RELATED_TAGS_K), -1, np.int32), np.zeros((0, RELATED_TAGS_K), np.float32)
+
+    tag_rows = np.searchsorted(tag_ids, np.array([tag_id for tag_id, _ in links], dtype=np.int64))
+    video_rows = np.array([row for _, row in links], dtype=np.int64)
+    weights = (1 / np.sqrt(np.bincount(tag_rows, minlength=len(tag_ids))))[tag_rows].astype(np.float32)
+    matrix = _sparse(tag_rows, video_rows, weights, len(tag_ids))
+    postings = _sparse(video_rows, tag_rows, weights, len(video_ids))
+    return (tag_ids, *_neighbours(np.arange(len(tag_ids)), matrix, postings, len(tag_ids), RELATED_TAGS_K))
+
+
+def _lookup(video_ids):
+    """Sorted live video ids and their rows, for binary search"""
+    live = np.flatnonzero(video_ids >= 0)
+    order = np.argsort(video_ids[live], kind='stable')
+    return video_ids[live][order], live[order]
+
+
+def _full_build(ids, hashes, documents):
+    terms, idf = _fit(documents)
+    vocabulary = {term: column for column, term in enumerate(terms)}
+    matrix = _sparse(*_vectorize(documents, vocabulary, idf), len(documents))
+    postings = _postings(matrix, len(terms))
+    neighbours, scores = _neighbours(np.arange(len(documents)), matrix, postings, len(documents), SIMILAR_VIDEOS_K)
+    return {
+        'terms': terms,
+        'idf': idf,
+        'indptr': matrix[0], 'indices': matrix[1], 'data': matrix[2],
+        'video_ids': np.array(ids, dtype=np.int64),
+        'hashes': np.array(hashes, dtype=np.uint32),
+        'neighbours': neighbours,
+        'scores': scores,
+        'drift': 0,
+    }
+
+
+def _incremental_build(build, ids, hashes, documents):
+    """
+    Fold changed, added and removed videos into an existing build
+
+    Changed videos are re-vectorized against the existing vocabulary and
+    compared with the whole library; every other video's neighbour list is
+    then merged with its similarity to them. A video that loses a neighbour
+    may hold fewer than k until the next full build.
+    """
+    video_ids = build['video_ids']
+    row_of = {int(video_id): row for row, video_id in enumerate(video_ids) if video_id >= 0}
+    current = set(ids)
+
+    removed = [row for video_id, row in row_of.items() if video_id not in current]
+    changed, changed_documents, added = [], [], []
+    for video_id, text_hash, document in zip(ids, hashes, documents):
+        row = row_of.get(video_id)
+        if row is None:
+            added.append(video_id)
+            row = len(video_ids) + len(added) - 1
+        elif build['hashes'][row] == text_hash:
+            continue
+        changed.append(row)
+        changed_documents.append(document)
+    if not changed and not removed:
+        return build, 0
+
+    size = len(video_ids) + len(added)
+    video_ids = np.concatenate([video_ids, np.array(added, dtype=np.int64)])
+    video_ids[removed] = -1
+    new_hashes = np.concatenate([build['hashes'], np.zeros(len(added), dtype=np.uint32)])
+    hash_of = dict(zip(ids, hashes))
+    for row in changed:
+        new_hashes[row] = hash_of[int(video_ids[row])]
+
+    # Replace the changed rows' vectors and drop the removed ones
+    touched = np.array(sorted(changed + removed), dtype=np.int64)
+    vocabulary = {term: column for column, term in enumerate(build['terms'])}
+    rows, columns, data = _triplets((build['indptr'], build['indices'], build['data']))
+    keep = ~np.isin(rows, touched)
+    fresh_rows, fresh_columns, fresh_data = _vectorize(changed_documents, vocabulary, build['idf'])
+    matrix = _sparse(
+        np.concatenate([rows[keep], np.array(changed, dtype=np.int64)[fresh_rows]]),
+        np.concatenate([columns[keep], fresh_columns]),
+        np.concatenate([data[keep], fresh_data]),
+        size,
+    )
+    postings = _postings(matrix, len(build['terms']))
+
+    # Every other video's neighbours, merged with its similarity to the touched rows
+    pad = np.full((len(added), SIMILAR_VIDEOS_K), -1, dtype=np.int32)
+    neighbours = np.concatenate([build['neighbours'], pad])
+    scores = np.concatenate([build['scores'], np.zeros(pad.shape, dtype=np.float32)])
+    stale = np.isin(neighbours, touched)
+    neighbours[stale], scores[stale] = -1, 0
+    similarities = _similarities(touched, matrix, postings, size).astype(np.float32)
+    similarities[np.arange(len(touched)), touched] = 0
+    candidates = np.concatenate([neighbours, np.broadcast_to(touched.astype(np.int32), (size, len(touched)))], axis=1)
+    neighbours, scores = _top_k(np.concatenate([scores, similarities.T], axis=1), candidates, SIMILAR_VIDEOS_K)
+
+    # The touched rows' own neighbours come straight from their similarities
+    neighbours[touched], scores[touched] = _top_k(similarities, None, SIMILAR_VIDEOS_K)
+    neighbours[removed], scores[removed] = -1, 0
+
+    return {
+        **build,
+        'indptr': matrix[0], 'indices': matrix[1], 'data': matrix[2],
+        'video_ids': video_ids,
+        'hashes': new_hashes,
+        'neighbours': neighbours,
+        'scores': scores,
+        'drift': build['drift'] + len(touched),
+    }, len(touched)
+
+
+def _index_root():
+    return Path(settings.SIMILARITY_INDEX_DIR)
+
+
+def _user_dir(user_id):
+    return _index_root() / str(user_id)
+
+
+def _current_build_dir(user_id):
+    try:
+        stamp = (_user_dir(user_id) / 'CURRENT').read_text().strip()
+    except FileNotFoundError:
+        return None
+    return _user_dir(user_id) / stamp
+
+
+ARRAYS = (
+    'idf', 'indptr', 'indices', 'data', 'video_ids', 'hashes', 'neighbours', 'scores',
+    'lookup_ids', 'lookup_rows', 'tag_ids', 'tag_neighbours', 'tag_scores',
+)
+
+
+def _read_build(user_id):
+    """The user's current build, fully loaded for updating, or None"""
+    path = _current_build_dir(user_id)
+    if path is None:
+        return None
+    try:
+        build = {name: np.load(path / f'{name}.npy') for name in ARRAYS}
+        meta = json.loads((path / 'meta.json').read_text())
+    except (OSError, ValueError):
+        logger.warning(f"Unreadable similarity index at {path}; rebuilding")
+        return None
+    build['terms'] = meta['terms']
+    build['drift'] = meta['drift']
+    return build
+
+
+def _write_build(user_id, build):
+    """
+    Write a build to a new directory and point CURRENT at it
+
+    Readers keep using the previous build's mapped files until they see the
+    new version, and unlinking a mapped file doesn't affect them.
+    """
+    user_dir = _user_dir(user_id)
+    previous = _current_build_dir(user_id)
+    stamp = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    path = user_dir / stamp
+    path.mkdir(parents=True)
+    for name in ARRAYS:
+        np.save(path / f'{name}.npy', build[name])
+    (path / 'meta.json').write_text(json.dumps({
+        'terms': build['terms'],
+        'drift': build['drift'],
+        'built_at': int(time.time()),
+    }))
+
+    pointer = user_dir / f'CURRENT.{stamp}'
+    pointer.write_text(stamp)
+    os.replace(pointer, user_dir / 'CURRENT')
+
+    # Only the build this one replaces (or an abandoned one) is removed, never one still being written
+    for other in user_dir.iterdir():
+        if other.is_dir() and other.name != stamp and (
+            other == previous or time.time() - other.stat().st_mtime > STALE_BUILD_SECONDS
+        ):
+            shutil.rmtree(other, ignore_errors=True)
+
+
+def update_similarity_index(user_id, full=False):
+    """
+    Bring the user's similarity index up to date with their library
+
+    Returns 'full', 'incremental' or 'unchanged' (None when NumPy isn't
+    installed). Run in batch after syncs, never during a request.
+    """
+    if np is None:
+        return None
+    try:
+        ids, hashes, documents = _library(user_id)
+        build = None if full else _read_build(user_id)
+
+        if build is not None:
+            candidate, touched = _incremental_build(build, ids, hashes, documents)
+            limit = min(INCREMENTAL_MAX_ROWS, max(1, int(len(ids) * INCREMENTAL_MAX_SHARE)))
+            if candidate['drift'] > limit:
+                build = None
+            else:
+                mode = 'incremental' if touched else 'unchanged'
+                build = candidate
+
+        if build is None:
+            build = _full_build(ids, hashes, documents)
+            mode = 'full'
+
+        build['lookup_ids'], build['lookup_rows'] = _lookup(build['video_ids'])
+        tag_ids, tag_neighbours, tag_scores = _tag_neighbours(user_id, build['video_ids'])
+        if mode == 'unchanged' and (
+            not np.array_equal(tag_ids, build['tag_ids'])
+            or not np.array_equal(tag_neighbours, build['tag_neighbours'])
+        ):
+            mode = 'incremental'
+        build['tag_ids'], build['tag_neighbours'], build['tag_scores'] = tag_ids, tag_neighbours, tag_scores
+
+        if mode != 'unchanged':
+            _write_build(user_id, build)
+            bump_similarity_version(user_id)
+        logger.info(f"Similarity index for user id {user_id}: {mode} ({len(ids)} videos)")
+        return mode
+    except OSError as e:
+        logger.exception(f"Failed to write similarity index for user id {user_id}: {str(e)}")
+        return None
+
+
+class SimilarityIndex:
+    """
+    One user's precomputed neighbours, read from memory-mapped arrays
+
+    A lookup binary-searches the sorted id array and reads one row of k
+    neighbours, touching a few pages however large the library is.
+    """
+
+    def __init__(self, path):
+        def load(name):
+            return np.load(path / f'{name}.npy', mmap_mode='r')
+
+        self.video_ids = load('video_ids')
+        self.lookup_ids = load('lookup_ids')
+        self.lookup_rows = load('lookup_rows')
+        self.neighbours = load('neighbours')
+        self.scores = load('scores')
+        self.tag_ids = load('tag_ids')
+        self.tag_neighbours = load('tag_neighbours')
+        self.tag_scores = load('tag_scores')
+
+    @staticmethod
+    def _find(sorted_ids, value):
+        position = int(np.searchsorted(sorted_ids, value))
+        if position < len(sorted_ids) and sorted_ids[position] == value:
+            return position
+        return None
+
+    def similar_videos(self, video_id, k=SIMILAR_VIDEOS_K):
+        """[(video id, similarity), ...] of the videos most like video_id, best first"""
+        position = self._find(self.lookup_ids, video_id)
+        if position is None:
+            return []
+        row = self.lookup_rows[position]
+        neighbours, scores = self.neighbours[row, :k], self.scores[row, :k]
+        found = neighbours >= 0
+        video_ids, scores = self.video_ids[neighbours[found]], scores[found]
+        live = video_ids >= 0
+        return list(zip(video_ids[live].tolist(), scores[live].tolist()))
+
+    def related_tags(self, tag_id, k=RELATED_TAGS_K):
+        """[(tag id, co-occurrence), ...] of the tags most often used with tag_id"""
+        row = self._find(self.tag_ids, tag_id)
+        if row is None:
+            return []
+        neighbours, scores = self.tag_neighbours[row, :k], self.tag_scores[row, :k]
+        found = neighbours >= 0
+        return list(zip(self.tag_ids[neighbours[found]].tolist(), scores[found].tolist()))
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_similarity_index(user_id, similarity_version):
+    """
+    The user's SimilarityIndex, or None if it hasn't been built
+
+    Writing a build bumps the similarity version, so checking the version
+    picks up new builds without reading CURRENT on every request.
+    """
+    if np is None:
+        return None
+    with _indexes_lock:
+        cached = _indexes.get(user_id)
+        if cached is not None and cached[0] == similarity_version:
+            _indexes.move_to_end(user_id)
+            return cached[1]
+
+    path = _current_build_dir(user_id)
+    try:
+        index = SimilarityIndex(path) if path is not None else None
+    except (OSError, ValueError):
+        index = None
+    with _indexes_lock:
+        _indexes[user_id] = (similarity_version, index)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def similar_videos(video, similarity_version, k=SIMILAR_VIDEOS_K):
+    """[(video id, similarity), ...] of the videos whose text is most like video's"""
+    index = get_similarity_index(video.user_id, similarity_version)
+    return index.similar_videos(video.id, k) if index is not None else []
+
+
+def suggest_tags(video, tag_ids, similarity_version, limit=SUGGESTED_TAGS_LIMIT):
+    """
+    Tags the user is likely to add to video, as [{'id', 'name', 'video_count'}, ...]
+
+    Tags on similar videos score by how similar the video is, and tags often
+    used together with the video's own tags by how often; tags the video
+    already has are left out.
+    """
+    index = get_similarity_index(video.user_id, similarity_version)
+    if index is None:
+        return []
+
+    scores = Counter()
+    neighbours = dict(index.similar_videos(video.id))
+    if neighbours:
+        for video_pk, tag_id in VideoTag.objects.filter(video_id__in=neighbours).values_list('video_id', 'tag_id'):
+            scores[tag_id] += neighbours[video_pk]
+    for tag_id in tag_ids:
+        for related_id, score in index.related_tags(tag_id):
+            scores[related_id] += score
+    for tag_id in tag_ids:
+        scores.pop(tag_id, None)
+
+    best = [tag_id for tag_id, _ in scores.most_common(limit)]
+    if not best:
+        return []
+    tags = {
+        tag['id']: tag
+        for tag in Tag.objects.filter(user_id=video.user_id, id__in=best).values('id', 'name', 'video_count')
+    }
+    return [tags[tag_id] for tag_id in best if tag_id in tags]
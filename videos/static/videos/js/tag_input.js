@@ -0,0 +1,180 @@
+/**
+ * YouTuBoxd tag input
+ * Delegated handlers for every .tag-input-container on the page
+ */
+(function() {
+    const SUGGESTION_DELAY_MS = 300;
+
+    // Pending tag suggestion lookups, per tag input
+    const suggestionTimeouts = new WeakMap();
+
+    function containerOf(element) {
+        return element.closest('.tag-input-container');
+    }
+
+    function hideSuggestions(container) {
+        container.querySelector('.tag-suggestions').style.display = 'none';
+    }
+
+    function fetchTagSuggestions(query, container) {
+        const suggestionsDiv = container.querySelector('.tag-suggestions');
+        fetch(`/api/tags/?search=${encodeURIComponent(query)}`)
+            .then(response => response.json())
+            .then(tags => {
+                suggestionsDiv.innerHTML = '';
+                tags.forEach(tag => {
+                    const div = document.createElement('div');
+                    div.className = 'tag-suggestion';
+                    div.setAttribute('data-tag-id', tag.id);
+                    div.textContent = tag.name;
+                    suggestionsDiv.appendChild(div);
+                });
+                suggestionsDiv.style.display = tags.length ? 'block' : 'none';
+            });
+    }
+
+    function createAndAddTag(container, tagName) {
+        fetch('/api/tags/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ name: tagName })
+        })
+        .then(response => response.json())
+        .then(tag => {
+            addTagToVideo(container, tag.id);
+        });
+    }
+
+    function addTagToVideo(container, tagId) {
+        fetch(`/api/videos/${container.dataset.videoId}/add_tags/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ tag_ids: [tagId] })
+        })
+        .then(response => response.json())
+        .then(video => {
+            updateVideoTags(container, video.tags);
+        });
+    }
+
+    function removeTagFromVideo(container, tagId) {
+        fetch(`/api/videos/${container.dataset.videoId}/remove_tags/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ tag_ids: [tagId] })
+        })
+        .then(response => response.json())
+        .then(video => {
+            updateVideoTags(container, video.tags);
+        });
+    }
+
+    function updateVideoTags(container, tags) {
+        const tagsDiv = container.querySelector('.video-tags');
+        tagsDiv.innerHTML = '';
+
+        tags.forEach(tag => {
+            const tagSpan = document.createElement('span');
+            tagSpan.className = 'tag';
+            tagSpan.setAttribute('data-tag-id', tag.id);
+            tagSpan.appendChild(document.createTextNode(tag.name));
+
+            const removeButton = document.createElement('button');
+            removeButton.className = 'remove-tag';
+            removeButton.setAttribute('data-tag-id', tag.id);
+            removeButton.innerHTML = '&times;';
+            tagSpan.appendChild(removeButton);
+
+            tagsDiv.appendChild(tagSpan);
+        });
+    }
+
+    function getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+
+    document.addEventListener('click', function(e) {
+        const container = containerOf(e.target);
+
+        // Close suggestions when clicking outside
+        document.querySelectorAll('.tag-input-container').forEach(other => {
+            if (other !== container) {
+                hideSuggestions(other);
+            }
+        });
+        if (!container) {
+            return;
+        }
+
+        const removeButton = e.target.closest('.remove-tag');
+        if (removeButton) {
+            removeTagFromVideo(container, removeButton.dataset.tagId);
+            return;
+        }
+
+        const suggestion = e.target.closest('.tag-suggestion');
+        if (suggestion) {
+            addTagToVideo(container, suggestion.dataset.tagId);
+            container.querySelector('.tag-input').value = '';
+            hideSuggestions(container);
+            // Suggested tags disappear once added
+            if (suggestion.classList.contains('suggested-tag')) {
+                suggestion.remove();
+            }
+        }
+    });
+
+    // Suggest tags as the user types
+    document.addEventListener('input', function(e) {
+        const input = e.target;
+        if (!input.classList.contains('tag-input') || !containerOf(input)) {
+            return;
+        }
+        const container = containerOf(input);
+        clearTimeout(suggestionTimeouts.get(input));
+        const query = input.value.trim();
+
+        if (query.length < 2) {
+            hideSuggestions(container);
+            return;
+        }
+
+        suggestionTimeouts.set(input, setTimeout(() => {
+            fetchTagSuggestions(query, container);
+        }, SUGGESTION_DELAY_MS));
+    });
+
+    // Handle tag creation on Enter
+    document.addEventListener('keydown', function(e) {
+        const input = e.target;
+        if (e.key !== 'Enter' || !input.classList || !input.classList.contains('tag-input') || !containerOf(input)) {
+            return;
+        }
+        if (input.value.trim()) {
+            e.preventDefault();
+            createAndAddTag(containerOf(input), input.value.trim());
+            input.value = '';
+            hideSuggestions(containerOf(input));
+        }
+    });
+})();
@@ -0,0 +1,333 @@
+/**
+ * YouTuBoxd video cards
+ * One set of delegated handlers serves every .yt-video-card on the page,
+ * including cards added after load
+ */
+(function() {
+    const SUGGESTION_DELAY_MS = 300;
+
+    // Pending tag suggestion lookups, per tag input
+    const suggestionTimeouts = new WeakMap();
+
+    function cardOf(element) {
+        return element.closest('.yt-video-card');
+    }
+
+    function videoIdOf(card) {
+        return card.getAttribute('data-video-id');
+    }
+
+    // Edit description toggle (the full text isn't rendered in lists, so load it on first edit)
+    function editDescription(card) {
+        const textarea = card.querySelector('.description-textarea');
+        if (textarea.getAttribute('data-loaded') === 'false') {
+            fetch(`/api/videos/${videoIdOf(card)}/`)
+                .then(response => response.json())
+                .then(video => {
+                    textarea.value = video.custom_description || video.description || '';
+                    textarea.setAttribute('data-loaded', 'true');
+                });
+        }
+        card.querySelector('.video-description-display').style.display = 'none';
+        card.querySelector('.video-description-edit').style.display = 'block';
+    }
+
+    function cancelDescription(card) {
+        card.querySelector('.video-description-display').style.display = 'block';
+        card.querySelector('.video-description-edit').style.display = 'none';
+    }
+
+    // Save video description to the server
+    function saveDescription(card) {
+        const description = card.querySelector('.description-textarea').value;
+        fetch(`/api/videos/${videoIdOf(card)}/description/`, {
+            method: 'PATCH',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ custom_description: description })
+        })
+        .then(response => {
+            if (!response.ok) throw new Error('Failed to save description');
+            return response.json();
+        })
+        .then(data => {
+            card.querySelector('.video-description-display p').textContent = data.description_snippet;
+            cancelDescription(card);
+        })
+        .catch(error => {
+            console.error('Error saving description:', error);
+            alert('Failed to save description: ' + error.message);
+        });
+    }
+
+    // Toggle tag input dropdown
+    function toggleTagDropdown(card) {
+        const dropdown = card.querySelector('.tag-input-dropdown');
+        dropdown.style.display = dropdown.style.display === 'none' ? 'block' : 'none';
+        if (dropdown.style.display === 'block') {
+            const input = dropdown.querySelector('.tag-input');
+            input.focus();
+            if (!input.value.trim()) {
+                fetchSuggestedTags(card);
+            }
+        }
+    }
+
+    // Offer tags from similar videos and tags used together before anything is typed
+    function fetchSuggestedTags(card) {
+        fetch(`/api/videos/${videoIdOf(card)}/suggested_tags/`)
+            .then(response => response.json())
+            .then(tags => {
+                const suggestionsDiv = card.querySelector('.tag-suggestions');
+                if (card.querySelector('.tag-input').value.trim() || !Array.isArray(tags)) {
+                    return;
+                }
+                suggestionsDiv.innerHTML = '';
+                if (tags.length) {
+                    const heading = document.createElement('div');
+                    heading.className = 'tag-suggestions-heading';
+                    heading.textContent = 'Suggested';
+                    suggestionsDiv.appendChild(heading);
+                }
+                tags.forEach(tag => {
+                    const div = document.createElement('div');
+                    div.className = 'tag-suggestion';
+                    div.setAttribute('data-tag-id', tag.id);
+                    div.textContent = tag.name;
+                    suggestionsDiv.appendChild(div);
+                });
+            });
+    }
+
+    // Fetch tag suggestions based on input
+    function fetchTagSuggestions(query, card) {
+        fetch(`/api/tags/?search=${encodeURIComponent(query)}`)
+            .then(response => response.json())
+            .then(tags => {
+                const suggestionsDiv = card.querySelector('.tag-suggestions');
+                suggestionsDiv.innerHTML = '';
+
+                // Add "Create new tag" option if no exact match
+                const exactMatch = tags.some(tag => tag.name.toLowerCase() === query.toLowerCase());
+                if (!exactMatch && query.length > 0) {
+                    const createDiv = document.createElement('div');
+                    createDiv.className = 'tag-suggestion';
+                    createDiv.setAttribute('data-create-name', query);
+                    createDiv.innerHTML = '<i class="fas fa-plus-circle me-1"></i> ';
+                    createDiv.appendChild(document.createTextNode(`Create "${query}"`));
+                    suggestionsDiv.appendChild(createDiv);
+                }
+
+                // Add existing tags
+                tags.forEach(tag => {
+                    const div = document.createElement('div');
+                    div.className = 'tag-suggestion';
+                    div.setAttribute('data-tag-id', tag.id);
+                    div.textContent = tag.name;
+                    suggestionsDiv.appendChild(div);
+                });
+            });
+    }
+
+    // Create a new tag and add it to the video
+    function createAndAddTag(card, tagName) {
+        fetch('/api/tags/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ name: tagName })
+        })
+        .then(response => {
+            if (!response.ok) throw new Error('Failed to create tag');
+            return response.json();
+        })
+        .then(tag => {
+            addTagToVideo(card, tag.id);
+        })
+        .catch(error => {
+            console.error('Error creating tag:', error);
+            alert('Failed to create tag: ' + error.message);
+        });
+    }
+
+    // Add an existing tag to the video
+    function addTagToVideo(card, tagId) {
+        fetch(`/api/videos/${videoIdOf(card)}/add_tags/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ tag_ids: [tagId] })
+        })
+        .then(response => {
+            if (!response.ok) throw new Error('Failed to add tag to video');
+            return response.json();
+        })
+        .then(data => {
+            // Reset input and hide dropdown
+            card.querySelector('.tag-input').value = '';
+            card.querySelector('.tag-input-dropdown').style.display = 'none';
+            updateVideoTags(card, data.tags);
+        })
+        .catch(error => {
+            console.error('Error adding tag:', error);
+            alert('Failed to add tag: ' + error.message);
+        });
+    }
+
+    // Remove a tag from the video
+    function removeTagFromVideo(card, tagId) {
+        fetch(`/api/videos/${videoIdOf(card)}/remove_tags/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ tag_ids: [tagId] })
+        })
+        .then(response => {
+            if (!response.ok) throw new Error('Failed to remove tag from video');
+            return response.json();
+        })
+        .then(data => {
+            updateVideoTags(card, data.tags);
+        })
+        .catch(error => {
+            console.error('Error removing tag:', error);
+            alert('Failed to remove tag: ' + error.message);
+        });
+    }
+
+    // Update the tags display in the card; the remove buttons need no wiring
+    function updateVideoTags(card, tags) {
+        const tagsContainer = card.querySelector('.video-tags');
+        tagsContainer.innerHTML = '';
+
+        tags.forEach(tag => {
+            const tagSpan = document.createElement('span');
+            tagSpan.className = 'tag';
+            tagSpan.setAttribute('data-tag-id', tag.id);
+            tagSpan.appendChild(document.createTextNode(tag.name));
+
+            const removeButton = document.createElement('button');
+            removeButton.className = 'remove-tag';
+            removeButton.setAttribute('data-tag-id', tag.id);
+            removeButton.textContent = '×';
+            tagSpan.appendChild(removeButton);
+
+            tagsContainer.appendChild(tagSpan);
+        });
+    }
+
+    // Record that a video was opened on YouTube from its card
+    function recordWatch(card) {
+        if (!navigator.sendBeacon) {
+            return;
+        }
+        const data = new FormData();
+        data.append('video', videoIdOf(card));
+        data.append('source', 'card');
+        data.append('csrfmiddlewaretoken', getCookie('csrftoken'));
+        navigator.sendBeacon('/api/watch/', data);
+    }
+
+    // Helper function to get CSRF token
+    function getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+
+    const ACTIONS = {
+        'edit-description': editDescription,
+        'cancel-description': cancelDescription,
+        'save-description': saveDescription,
+        'add-tag': toggleTagDropdown,
+    };
+
+    document.addEventListener('click', function(e) {
+        const card = cardOf(e.target);
+
+        // Close tag dropdowns of every other card
+        document.querySelectorAll('.yt-video-card .tag-input-dropdown').forEach(dropdown => {
+            if (cardOf(dropdown) !== card) {
+                dropdown.style.display = 'none';
+            }
+        });
+        if (!card) {
+            return;
+        }
+
+        if (e.target.closest('.video-thumbnail')) {
+            recordWatch(card);
+            return;
+        }
+
+        const actionButton = e.target.closest('[data-action]');
+        if (actionButton && ACTIONS[actionButton.getAttribute('data-action')]) {
+            ACTIONS[actionButton.getAttribute('data-action')](card);
+            return;
+        }
+
+        const removeButton = e.target.closest('.remove-tag');
+        if (removeButton) {
+            removeTagFromVideo(card, removeButton.getAttribute('data-tag-id'));
+            return;
+        }
+
+        const suggestion = e.target.closest('.tag-suggestion');
+        if (suggestion) {
+            if (suggestion.hasAttribute('data-create-name')) {
+                createAndAddTag(card, suggestion.getAttribute('data-create-name'));
+            } else {
+                addTagToVideo(card, suggestion.getAttribute('data-tag-id'));
+            }
+        }
+    });
+
+    // Suggest tags as the user types
+    document.addEventListener('input', function(e) {
+        const input = e.target;
+        if (!input.classList.contains('tag-input') || !cardOf(input)) {
+            return;
+        }
+        const card = cardOf(input);
+        clearTimeout(suggestionTimeouts.get(input));
+        const query = input.value.trim();
+
+        if (query.length < 2) {
+            card.querySelector('.tag-suggestions').innerHTML = '';
+            return;
+        }
+
+        suggestionTimeouts.set(input, setTimeout(() => {
+            fetchTagSuggestions(query, card);
+        }, SUGGESTION_DELAY_MS));
+    });
+
+    // Create and add a tag on Enter
+    document.addEventListener('keydown', function(e) {
+        const input = e.target;
+        if (e.key !== 'Enter' || !input.classList || !input.classList.contains('tag-input') || !cardOf(input)) {
+            return;
+        }
+        if (input.value.trim()) {
+            e.preventDefault();
+            createAndAddTag(cardOf(input), input.value.trim());
+        }
+    });
+})();
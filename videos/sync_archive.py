@@ -0,0 +1,271 @@
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from .models import ArchivedResponse, Playlist, Video, make_description_snippet
+from .counters import reconcile_user_counters
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; blobs are gzipped without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that name the resource a page lists, in the order they're looked for
+RESOURCE_PARAMS = ('playlistId', 'myRating', 'mine', 'id')
+
+REPLAY_BATCH_SIZE = 1000
+
+# Columns a replay may overwrite; a video is only given the ones its sources set
+REPLAY_UPDATE_FIELDS = (
+    'title', 'description', 'youtube_description', 'thumbnail_url', 'published_at',
+    'channel_title', 'channel_id', 'playlist_id', 'playlist_name', 'is_liked', 'is_saved', 'is_history',
+)
+
+
+def archiving_enabled():
+    return bool(settings.SYNC_ARCHIVE_DIR)
+
+
+def resource_key(params):
+    """The resource a list request reads, e.g. 'playlistId=PL123'"""
+    for name in RESOURCE_PARAMS:
+        if params and params.get(name):
+            return f"{name}={params[name]}"
+    return ''
+
+
+def _blob_name(digest):
+    extension = 'zst' if zstandard is not None else 'gz'
+    return f"{digest[:2]}/{digest}.json.{extension}"
+
+
+def _compress(body):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(body)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def read_blob(blob):
+    """The decoded JSON page stored in a blob"""
+    with open(os.path.join(settings.SYNC_ARCHIVE_DIR, blob), 'rb') as f:
+        data = f.read()
+    if blob.endswith('.zst'):
+        if zstandard is None:
+            raise OSError(f"Reading {blob} needs zstandard (pip install zstandard)")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+def archive_response(user_id, url, params, body):
+    """
+    Keep one raw API page, if archiving is on
+
+    Blobs are named by the SHA-256 of the body, so a page that comes back
+    unchanged, from a later sync or for another user following the same
+    public playlist, is stored once. Failures are logged and never fail
+    the sync.
+    """
+    if not archiving_enabled():
+        return
+    try:
+        etag = json.loads(body).get('etag', '')
+        digest = hashlib.sha256(body).hexdigest()
+        blob = _blob_name(digest)
+        path = os.path.join(settings.SYNC_ARCHIVE_DIR, blob)
+        if os.path.exists(path):
+            # A blob's mtime is when it was last archived, which pruning goes by
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_compress(body))
+            os.replace(tmp_path, path)
+
+        ArchivedResponse.objects.update_or_create(
+            user_id=user_id,
+            endpoint=url.rstrip('/').rsplit('/', 1)[-1],
+            resource=resource_key(params),
+            page_token=(params or {}).get('pageToken', ''),
+            etag=etag,
+            defaults={'blob': blob, 'fetched_at': timezone.now()}
+        )
+    except (OSError, ValueError, DatabaseError) as e:
+        logger.warning(f"Couldn't archive {url} page for user {user_id}: {str(e)}")
+
+
+def archived_pages(user_id, endpoint, resource):
+    """
+    The latest archived listing of a resource, page by page
+
+    Starts from the newest copy of the first page and follows each page's
+    nextPageToken to the newest copy of the next. Stops early if a page
+    was never archived, e.g. because its sync failed.
+    """
+    newest = {}
+    for row in ArchivedResponse.objects.filter(
+        user_id=user_id, endpoint=endpoint, resource=resource
+    ).order_by('-fetched_at').only('page_token', 'blob'):
+        newest.setdefault(row.page_token, row.blob)
+
+    page_token = ''
+    seen = set()
+    while page_token in newest and page_token not in seen:
+        seen.add(page_token)
+        data = read_blob(newest[page_token])
+        yield data
+        page_token = data.get('nextPageToken') or None
+
+
+def _replay_rows(user_id):
+    """
+    {video_id: Video fields} rebuilt from the archive, in sync order
+
+    Sources are applied in the order a sync runs them, so fields set by a
+    later source (e.g. Watch Later's playlist) win, and flags accumulate.
+    Returns (rows, playlists, skipped items).
+    """
+    from .youtube_api import video_defaults_from_snippet
+
+    rows = {}
+    skipped = 0
+
+    def add(video_id, snippet, extra):
+        nonlocal skipped
+        if not video_id:
+            return
+        try:
+            defaults = video_defaults_from_snippet(snippet)
+        except (ValueError, TypeError):
+            skipped += 1
+            return
+        rows.setdefault(video_id, {}).update(defaults, **extra)
+
+    playlists = [
+        item for page in archived_pages(user_id, 'playlists', resource_key({'mine': 'true'}))
+        for item in page.get('items', [])
+    ]
+    for playlist in playlists:
+        playlist_id = playlist.get('id')
+        title = playlist.get('snippet', {}).get('title')
+        for page in archived_pages(user_id, 'playlistItems', resource_key({'playlistId': playlist_id})):
+            for item in page.get('items', []):
+                snippet = item.get('snippet', {})
+                add(snippet.get('resourceId', {}).get('videoId'), snippet, {'playlist_id': playlist_id, 'playlist_name': title})
+
+    for page in archived_pages(user_id, 'videos', resource_key({'myRating': 'like'})):
+        for item in page.get('items', []):
+            add(item.get('id'), item.get('snippet', {}), {'is_liked': True})
+
+    for playlist_id, extra in (
+        ('WL', {'is_saved': True, 'playlist_id': 'WL', 'playlist_name': 'Watch Later'}),
+        ('HL', {'is_history': True}),
+    ):
+        for page in archived_pages(user_id, 'playlistItems', resource_key({'playlistId': playlist_id})):
+            for item in page.get('items', []):
+                snippet = item.get('snippet', {})
+                add(snippet.get('resourceId', {}).get('videoId'), snippet, extra)
+
+    return rows, playlists, skipped
+
+
+def _upsert_videos(user, rows):
+    """Bulk upsert rebuilt rows, one statement per set of fields the rows carry"""
+    custom = dict(
+        Video.objects.filter(user=user, video_id__in=list(rows)).values_list('video_id', 'custom_description')
+    )
+    groups = {}
+    for video_id, fields in rows.items():
+        groups.setdefault(tuple(sorted(fields)), []).append(video_id)
+
+    for field_names, video_ids in groups.items():
+        Video.objects.bulk_create(
+            [
+                Video(
+                    user=user, video_id=video_id, **rows[video_id],
+                    description_snippet=make_description_snippet(custom.get(video_id), rows[video_id].get('description')),
+                )
+                for video_id in video_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'video_id'],
+            update_fields=[name for name in field_names if name in REPLAY_UPDATE_FIELDS] + ['description_snippet', 'updated_at'],
+        )
+
+
+def replay_archive(user, batch_size=REPLAY_BATCH_SIZE):
+    """
+    Rebuild a user's videos and playlists from their archived API pages
+
+    Runs the current snippet mapping over the newest archived listing of
+    every source and upserts the result in batches, without calling the
+    API. It only adds and updates: flags on videos missing from the
+    archive are left to the next live sync. Returns (videos, playlists,
+    skipped items).
+    """
+    rows, playlists, skipped = _replay_rows(user.id)
+    video_ids = list(rows)
+
+    with transaction.atomic():
+        Playlist.objects.bulk_create(
+            [
+                Playlist(
+                    user=user,
+                    playlist_id=playlist['id'],
+                    title=playlist.get('snippet', {}).get('title', 'Untitled Playlist'),
+                    description=playlist.get('snippet', {}).get('description', ''),
+                    thumbnail_url=playlist.get('snippet', {}).get('thumbnails', {}).get('high', {}).get('url', ''),
+                    item_count=playlist.get('contentDetails', {}).get('itemCount', 0),
+                    youtube_channel_id=playlist.get('snippet', {}).get('channelId', ''),
+                )
+                for playlist in playlists if playlist.get('id')
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'playlist_id'],
+            update_fields=['title', 'description', 'thumbnail_url', 'item_count', 'youtube_channel_id', 'updated_at'],
+        )
+        for start in range(0, len(video_ids), batch_size):
+            _upsert_videos(user, {video_id: rows[video_id] for video_id in video_ids[start:start + batch_size]})
+        reconcile_user_counters(user.id)
+
+    logger.info(f"Replayed {len(rows)} videos and {len(playlists)} playlists from the archive for user {user.username}")
+    return len(rows), len(playlists), skipped
+
+
+def prune_archive(days):
+    """
+    Drop archived pages fetched more than days ago, then their unreferenced blobs
+
+    Only blobs last archived before the cutoff are removed, so one a sync
+    is writing or reusing right now is never pulled from under it.
+    Returns (pages, blobs) deleted.
+    """
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    pages = ArchivedResponse.objects.filter(fetched_at__lt=cutoff).delete()[0]
+
+    root = settings.SYNC_ARCHIVE_DIR
+    if not root or not os.path.isdir(root):
+        return pages, 0
+    referenced = set(ArchivedResponse.objects.values_list('blob', flat=True).distinct())
+    blobs = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            blob = os.path.relpath(path, root).replace(os.sep, '/')
+            try:
+                if blob not in referenced and os.path.getmtime(path) < cutoff.timestamp():
+                    os.remove(path)
+                    blobs += 1
+            except OSError as e:
+                logger.warning(f"Couldn't remove archived blob {blob}: {str(e)}")
+    return pages, blobs
@@ -0,0 +1,107 @@
+import datetime
+import logging
+from django.db.models import F
+from django.utils import timezone
+from .models import SyncCheckpoint, SyncDeadLetter
+
+logger = logging.getLogger(__name__)
+
+# A checkpoint started longer ago than this is discarded rather than resumed, since
+# playlists it marked as done may have changed since
+CHECKPOINT_MAX_AGE = datetime.timedelta(hours=6)
+
+# Dead letters still failing after this many attempts are left for someone to look at
+MAX_DEAD_LETTER_ATTEMPTS = 5
+
+# The videos endpoint accepts at most this many ids per request
+RETRY_BATCH_SIZE = 50
+
+
+def resume_checkpoint(user_id, source):
+    """
+    The checkpoint a sync of source should work from
+
+    An unfinished checkpoint started within CHECKPOINT_MAX_AGE is resumed;
+    otherwise the sync starts from an empty one. checkpoint.resumed says
+    whether there was progress to resume. Age counts from the start of the
+    first run, so a source that keeps failing still gets a full pass.
+    """
+    checkpoint = SyncCheckpoint.objects.filter(user_id=user_id, source=source).first()
+    if checkpoint is not None and timezone.now() - checkpoint.started_at <= CHECKPOINT_MAX_AGE:
+        checkpoint.resumed = bool(checkpoint.completed_playlists or checkpoint.page_token)
+        if checkpoint.resumed:
+            logger.info(
+                f"Resuming {source} sync for user {user_id} from checkpoint: "
+                f"{len(checkpoint.completed_playlists)} playlists done, {checkpoint.items_written} items written"
+            )
+        return checkpoint
+
+    checkpoint, _ = SyncCheckpoint.objects.update_or_create(
+        user_id=user_id, source=source,
+        defaults={
+            'started_at': timezone.now(),
+            'completed_playlists': [],
+            'playlist_id': '',
+            'page_token': '',
+            'items_written': 0,
+            'items_failed': 0,
+        }
+    )
+    checkpoint.resumed = False
+    return checkpoint
+
+
+def save_checkpoint(checkpoint, **fields):
+    """Record progress on a checkpoint, e.g. save_checkpoint(checkpoint, page_token=token)"""
+    for field, value in fields.items():
+        setattr(checkpoint, field, value)
+    checkpoint.save(update_fields=[*fields, 'updated_at'])
+
+
+def record_page(checkpoint, next_page_token, written, failed, playlist_id=''):
+    """Record a finished page of items, and where the next one starts"""
+    save_checkpoint(
+        checkpoint,
+        playlist_id=playlist_id,
+        page_token=next_page_token or '',
+        items_written=checkpoint.items_written + written,
+        items_failed=checkpoint.items_failed + failed,
+    )
+
+
+def clear_checkpoint(user_id, source):
+    """Drop a source's checkpoint once a sync of it has completed"""
+    SyncCheckpoint.objects.filter(user_id=user_id, source=source).delete()
+
+
+def record_dead_letter(user_id, source, video_id, payload, extra, error):
+    """
+    Keep an item a sync couldn't save so retry_dead_letters can try it again
+
+    An item that fails again on a later sync updates its existing record
+    and counts as another attempt.
+    """
+    now = timezone.now()
+    updated = SyncDeadLetter.objects.filter(user_id=user_id, source=source, video_id=video_id).update(
+        payload=payload, extra=extra, error=str(error), attempts=F('attempts') + 1, last_attempt_at=now
+    )
+    if not updated:
+        SyncDeadLetter.objects.create(
+            user_id=user_id, source=source, video_id=video_id,
+            payload=payload, extra=extra, error=str(error), last_attempt_at=now
+        )
+    logger.warning(f"Dead-lettered {source} item {video_id} for user {user_id}: {error}")
+
+
+def pending_dead_letters(user_id):
+    """The user's dead letters that haven't used up their attempts, oldest first"""
+    return SyncDeadLetter.objects.filter(
+        user_id=user_id, attempts__lt=MAX_DEAD_LETTER_ATTEMPTS
+    ).order_by('created_at')
+
+
+def dead_letter_failed(letter, error):
+    """Count another failed attempt at a dead letter"""
+    SyncDeadLetter.objects.filter(id=letter.id).update(
+        error=str(error), attempts=F('attempts') + 1, last_attempt_at=timezone.now()
+    )
@@ -0,0 +1,59 @@
+import json
+import logging
+import queue
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class SyncEventBus:
+    """
+    In-process publish/subscribe bus for sync progress events
+
+    Publishers (the YouTubeAPI sync methods) push events keyed by user ID;
+    each subscriber gets its own bounded queue so a slow reader never blocks
+    a sync. Events for a user with no subscribers are simply dropped.
+    """
+    MAX_QUEUED_EVENTS = 1000
+
+    def __init__(self):
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Register a new subscriber queue for a user's sync events"""
+        subscriber = queue.Queue(maxsize=self.MAX_QUEUED_EVENTS)
+        with self._lock:
+            self._subscribers[user_id].append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        """Remove a subscriber queue"""
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id, event, **data):
+        """Send an event to every subscriber of a user"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, []))
+
+        message = {'event': event, **data}
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                logger.warning(f"Dropping sync event '{event}' for user {user_id}: subscriber queue full")
+
+
+def format_sse(message):
+    """Encode an event dict as a server-sent events frame"""
+    return f"event: {message['event']}\ndata: {json.dumps(message)}\n\n"
+
+
+# Process-wide bus shared by the sync pipeline and the streaming view
+sync_event_bus = SyncEventBus()
@@ -0,0 +1,169 @@
+import asyncio
+import datetime
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from .models import SyncLock
+
+logger = logging.getLogger(__name__)
+
+# How often a waiting request re-checks a sync running in another process
+WAIT_POLL_SECONDS = 1
+
+
+def _lease():
+    return datetime.timedelta(seconds=settings.SYNC_LOCK_LEASE_SECONDS)
+
+
+def acquire_sync_lock(user_id, sync_type):
+    """
+    Take the user's sync lock, returning an owner token or None if a sync is running
+
+    The lock is a lease on the user's SyncLock row, claimed with a single
+    conditional UPDATE so it is atomic across processes: Postgres row-locks
+    the row for the update and SQLite serializes writers. A lease that
+    wasn't renewed (the process died) can be taken over once it expires.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    SyncLock.objects.bulk_create([SyncLock(user_id=user_id)], ignore_conflicts=True)
+    acquired = SyncLock.objects.filter(user_id=user_id).filter(
+        Q(owner='') | Q(expires_at__lte=now)
+    ).update(
+        owner=token,
+        sync_type=sync_type,
+        started_at=now,
+        expires_at=now + _lease(),
+        finished_at=None,
+        last_success=None
+    )
+    return token if acquired else None
+
+
+def renew_sync_lock(user_id, token):
+    """Extend a held lease; returns False if it was lost to another process"""
+    return bool(SyncLock.objects.filter(user_id=user_id, owner=token).update(
+        expires_at=timezone.now() + _lease()
+    ))
+
+
+def release_sync_lock(user_id, token, success):
+    """Release a held lease, recording the sync's outcome for requests waiting on it"""
+    SyncLock.objects.filter(user_id=user_id, owner=token).update(
+        owner='',
+        expires_at=None,
+        finished_at=timezone.now(),
+        last_success=success
+    )
+
+
+def get_sync_status(user_id):
+    """Whether a sync is running for the user, and the outcome of the latest one"""
+    lock = SyncLock.objects.filter(user_id=user_id).first()
+    if lock is None:
+        return {'running': False, 'sync_type': None, 'started_at': None, 'finished_at': None, 'success': None}
+    return {
+        'running': bool(lock.owner) and lock.expires_at > timezone.now(),
+        'sync_type': lock.sync_type or None,
+        'started_at': lock.started_at,
+        'finished_at': lock.finished_at,
+        'success': lock.last_success,
+    }
+
+
+def locked_user_ids():
+    """Ids of the users a sync is running for, in any process"""
+    return set(SyncLock.objects.exclude(owner='').filter(
+        expires_at__gt=timezone.now()
+    ).values_list('user_id', flat=True))
+
+
+def wait_for_sync(user_id):
+    """Block until the user's running sync finishes (or its lease expires) and return its status"""
+    status = get_sync_status(user_id)
+    while status['running']:
+        time.sleep(WAIT_POLL_SECONDS)
+        status = get_sync_status(user_id)
+    return status
+
+
+@contextmanager
+def _heartbeat(user_id, token):
+    """Renew the lease in a background thread while the body runs"""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.SYNC_LOCK_LEASE_SECONDS / 3):
+                if not renew_sync_lock(user_id, token):
+                    logger.warning(f"Lost sync lock for user id {user_id}")
+                    break
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_exclusive_sync(user_id, sync_type, sync):
+    """
+    Run sync() while holding the user's sync lock
+
+    Returns (started, success); started is False, and sync() isn't called,
+    if another request or worker is already syncing this user.
+    """
+    token = acquire_sync_lock(user_id, sync_type)
+    if token is None:
+        return False, None
+
+    success = False
+    try:
+        with _heartbeat(user_id, token):
+            success = bool(sync())
+        return True, success
+    finally:
+        release_sync_lock(user_id, token, success)
+
+
+async def arun_exclusive_sync(user_id, sync_type, sync):
+    """Async counterpart of run_exclusive_sync for a coroutine function"""
+    token = await sync_to_async(acquire_sync_lock)(user_id, sync_type)
+    if token is None:
+        return False, None
+
+    async def beat():
+        while True:
+            await asyncio.sleep(settings.SYNC_LOCK_LEASE_SECONDS / 3)
+            if not await sync_to_async(renew_sync_lock)(user_id, token):
+                logger.warning(f"Lost sync lock for user id {user_id}")
+                return
+
+    heartbeat = asyncio.create_task(beat())
+    success = False
+    try:
+        success = bool(await sync())
+        return True, success
+    finally:
+        heartbeat.cancel()
+        await sync_to_async(release_sync_lock)(user_id, token, success)
+
+
+async def await_sync(user_id):
+    """Async counterpart of wait_for_sync"""
+    status = await sync_to_async(get_sync_status)(user_id)
+    while status['running']:
+        await asyncio.sleep(WAIT_POLL_SECONDS)
+        status = await sync_to_async(get_sync_status)(user_id)
+    return status
@@ -0,0 +1,106 @@
+import datetime
+import logging
+import zlib
+from django.contrib.auth.models import User
+from django.utils import timezone
+from .models import SyncState
+
+logger = logging.getLogger(__name__)
+
+SYNC_SOURCES = tuple(source for source, _ in SyncState.SOURCE_CHOICES)
+
+# (time since last login, resync interval), most active users first
+ACTIVITY_CADENCE = (
+    (datetime.timedelta(days=1), datetime.timedelta(hours=1)),
+    (datetime.timedelta(days=7), datetime.timedelta(hours=6)),
+    (datetime.timedelta(days=30), datetime.timedelta(days=1)),
+)
+INACTIVE_INTERVAL = datetime.timedelta(days=3)
+
+# Failed syncs back off exponentially, up to 2**MAX_BACKOFF_EXPONENT intervals
+MAX_BACKOFF_EXPONENT = 4
+
+# Each user/source is shifted by up to this fraction of its interval
+JITTER_FRACTION = 0.1
+
+
+def sync_interval(last_login, now=None):
+    """How often a user's library should be resynced, based on when they last logged in"""
+    if last_login is None:
+        return INACTIVE_INTERVAL
+    idle = (now or timezone.now()) - last_login
+    for max_idle, interval in ACTIVITY_CADENCE:
+        if idle <= max_idle:
+            return interval
+    return INACTIVE_INTERVAL
+
+
+def _phase(user_id, source):
+    """Stable position in [0, 1) for a user/source, used to spread syncs out"""
+    return zlib.crc32(f"{user_id}:{source}".encode()) / 2 ** 32
+
+
+def next_sync_time(user_id, source, last_login, failures=0, now=None):
+    """When a user/source should next be synced after a sync finishing now"""
+    now = now or timezone.now()
+    interval = sync_interval(last_login, now) * 2 ** min(failures, MAX_BACKOFF_EXPONENT)
+    jitter = (_phase(user_id, source) * 2 - 1) * JITTER_FRACTION
+    return now + interval * (1 + jitter)
+
+
+def initial_sync_time(user_id, source, last_login, now=None):
+    """
+    First scheduled sync for a user/source that has never been tracked
+
+    Spread across a whole interval so enabling the scheduler doesn't sync
+    every library at once.
+    """
+    now = now or timezone.now()
+    return now + sync_interval(last_login, now) * _phase(user_id, source)
+
+
+def _last_login(user_id):
+    return User.objects.filter(id=user_id).values_list('last_login', flat=True).first()
+
+
+def record_sync_started(user_id, source):
+    SyncState.objects.update_or_create(
+        user_id=user_id, source=source,
+        defaults={'last_started_at': timezone.now()}
+    )
+
+
+def record_sync_finished(user_id, source, success):
+    """Store a sync's outcome and schedule the next one"""
+    now = timezone.now()
+    state, _ = SyncState.objects.get_or_create(user_id=user_id, source=source)
+    state.consecutive_failures = 0 if success else state.consecutive_failures + 1
+    state.last_finished_at = now
+    state.last_success = success
+    state.next_sync_at = next_sync_time(
+        user_id, source, _last_login(user_id), state.consecutive_failures, now
+    )
+    state.save()
+    return state
+
+
+def postpone_sync(user_id, source, delay):
+    """Push a user/source's next sync back by delay without counting it as a failure"""
+    SyncState.objects.filter(user_id=user_id, source=source).update(next_sync_at=timezone.now() + delay)
+
+
+def ensure_sync_states():
+    """Create scheduler rows for every user with a token; returns the number created"""
+    now = timezone.now()
+    tracked = set(SyncState.objects.values_list('user_id', 'source'))
+    new_states = [
+        SyncState(
+            user_id=user_id, source=source,
+            next_sync_at=initial_sync_time(user_id, source, last_login, now)
+        )
+        for user_id, last_login in User.objects.filter(token__isnull=False).values_list('id', 'last_login')
+        for source in SYNC_SOURCES
+        if (user_id, source) not in tracked
+    ]
+    SyncState.objects.bulk_create(new_states, ignore_conflicts=True)
+    return len(new_states)
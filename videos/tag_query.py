@@ -0,0 +1,271 @@
+import re
+import threading
+from collections import OrderedDict
+from django.db.models import Q
+from .models import Video
+
+# Results rendered for one query; the count covers every match
+QUERY_PAGE_SIZE = 200
+
+# Users whose bitmap index is kept in memory per process
+INDEX_CACHE_SIZE = 64
+
+FIELDS = ('tag', 'channel', 'playlist', 'is')
+FLAGS = {
+    'liked': Q(is_liked=True),
+    'saved': Q(is_saved=True),
+    'history': Q(is_history=True),
+    # Tags are matched through VideoTag, like the tag pages and Tag.video_count
+    'tagged': Q(video_tags__isnull=False),
+}
+OPERATORS = ('AND', 'OR', 'NOT')
+
+TOKEN_PATTERN = re.compile(r'''
+    \s*(?:
+        (?P<paren>[()])
+      | (?P<field>\w+):(?:"(?P<quoted>[^"]*)"|(?P<value>[^\s()]+))
+      | "(?P<phrase>[^"]*)"
+      | (?P<word>-?[^\s()]+)
+    )
+''', re.VERBOSE)
+
+
+class TagQueryError(Exception):
+    """Raised for queries that can't be parsed"""
+
+
+def is_boolean_query(text):
+    """Whether a search box query uses the query language rather than plain text search"""
+    return any(
+        (match.group('field') or '').lower() in FIELDS
+        or match.group('paren')
+        or match.group('word') in OPERATORS
+        for match in TOKEN_PATTERN.finditer(text)
+    )
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise TagQueryError(f"Unexpected '{text[position:]}'")
+        position = match.end()
+        if match.group('paren'):
+            tokens.append(('paren', match.group('paren')))
+        elif match.group('field'):
+            field = match.group('field').lower()
+            if field not in FIELDS:
+                raise TagQueryError(f"Unknown field '{field}:'; use {', '.join(f + ':' for f in FIELDS)}")
+            value = match.group('quoted') if match.group('quoted') is not None else match.group('value')
+            tokens.append(('term', (field, value.lower())))
+        elif match.group('phrase') is not None:
+            tokens.append(('term', ('text', match.group('phrase').lower())))
+        else:
+            word = match.group('word')
+            if word in OPERATORS:
+                tokens.append(('op', word))
+            elif word.startswith('-') and len(word) > 1:
+                tokens.append(('op', 'NOT'))
+                tokens.extend(tokenize(word[1:]))
+            elif word.lower() in FLAGS:
+                tokens.append(('term', ('is', word.lower())))
+            else:
+                tokens.append(('term', ('text', word.lower())))
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser producing a nested tuple tree
+
+        query := and ('OR' and)*
+        and   := not (['AND'] not)*      adjacent terms are ANDed
+        not   := 'NOT' not | atom
+        atom  := '(' query ')' | term
+
+    so 'tag:music AND (tag:live OR channel:foo) NOT liked' reads as
+    music AND (live OR foo) AND NOT liked.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise TagQueryError("Empty query")
+        tree = self.query()
+        if self.position < len(self.tokens):
+            raise TagQueryError(f"Unexpected '{self.peek()[1]}'")
+        return tree
+
+    def query(self):
+        tree = self.conjunction()
+        while self.peek() == ('op', 'OR'):
+            self.take()
+            tree = ('or', tree, self.conjunction())
+        return tree
+
+    def conjunction(self):
+        tree = self.negation()
+        while True:
+            kind, value = self.peek()
+            if kind == 'op' and value == 'AND':
+                self.take()
+            elif not (kind == 'term' or (kind == 'op' and value == 'NOT') or (kind, value) == ('paren', '(')):
+                return tree
+            tree = ('and', tree, self.negation())
+
+    def negation(self):
+        if self.peek() == ('op', 'NOT'):
+            self.take()
+            return ('not', self.negation())
+        return self.atom()
+
+    def atom(self):
+        kind, value = self.take()
+        if (kind, value) == ('paren', '('):
+            tree = self.query()
+            if self.take() != ('paren', ')'):
+                raise TagQueryError("Missing ')'")
+            return tree
+        if kind == 'term':
+            return ('term', value)
+        raise TagQueryError("Query ends too early" if kind is None else f"Unexpected '{value}'")
+
+
+def parse_query(text):
+    return _Parser(tokenize(text)).parse()
+
+
+def _bitmap(positions, size):
+    """Pack row positions into an int whose bit i is set for position i"""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class BitmapIndex:
+    """
+    Bitmaps of one user's videos, one bit per video
+
+    Bit positions follow the library's display order (newest first), so a
+    result's set bits already list its videos in order. Each tag, channel,
+    playlist and flag term's bitmap is loaded with one query the first time
+    a query uses it, and kept until the library changes.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.video_ids = list(
+            Video.objects.filter(user_id=user_id).order_by('-published_at', '-id').values_list('id', flat=True)
+        )
+        self.positions = {video_id: position for position, video_id in enumerate(self.video_ids)}
+        self.all = (1 << len(self.video_ids)) - 1
+        self.bitmaps = {}
+        self.lock = threading.Lock()
+
+    def _load(self, videos):
+        ids = videos.order_by().values_list('id', flat=True).distinct()
+        return _bitmap((self.positions[video_id] for video_id in ids if video_id in self.positions), len(self.video_ids))
+
+    def _term_videos(self, field, value):
+        """The user's videos matching one term, as a queryset"""
+        videos = Video.objects.filter(user_id=self.user_id)
+        if field == 'is':
+            if value not in FLAGS:
+                raise TagQueryError(f"Unknown flag '{value}'; use {', '.join(FLAGS)}")
+            return videos.filter(FLAGS[value])
+        if field == 'tag':
+            return videos.filter(video_tags__tag__name__icontains=value)
+        if field == 'channel':
+            return videos.filter(Q(channel_title__icontains=value) | Q(channel_id__iexact=value))
+        if field == 'playlist':
+            return videos.filter(Q(playlist_name__icontains=value) | Q(playlist_id__iexact=value))
+        return videos.filter(
+            Q(title__icontains=value) | Q(description__icontains=value) | Q(channel_title__icontains=value)
+        )
+
+    def _term_bitmap(self, field, value):
+        # Free text isn't a stored term, so it's matched fresh every time
+        if field == 'text':
+            return self._load(self._term_videos(field, value))
+
+        with self.lock:
+            bitmap = self.bitmaps.get((field, value))
+        if bitmap is None:
+            bitmap = self._load(self._term_videos(field, value))
+            with self.lock:
+                self.bitmaps[(field, value)] = bitmap
+        return bitmap
+
+    def evaluate(self, tree):
+        """Compute the bitmap of the videos matching a parsed query"""
+        kind = tree[0]
+        if kind == 'term':
+            return self._term_bitmap(*tree[1])
+        if kind == 'not':
+            return self.all & ~self.evaluate(tree[1])
+        left, right = self.evaluate(tree[1]), self.evaluate(tree[2])
+        return left & right if kind == 'and' else left | right
+
+    def video_ids_for(self, bitmap, offset=0, limit=QUERY_PAGE_SIZE):
+        """Ids of the videos set in bitmap, in display order, from offset"""
+        bits = bin(bitmap)[:1:-1]  # lowest bit first
+        ids = []
+        position = bits.find('1')
+        skipped = 0
+        while position != -1 and len(ids) < limit:
+            if skipped >= offset:
+                ids.append(self.video_ids[position])
+            else:
+                skipped += 1
+            position = bits.find('1', position + 1)
+        return ids
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_bitmap_index(user_id, library_version):
+    """The user's BitmapIndex, rebuilt lazily when their library version changes"""
+    with _indexes_lock:
+        cached = _indexes.get(user_id)
+        if cached is not None and cached[0] == library_version:
+            _indexes.move_to_end(user_id)
+            return cached[1]
+
+    index = BitmapIndex(user_id)
+    with _indexes_lock:
+        _indexes[user_id] = (library_version, index)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def run_query(user_id, library_version, text, offset=0, limit=QUERY_PAGE_SIZE):
+    """
+    Evaluate a query, returning (total matches, one page of videos in display order)
+
+    The boolean work happens on in-memory bitmaps; only the page of videos
+    is read from the database, with a single fetch by id.
+    """
+    index = get_bitmap_index(user_id, library_version)
+    bitmap = index.evaluate(parse_query(text))
+    ids = index.video_ids_for(bitmap, offset, limit)
+    videos = Video.objects.filter(id__in=ids).for_list().in_bulk()
+    return bitmap.bit_count(), [videos[video_id] for video_id in ids if video_id in videos]
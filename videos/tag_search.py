@@ -0,0 +1,154 @@
+import bisect
+import heapq
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from .conditional import user_library_version
+from .models import Tag
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Share of trigrams a tag must have in common with the query to be a fuzzy candidate,
+# and the share above which it matches without being within typo distance
+MIN_SIMILARITY = 0.2
+STRONG_SIMILARITY = 0.5
+
+# Users whose index is kept in memory per process
+INDEX_CACHE_SIZE = 256
+
+
+def trigrams(text):
+    """Trigrams of text padded like pg_trgm, so short words and word starts still match"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def typo_distance(query, name):
+    """
+    Edit distance (with transpositions) between query and the start of name
+
+    Names are compared as far as the user has typed, so 'musci' is one typo
+    away from 'music video'. Zero if the query appears anywhere in the name.
+    """
+    if query in name:
+        return 0
+    best = len(query)
+    for end in (len(query) - 1, len(query), len(query) + 1):
+        target = name[:end]
+        previous2, previous = None, list(range(len(target) + 1))
+        for i, a in enumerate(query, 1):
+            current = [i]
+            for j, b in enumerate(target, 1):
+                cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b))
+                if previous2 is not None and j > 1 and a == target[j - 2] and query[i - 2] == b:
+                    cost = min(cost, previous2[j - 2] + 1)
+                current.append(cost)
+            previous2, previous = previous, current
+        best = min(best, previous[-1])
+    return best
+
+
+def max_typos(query):
+    return 1 if len(query) <= 4 else 2
+
+
+class TagIndex:
+    """
+    Autocomplete index over one user's tags
+
+    Lowercased names are kept sorted, so the tags starting with a prefix are
+    one contiguous slice found by binary search. A trigram inverted index
+    narrows fuzzy candidates, which are then checked for typos.
+    """
+
+    def __init__(self, tags):
+        self.tags = sorted(tags, key=lambda tag: tag[1].lower())
+        self.keys = [name.lower() for _, name, _ in self.tags]
+        self.grams = [trigrams(key) for key in self.keys]
+        self.postings = defaultdict(list)
+        for position, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings[gram].append(position)
+
+    def _prefix_positions(self, query):
+        start = bisect.bisect_left(self.keys, query)
+        end = bisect.bisect_left(self.keys, query + '\uffff', start)
+        return range(start, end)
+
+    def _fuzzy_positions(self, query, exclude):
+        """Positions of tags similar to the query, best first"""
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            for position in self.postings.get(gram, ()):
+                shared[position] += 1
+
+        allowed = max_typos(query)
+        scored = []
+        for position, common in shared.items():
+            if position in exclude:
+                continue
+            similarity = common / (len(query_grams) + len(self.grams[position]) - common)
+            if similarity < MIN_SIMILARITY:
+                continue
+            distance = typo_distance(query, self.keys[position])
+            if distance <= allowed or similarity >= STRONG_SIMILARITY:
+                scored.append((distance, -similarity, -self.tags[position][2], position))
+        scored.sort()
+        return [position for *_, position in scored]
+
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Tags matching query, as [{'id', 'name', 'video_count'}, ...]
+
+        Prefix matches come first, most used first; fuzzy matches fill any
+        remaining slots, fewest typos first.
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        prefix = self._prefix_positions(query)
+        positions = heapq.nsmallest(
+            limit, prefix, key=lambda position: (-self.tags[position][2], self.keys[position])
+        )
+        if len(positions) < limit:
+            # Every prefix match is already in positions
+            positions += self._fuzzy_positions(query, set(positions))[:limit - len(positions)]
+
+        return [
+            {'id': tag_id, 'name': name, 'video_count': video_count}
+            for tag_id, name, video_count in (self.tags[position] for position in positions)
+        ]
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_tag_index(user_id, library_version):
+    """
+    The user's TagIndex, rebuilt when their library version changes
+
+    Indexes are kept in process memory (not the Django cache) so a keystroke
+    doesn't pay to unpickle one; the version check keeps every process in
+    step with tag writes.
+    """
+    with _indexes_lock:
+        cached = _indexes.get(user_id)
+        if cached is not None and cached[0] == library_version:
+            _indexes.move_to_end(user_id)
+            return cached[1]
+
+    index = TagIndex(Tag.objects.filter(user_id=user_id).values_list('id', 'name', 'video_count'))
+    with _indexes_lock:
+        _indexes[user_id] = (library_version, index)
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def search_tags(user, query, limit=AUTOCOMPLETE_LIMIT):
+    """Autocomplete the user's tags for query"""
+    return get_tag_index(user.id, user_library_version(user)).search(query, limit)
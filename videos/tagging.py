@@ -0,0 +1,134 @@
+import logging
+from django.db import transaction
+from .models import Video, Tag, VideoTag
+from .counters import refresh_tag_counts, refresh_video_channel_counts, bump_library_version
+
+logger = logging.getLogger(__name__)
+
+BULK_TAG_OPERATIONS = ('add', 'remove', 'replace')
+
+# Auto-created through table behind Video.tags, which the cards render from
+VideoTagsThrough = Video.tags.through
+
+
+class BulkTagError(Exception):
+    """Raised when a bulk tag request references videos or tags the user doesn't own"""
+
+    def __init__(self, message, names=()):
+        super().__init__(message)
+        self.names = list(names)  # Tag names that couldn't be resolved, if any
+
+
+def get_or_create_tags(user, names):
+    """
+    Return the user's tags for the given names, creating missing ones in one insert
+
+    Names that can't be created (e.g. taken by another user's tag) are
+    left out of the result.
+    """
+    names = {name.strip() for name in names if name and name.strip()}
+    if not names:
+        return []
+
+    existing = {tag.name for tag in Tag.objects.filter(user=user, name__in=names)}
+    Tag.objects.bulk_create(
+        [Tag(user=user, name=name) for name in names - existing],
+        ignore_conflicts=True
+    )
+    return list(Tag.objects.filter(user=user, name__in=names))
+
+
+def _resolve_tag_names(user, names, create):
+    """
+    Ids of the user's tags with the given names, creating missing ones if create is set
+
+    Tag names are unique across users, so a name another user already has
+    can't be created; any name left unresolved raises BulkTagError.
+    """
+    names = {name.strip() for name in names if name and name.strip()}
+    tags = get_or_create_tags(user, names) if create else Tag.objects.filter(user=user, name__in=names)
+    resolved = {tag.name: tag.id for tag in tags}
+    unresolved = sorted(names - set(resolved))
+    if unresolved:
+        reason = "already used by another user" if create else "not found"
+        raise BulkTagError(f"Tags {reason}: {', '.join(unresolved)}", names=unresolved)
+    return set(resolved.values())
+
+
+def apply_bulk_tags(user, video_ids, tag_ids=(), tag_names=(), operation='add'):
+    """
+    Add, remove or replace a set of tags on a set of videos
+
+    Ownership of all videos and tags is checked with one query each, and the
+    link rows are written with a single bulk insert and a single delete per
+    tag table. Returns the resulting tag state of the affected videos.
+    """
+    if operation not in BULK_TAG_OPERATIONS:
+        raise BulkTagError(f"Unknown operation '{operation}'")
+
+    video_ids = {int(video_id) for video_id in video_ids}
+    tag_ids = {int(tag_id) for tag_id in tag_ids}
+
+    owned_video_ids = set(
+        Video.objects.filter(user=user, id__in=video_ids).values_list('id', flat=True)
+    )
+    if owned_video_ids != video_ids:
+        raise BulkTagError("One or more videos were not found")
+
+    owned_tag_ids = set(
+        Tag.objects.filter(user=user, id__in=tag_ids).values_list('id', flat=True)
+    )
+    if owned_tag_ids != tag_ids:
+        raise BulkTagError("One or more tags were not found")
+
+    with transaction.atomic():
+        if tag_names:
+            tag_ids |= _resolve_tag_names(user, tag_names, create=operation != 'remove')
+
+        if operation == 'replace':
+            VideoTag.objects.filter(video_id__in=video_ids).exclude(tag_id__in=tag_ids).delete()
+            VideoTagsThrough.objects.filter(video_id__in=video_ids).exclude(tag_id__in=tag_ids).delete()
+
+        if operation in ('add', 'replace'):
+            VideoTag.objects.bulk_create(
+                [VideoTag(video_id=v, tag_id=t) for v in video_ids for t in tag_ids],
+                ignore_conflicts=True
+            )
+            VideoTagsThrough.objects.bulk_create(
+                [VideoTagsThrough(video_id=v, tag_id=t) for v in video_ids for t in tag_ids],
+                ignore_conflicts=True
+            )
+        else:
+            VideoTag.objects.filter(video_id__in=video_ids, tag_id__in=tag_ids).delete()
+            VideoTagsThrough.objects.filter(video_id__in=video_ids, tag_id__in=tag_ids).delete()
+
+        if operation == 'replace':
+            # Tags removed from the videos aren't known up front
+            refresh_tag_counts(user_id=user.id)
+        else:
+            refresh_tag_counts(tag_ids)
+        refresh_video_channel_counts(user.id, video_ids)
+        bump_library_version(user.id)
+
+    logger.info(f"Bulk tag '{operation}' of {len(tag_ids)} tags on {len(video_ids)} videos for user {user.username}")
+    return get_tag_state(video_ids)
+
+
+def tag_links(video_ids):
+    """
+    (video_id, tag_id, tag name) for every tag on the given videos, in one query
+
+    Some older write paths (single-tag endpoints, Drive import) only write
+    VideoTag, so this reads the union of both link tables.
+    """
+    return VideoTag.objects.filter(video_id__in=video_ids).values_list('video_id', 'tag_id', 'tag__name').union(
+        VideoTagsThrough.objects.filter(video_id__in=video_ids).values_list('video_id', 'tag_id', 'tag__name')
+    )
+
+
+def get_tag_state(video_ids):
+    """Return {video_id: [{'id', 'name'}, ...]} for the given videos in one query"""
+    state = {video_id: [] for video_id in video_ids}
+    for video_id, tag_id, tag_name in sorted(tag_links(video_ids), key=lambda link: link[2]):
+        state[video_id].append({'id': tag_id, 'name': tag_name})
+    return state
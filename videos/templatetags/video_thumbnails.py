@@ -0,0 +1,20 @@
+from django import template
+from django.urls import reverse
+
+from videos.thumbnails import THUMBNAIL_WIDTHS, available_formats
+
+register = template.Library()
+
+
+@register.inclusion_tag('videos/components/thumbnail.html')
+def video_thumbnail(video, sizes='(max-width: 768px) 100vw, 300px'):
+    """Render a video's thumbnail from the local cache when available"""
+    sources = []
+    if video.thumbnail_hash:
+        for fmt in available_formats():
+            srcset = ', '.join(
+                f"{reverse('thumbnail', args=[video.thumbnail_hash, width, fmt])} {width}w"
+                for width in THUMBNAIL_WIDTHS
+            )
+            sources.append({'type': f'image/{fmt}', 'srcset': srcset})
+    return {'video': video, 'sources': sources, 'sizes': sizes}
@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from videos.counters import bump_watch_versions
+from .utils import TEST_CACHES, make_video
+
+STATIC_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class LibraryETagTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_unchanged_list_answers_304(self):
+        first = self.api.get('/api/tags/')
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.has_header('ETag'))
+
+        again = self.api.get('/api/tags/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+    def test_library_write_changes_the_etag(self):
+        etag = self.api.get('/api/tags/')['ETag']
+        self.assertEqual(self.api.post('/api/tags/', {'name': 'music'}).status_code, 201)
+
+        response = self.api.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tag['name'] for tag in response.json()], ['music'])
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_watch_version_changes_the_etag(self):
+        etag = self.api.get('/api/tags/')['ETag']
+        bump_watch_versions([self.user.id])
+        self.assertEqual(self.api.get('/api/tags/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_streamed_video_list_answers_304(self):
+        make_video(self.user, 'v1')
+        etag = self.api.get('/api/videos/')['ETag']
+        self.assertNotEqual(self.api.get('/api/videos/?page=2')['ETag'], etag)
+        self.assertEqual(self.api.get('/api/videos/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    @override_settings(STORAGES=STATIC_STORAGES)
+    def test_unchanged_page_answers_304(self):
+        make_video(self.user, 'v1', is_liked=True)
+        self.client.force_login(self.user)
+        # The first page view sets the CSRF cookie, which is part of the ETag
+        self.client.get('/category/liked/')
+        first = self.client.get('/category/liked/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        again = self.client.get('/category/liked/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
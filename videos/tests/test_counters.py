@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from videos.models import Channel, Playlist, Tag, UserLibraryStats, Video
+from videos.counters import reconcile_user_counters
+from videos.tagging import apply_bulk_tags
+from .utils import make_video
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        Playlist.objects.create(user=self.user, playlist_id='PL1', title='Mix')
+        self.video = make_video(self.user, 'v1', playlist_id='PL1', channel_id='C1', is_liked=True)
+        make_video(self.user, 'v2', channel_id='C1', is_saved=True)
+        apply_bulk_tags(self.user, [self.video.id], tag_names=['music', 'live'])
+        reconcile_user_counters(self.user.id)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counts(self):
+        channel = Channel.objects.get(user=self.user, channel_id='C1')
+        stats = UserLibraryStats.objects.get(user=self.user)
+        return {
+            'tags': dict(Tag.objects.filter(user=self.user).values_list('name', 'video_count')),
+            'playlist': Playlist.objects.get(user=self.user, playlist_id='PL1').video_count,
+            'channel': (channel.video_count, channel.liked_count, channel.saved_count, channel.tagged_count),
+            'library': (stats.liked_count, stats.saved_count),
+        }
+
+    def test_reconciled_counts(self):
+        self.assertEqual(self.counts(), {
+            'tags': {'music': 1, 'live': 1},
+            'playlist': 1,
+            'channel': (2, 1, 1, 1),
+            'library': (1, 1),
+        })
+
+    def test_bulk_tagging_keeps_counts(self):
+        other = Video.objects.get(video_id='v2')
+        apply_bulk_tags(self.user, [other.id], tag_names=['music'])
+        apply_bulk_tags(self.user, [self.video.id], tag_names=['live'], operation='remove')
+        counts = self.counts()
+        self.assertEqual(counts['tags'], {'music': 2, 'live': 0})
+        self.assertEqual(counts['channel'][3], 2)
+
+    def test_destroy_refreshes_counts(self):
+        version = UserLibraryStats.objects.get(user=self.user).version
+        response = self.client.delete(f'/api/videos/{self.video.id}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counts(), {
+            'tags': {'music': 0, 'live': 0},
+            'playlist': 0,
+            'channel': (1, 0, 1, 0),
+            'library': (0, 1),
+        })
+        self.assertGreater(UserLibraryStats.objects.get(user=self.user).version, version)
+
+    def test_update_with_tag_ids_refreshes_counts(self):
+        music = Tag.objects.get(user=self.user, name='music')
+        response = self.client.patch(f'/api/videos/{self.video.id}/', {'tag_ids': [music.id]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts()['tags'], {'music': 1, 'live': 0})
+        self.assertEqual(list(self.video.tags.values_list('name', flat=True)), ['music'])
+        self.assertEqual(list(self.video.video_tags.values_list('tag__name', flat=True)), ['music'])
+
+    def test_update_with_another_users_tag_is_rejected(self):
+        foreign = Tag.objects.create(user=User.objects.create_user('bob'), name='foreign')
+        response = self.client.patch(f'/api/videos/{self.video.id}/', {'tag_ids': [foreign.id]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.counts()['tags'], {'music': 1, 'live': 1})
@@ -0,0 +1,72 @@
+import datetime
+import io
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+from videos.library_gc import collect_garbage, orphaned_videos, remove_missing_playlists
+from videos.models import Playlist, Tag, Video, VideoTag
+from videos.tagging import VideoTagsThrough
+from .utils import make_video
+
+
+class LibraryGcTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        Playlist.objects.create(user=self.user, playlist_id='PL1', title='Talks')
+        self.tag = Tag.objects.create(user=self.user, name='music')
+
+        make_video(self.user, 'orphan')
+        make_video(self.user, 'deleted-playlist', playlist_id='GONE', playlist_name='Gone')
+        make_video(self.user, 'liked', is_liked=True)
+        make_video(self.user, 'saved', is_saved=True)
+        make_video(self.user, 'history', is_history=True)
+        make_video(self.user, 'playlist', playlist_id='PL1', playlist_name='Talks')
+        make_video(self.user, 'notes', custom_description='Worth a rewatch')
+        VideoTag.objects.create(video=make_video(self.user, 'tagged'), tag=self.tag)
+        VideoTagsThrough.objects.create(video=make_video(self.user, 'm2m-tagged'), tag=self.tag)
+        Video.objects.filter(user=self.user).update(updated_at=timezone.now() - datetime.timedelta(days=30))
+        make_video(self.user, 'fresh-orphan')
+
+    def video_ids(self, videos=None):
+        if videos is None:
+            videos = Video.objects.filter(user=self.user)
+        return sorted(videos.values_list('video_id', flat=True))
+
+    def test_only_unreferenced_old_videos_are_orphans(self):
+        self.assertEqual(self.video_ids(orphaned_videos(self.user.id)), ['deleted-playlist', 'orphan'])
+        self.assertEqual(
+            self.video_ids(orphaned_videos(self.user.id, min_age=datetime.timedelta(0))),
+            ['deleted-playlist', 'fresh-orphan', 'orphan']
+        )
+
+    def test_collect_deletes_in_batches(self):
+        self.assertEqual(collect_garbage(self.user.id, dry_run=True), 2)
+        self.assertEqual(Video.objects.filter(user=self.user).count(), 10)
+
+        self.assertEqual(collect_garbage(self.user.id, batch_size=1), 2)
+        self.assertNotIn('orphan', self.video_ids())
+        self.assertEqual(Video.objects.filter(user=self.user).count(), 8)
+        self.assertEqual(collect_garbage(self.user.id), 0)
+
+    def test_removed_playlists_unlink_their_videos(self):
+        Playlist.objects.create(user=self.user, playlist_id='PL2', title='Old')
+        video = make_video(self.user, 'in-old-playlist', playlist_id='PL2', playlist_name='Old')
+
+        self.assertEqual(remove_missing_playlists(self.user.id, ['PL1']), 1)
+        self.assertEqual(list(Playlist.objects.filter(user=self.user).values_list('playlist_id', flat=True)), ['PL1'])
+        video.refresh_from_db()
+        self.assertEqual((video.playlist_id, video.playlist_name), (None, None))
+        # Just unlinked, so within the grace period
+        self.assertNotIn('in-old-playlist', self.video_ids(orphaned_videos(self.user.id)))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('gc_library', '--user', 'alice', '--dry-run', stdout=out)
+        self.assertIn('Would delete 2 orphaned videos', out.getvalue())
+
+        call_command('gc_library', '--skip-vacuum', stdout=out)
+        self.assertIn('Deleted 2 orphaned videos', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('gc_library', '--min-age-days', '0', stdout=out)
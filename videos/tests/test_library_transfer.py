@@ -0,0 +1,73 @@
+import datetime
+import io
+from django.contrib.auth.models import User
+from django.test import TestCase
+from videos.models import Tag, Video, VideoTag
+from videos.exports import export_rows
+from videos.library_transfer import import_library, library_export_chunks, read_library_rows
+from videos.tagging import apply_bulk_tags
+from .utils import make_video
+
+
+class LibraryTransferTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+
+    def export(self, user):
+        return io.BytesIO(b''.join(library_export_chunks(user.id, 'ndjson.gz')))
+
+    def rows(self, user):
+        return sorted(export_rows(user.id), key=lambda row: row['video_id'])
+
+    def test_round_trip(self):
+        published_at = datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc)
+        tagged = make_video(
+            self.alice, 'v1', title='First', description='desc', youtube_description='from youtube',
+            custom_description='my notes', thumbnail_url='https://i.ytimg.com/vi/v1/hq.jpg',
+            channel_title='Channel', channel_id='C1', published_at=published_at,
+            playlist_id='PL1', playlist_name='Mix', is_liked=True, is_saved=True,
+        )
+        make_video(self.alice, 'v2', is_history=True)
+        apply_bulk_tags(self.alice, [tagged.id], tag_names=['alpha', 'beta'])
+
+        exported = self.rows(self.alice)
+        backup = self.export(self.alice)
+        # Tag names are unique across users, so restore into an emptied library
+        Video.objects.filter(user=self.alice).delete()
+        Tag.objects.filter(user=self.alice).delete()
+
+        imported = import_library(self.alice, read_library_rows(backup, 'ndjson.gz'))
+
+        self.assertEqual(imported, 2)
+        self.assertEqual(self.rows(self.alice), exported)
+        video = Video.objects.get(user=self.alice, video_id='v1')
+        self.assertEqual(video.youtube_description, 'from youtube')
+        self.assertEqual(video.description_snippet, 'my notes')
+
+    def test_import_keeps_newer_descriptions(self):
+        make_video(self.alice, 'v1', description='desc', youtube_description='from youtube')
+        backup = self.export(self.alice)
+        Video.objects.filter(user=self.alice).update(custom_description='added later')
+
+        import_library(self.alice, read_library_rows(backup, 'ndjson.gz'))
+        import_library(self.alice, [{'video_id': 'v1', 'title': 'v1', 'custom_description': ''}])
+
+        video = Video.objects.get(user=self.alice, video_id='v1')
+        self.assertEqual(video.custom_description, 'added later')
+        self.assertEqual(video.youtube_description, 'from youtube')
+        self.assertEqual(video.description_snippet, 'added later')
+
+    def test_import_adds_tags_without_removing(self):
+        video = make_video(self.alice, 'v1')
+        apply_bulk_tags(self.alice, [video.id], tag_names=['kept'])
+        import_library(self.alice, [{'video_id': 'v1', 'title': 'v1', 'tags': ['new']}])
+        self.assertEqual(self.rows(self.alice)[0]['tags'], ['kept', 'new'])
+
+    def test_export_includes_tags_from_either_link_table(self):
+        video = make_video(self.alice, 'v1')
+        apply_bulk_tags(self.alice, [video.id], tag_names=['both'])
+        # As written by the single-tag endpoint and the Drive import
+        VideoTag.objects.create(video=video, tag=Tag.objects.create(user=self.alice, name='videotag-only'))
+        video.tags.add(Tag.objects.create(user=self.alice, name='m2m-only'))
+
+        self.assertEqual(self.rows(self.alice)[0]['tags'], ['both', 'm2m-only', 'videotag-only'])
@@ -0,0 +1,43 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from videos.models import RecentVideos
+from videos.recent import HISTORY, RECENT, pack_ids, push_recent, recent_videos, unpack_ids
+from .utils import make_video
+
+
+class RecentRingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.videos = [make_video(self.user, f'v{n}') for n in range(5)]
+        self.ids = [video.id for video in self.videos]
+
+    def ring(self, kind=HISTORY):
+        return [video.video_id for video in recent_videos(self.user.id, kind)]
+
+    def test_packing_round_trips(self):
+        self.assertEqual(unpack_ids(pack_ids([1, 2 ** 40, 3])), [1, 2 ** 40, 3])
+        self.assertEqual(unpack_ids(b''), [])
+
+    def test_last_pushed_comes_first(self):
+        push_recent(self.user.id, HISTORY, self.ids[:3])
+        self.assertEqual(self.ring(), ['v2', 'v1', 'v0'])
+        self.assertEqual(self.ring(RECENT), [])
+
+    def test_repushed_video_moves_to_the_front(self):
+        push_recent(self.user.id, HISTORY, self.ids[:3])
+        push_recent(self.user.id, HISTORY, [self.ids[0], self.ids[3], self.ids[0]])
+        self.assertEqual(self.ring(), ['v0', 'v3', 'v2', 'v1'])
+
+    def test_ring_is_capped(self):
+        with mock.patch('videos.recent.RING_SIZE', 3):
+            push_recent(self.user.id, RECENT, self.ids)
+        self.assertEqual(self.ring(RECENT), ['v4', 'v3', 'v2'])
+        self.assertEqual(len(RecentVideos.objects.get(user=self.user, kind=RECENT).video_ids), 3 * 8)
+
+    def test_deleted_and_foreign_videos_are_skipped(self):
+        other = make_video(User.objects.create_user('bob'), 'b1')
+        push_recent(self.user.id, HISTORY, self.ids[:3] + [other.id])
+        self.videos[1].delete()
+        self.assertEqual(self.ring(), ['v2', 'v0'])
+        self.assertEqual([video.video_id for video in recent_videos(self.user.id, HISTORY, limit=2)], ['v2'])
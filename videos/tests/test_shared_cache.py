@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from videos import shared_cache
+from videos.shared_cache import (
+    ashared_get, cache_video_snippets, cached_video_snippets, is_shareable, response_key, shared_get,
+)
+from .utils import TEST_CACHES, FakeResponse
+
+
+class CountingFetch:
+    """fetch() for shared_get, optionally held until released"""
+
+    def __init__(self, status_code=200, data=None, hold=False):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+        self.status_code = status_code
+        self.data = data or {'items': ['a']}
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return FakeResponse(self.status_code, self.data)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SharedCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['youtube'].clear()
+        self.key = response_key('playlistItems', {'playlistId': 'PL1', 'part': 'snippet'})
+
+    def test_only_public_listings_are_shareable(self):
+        self.assertTrue(is_shareable('playlistItems', {'playlistId': 'PL1'}, True))
+        self.assertFalse(is_shareable('playlistItems', {'playlistId': 'PL1'}, False))
+        self.assertFalse(is_shareable('playlistItems', {'playlistId': 'WL'}, True))
+        self.assertFalse(is_shareable('videos', {'myRating': 'like'}, True))
+        self.assertFalse(is_shareable('playlists', {'mine': 'true'}, True))
+
+    def test_key_covers_every_parameter(self):
+        self.assertEqual(self.key, response_key('playlistItems', {'part': 'snippet', 'playlistId': 'PL1'}))
+        self.assertNotEqual(self.key, response_key('playlistItems', {'playlistId': 'PL1', 'pageToken': 'P2'}))
+        self.assertNotEqual(self.key, response_key('videos', {'playlistId': 'PL1', 'part': 'snippet'}))
+
+    def test_successes_are_cached(self):
+        fetch = CountingFetch()
+        self.assertEqual(shared_get(self.key, fetch).json(), {'items': ['a']})
+        cached = shared_get(self.key, fetch)
+        self.assertEqual((cached.status_code, cached.json()), (200, {'items': ['a']}))
+        self.assertEqual(fetch.calls, 1)
+
+    def test_failures_are_not_cached(self):
+        fetch = CountingFetch(status_code=403)
+        self.assertEqual(shared_get(self.key, fetch).status_code, 403)
+        self.assertEqual(shared_get(self.key, fetch).status_code, 403)
+        self.assertEqual(fetch.calls, 2)
+
+    def run_concurrently(self, fetch):
+        results = []
+
+        def get():
+            results.append(shared_get(self.key, fetch).status_code)
+
+        leader = threading.Thread(target=get)
+        leader.start()
+        fetch.started.wait(5)
+        waiter = threading.Thread(target=get)
+        waiter.start()
+        fetch.release.set()
+        leader.join(5)
+        waiter.join(5)
+        self.assertEqual(shared_cache._flights, {})
+        return results
+
+    def test_concurrent_misses_fetch_once(self):
+        fetch = CountingFetch(hold=True)
+        self.assertEqual(self.run_concurrently(fetch), [200, 200])
+        self.assertEqual(fetch.calls, 1)
+
+    def test_waiters_retry_after_a_failed_leader(self):
+        fetch = CountingFetch(status_code=401, hold=True)
+        self.assertEqual(self.run_concurrently(fetch), [401, 401])
+        self.assertEqual(fetch.calls, 2)
+
+    def test_async_misses_fetch_once(self):
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return FakeResponse(200, {'items': ['a']})
+
+        async def get_twice():
+            return await asyncio.gather(ashared_get(self.key, fetch), ashared_get(self.key, fetch))
+
+        responses = asyncio.run(get_twice())
+        self.assertEqual([response.json() for response in responses], [{'items': ['a']}] * 2)
+        self.assertEqual(len(calls), 1)
+
+    def test_video_snippets(self):
+        cache_video_snippets([{'id': 'v1', 'snippet': {'title': 'One'}}, {'id': 'v2'}])
+        self.assertEqual(cached_video_snippets(['v1', 'v2']), {'v1': {'title': 'One'}})
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from videos.conditional import user_library_version
+from videos.models import Tag
+from videos.sidebar import get_sidebar_html
+from videos.tagging import apply_bulk_tags
+from .utils import TEST_CACHES, make_video
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SidebarCacheTests(TestCase):
+    def setUp(self):
+        # Ids and versions restart with each test, so cached fragments may not carry over
+        cache.clear()
+        self.user = User.objects.create_user('alice')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def sidebar(self):
+        # A fresh user object, as each request gets, so the version is read again
+        user = User.objects.get(id=self.user.id)
+        return get_sidebar_html(user.id, user_library_version(user))
+
+    def test_cached_per_library_version(self):
+        self.sidebar()
+        with self.assertNumQueries(2):  # The user and their stats row
+            self.sidebar()
+
+        # A write that doesn't bump the version isn't seen
+        Tag.objects.create(user=self.user, name='unseen')
+        self.assertNotIn('unseen', self.sidebar())
+
+    def test_api_tag_writes_invalidate(self):
+        self.sidebar()
+        tag_id = self.api.post('/api/tags/', {'name': 'music'}).json()['id']
+        self.assertIn('music', self.sidebar())
+
+        self.api.patch(f'/api/tags/{tag_id}/', {'name': 'podcasts'})
+        html = self.sidebar()
+        self.assertIn('podcasts', html)
+        self.assertNotIn('music', html)
+
+        self.api.delete(f'/api/tags/{tag_id}/')
+        self.assertNotIn('podcasts', self.sidebar())
+
+    def test_tagging_refreshes_counts(self):
+        tag = Tag.objects.create(user=self.user, name='music')
+        video = make_video(self.user, 'v1')
+        self.assertNotIn('sidebar-count', self.sidebar().split('tagsContainer')[1])
+
+        apply_bulk_tags(self.user, [video.id], tag_ids=[tag.id], operation='add')
+        self.assertIn('<span class="sidebar-count">1</span>', self.sidebar().split('tagsContainer')[1])
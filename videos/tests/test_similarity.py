@@ -0,0 +1,76 @@
+import tempfile
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from videos import similarity
+from videos.models import UserLibraryStats
+from videos.related import get_related_videos
+from .utils import TEST_CACHES, make_video
+
+TOPICS = {
+    'guitar': 'Guitar chords lesson for beginners',
+    'bread': 'Sourdough bread baking at home',
+    'django': 'Python django web tutorial',
+}
+
+
+@skipUnless(similarity.available(), 'NumPy is not installed')
+@override_settings(CACHES=TEST_CACHES)
+class SimilarityIndexTests(TestCase):
+    def setUp(self):
+        index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(index_dir.cleanup)
+        settings_override = override_settings(SIMILARITY_INDEX_DIR=index_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Ids and versions restart with each test, so no index may outlive one
+        similarity._indexes.clear()
+
+        self.user = User.objects.create_user('alice')
+        self.videos = {
+            f'{topic}{n}': make_video(self.user, f'{topic}{n}', title=f'{title} part {n}')
+            for topic, title in TOPICS.items() for n in range(4)
+        }
+
+    def versions(self):
+        return UserLibraryStats.objects.filter(user=self.user).values_list('version', 'similarity_version').first()
+
+    def neighbours(self, name, k=3):
+        video = self.videos[name]
+        similarity_version = self.versions()[1]
+        pks = {video.pk: key for key, video in self.videos.items()}
+        return [pks[pk] for pk, _ in similarity.similar_videos(video, similarity_version, k)]
+
+    def test_full_build_finds_videos_on_the_same_topic(self):
+        self.assertEqual(similarity.update_similarity_index(self.user.id), 'full')
+        self.assertEqual(sorted(self.neighbours('guitar0')), ['guitar1', 'guitar2', 'guitar3'])
+        self.assertEqual(sorted(self.neighbours('bread2')), ['bread0', 'bread1', 'bread3'])
+
+    def test_build_bumps_only_the_similarity_version(self):
+        similarity.update_similarity_index(self.user.id)
+        self.assertEqual(self.versions(), (0, 1))
+        self.assertEqual(similarity.update_similarity_index(self.user.id), 'unchanged')
+        self.assertEqual(self.versions(), (0, 1))
+
+    def test_incremental_update_merges_a_changed_video(self):
+        similarity.update_similarity_index(self.user.id)
+        guitar = self.videos['guitar0']
+        guitar.title = 'Sourdough bread baking without a starter'
+        guitar.save()
+
+        self.assertEqual(similarity.update_similarity_index(self.user.id), 'incremental')
+        self.assertEqual(self.versions()[1], 2)
+        self.assertTrue(all(name.startswith('bread') for name in self.neighbours('guitar0')))
+        # The other videos' lists drop it and pick it up where it now belongs
+        self.assertNotIn('guitar0', self.neighbours('guitar1', k=20))
+        self.assertIn('guitar0', self.neighbours('bread1', k=20))
+
+    def test_related_videos_follow_a_new_build(self):
+        video = self.videos['django0']
+        library_version, similarity_version = 0, 0
+        self.assertEqual(get_related_videos(video, library_version, similarity_version), [])
+
+        similarity.update_similarity_index(self.user.id)
+        similarity_version = self.versions()[1]
+        related = {related.video_id for related in get_related_videos(video, library_version, similarity_version)}
+        self.assertEqual(related, {'django1', 'django2', 'django3'})
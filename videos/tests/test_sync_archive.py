@@ -0,0 +1,104 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from videos.models import ArchivedResponse, Playlist, UserLibraryStats, Video
+from videos.sync_archive import archive_response, prune_archive
+from .utils import make_video
+
+API = 'https://www.googleapis.com/youtube/v3'
+
+
+def page(items, next_page_token=None, etag='etag'):
+    data = {'etag': etag, 'items': items}
+    if next_page_token:
+        data['nextPageToken'] = next_page_token
+    return json.dumps(data).encode()
+
+
+def snippet(video_id, **fields):
+    return {
+        'title': f'Video {video_id}',
+        'description': f'About {video_id}',
+        'publishedAt': '2024-01-01T00:00:00Z',
+        'channelId': 'C1',
+        'channelTitle': 'Channel',
+        'resourceId': {'videoId': video_id},
+        **fields,
+    }
+
+
+class SyncArchiveTests(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.archive_dir = archive_dir.name
+        settings_override = override_settings(SYNC_ARCHIVE_DIR=self.archive_dir, SIMILARITY_INDEX_DIR=self.archive_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('alice')
+
+    def archive_library(self):
+        archive_response(self.user.id, f'{API}/playlists', {'mine': 'true'}, page([
+            {'id': 'PL1', 'snippet': {'title': 'Talks'}, 'contentDetails': {'itemCount': 3}},
+        ]))
+        archive_response(self.user.id, f'{API}/playlistItems', {'playlistId': 'PL1'}, page(
+            [{'snippet': snippet('a')}, {'snippet': snippet('b')}], next_page_token='P2', etag='first'
+        ))
+        archive_response(self.user.id, f'{API}/playlistItems', {'playlistId': 'PL1', 'pageToken': 'P2'}, page(
+            [{'snippet': snippet('c')}, {'snippet': snippet('private', publishedAt=None)}], etag='second'
+        ))
+        archive_response(self.user.id, f'{API}/videos', {'myRating': 'like'}, page([
+            {'id': 'b', 'snippet': snippet('b')},
+        ]))
+
+    def test_identical_pages_share_a_blob(self):
+        body = page([{'id': 'a', 'snippet': snippet('a')}])
+        archive_response(self.user.id, f'{API}/playlistItems', {'playlistId': 'PL1'}, body)
+        archive_response(User.objects.create_user('bob').id, f'{API}/playlistItems', {'playlistId': 'PL1'}, body)
+
+        blobs = set(ArchivedResponse.objects.values_list('blob', flat=True))
+        self.assertEqual(ArchivedResponse.objects.count(), 2)
+        self.assertEqual(len(blobs), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.archive_dir, blobs.pop())))
+
+    def test_replay_rebuilds_the_library(self):
+        make_video(self.user, 'a', custom_description='My notes')
+        self.archive_library()
+        out = io.StringIO()
+        call_command('replay_sync', user='alice', stdout=out)
+
+        self.assertIn('Replayed 3 videos and 1 playlists for alice (1 unparseable items skipped)', out.getvalue())
+        videos = {video.video_id: video for video in Video.objects.filter(user=self.user)}
+        self.assertEqual(sorted(videos), ['a', 'b', 'c'])
+        self.assertEqual(videos['a'].custom_description, 'My notes')
+        self.assertEqual(videos['a'].youtube_description, 'About a')
+        self.assertEqual(videos['c'].playlist_id, 'PL1')
+        self.assertTrue(videos['b'].is_liked)
+        self.assertFalse(videos['a'].is_liked)
+        self.assertEqual(Playlist.objects.get(user=self.user, playlist_id='PL1').video_count, 3)
+        self.assertEqual(UserLibraryStats.objects.get(user=self.user).liked_count, 1)
+
+    def test_replay_needs_an_archive(self):
+        with override_settings(SYNC_ARCHIVE_DIR=''):
+            with self.assertRaises(CommandError):
+                call_command('replay_sync', stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('replay_sync', user='nobody', stdout=io.StringIO())
+
+    def test_prune_drops_old_pages_and_their_blobs(self):
+        self.archive_library()
+        old = timezone.now() - datetime.timedelta(days=60)
+        ArchivedResponse.objects.filter(endpoint='videos').update(fetched_at=old)
+        liked_blob = os.path.join(self.archive_dir, ArchivedResponse.objects.get(endpoint='videos').blob)
+        os.utime(liked_blob, (old.timestamp(), old.timestamp()))
+
+        self.assertEqual(prune_archive(30), (1, 1))
+        self.assertFalse(os.path.exists(liked_blob))
+        self.assertEqual(ArchivedResponse.objects.count(), 3)
@@ -0,0 +1,83 @@
+import datetime
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from videos.models import SyncCheckpoint, UserToken, Video
+from videos.sync_checkpoint import CHECKPOINT_MAX_AGE, resume_checkpoint
+from videos.youtube_api import YouTubeAPI
+from .utils import TEST_CACHES, FakeResponse, make_video
+
+
+def liked_item(video_id):
+    return {
+        'id': video_id,
+        'snippet': {
+            'title': f'Video {video_id}',
+            'publishedAt': '2024-01-01T00:00:00Z',
+            'channelId': 'C1',
+            'channelTitle': 'Channel',
+        },
+    }
+
+
+@override_settings(CACHES=TEST_CACHES, SYNC_ARCHIVE_DIR='')
+class SyncCheckpointTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        UserToken.objects.create(
+            user=self.user, access_token='token', expires_at=timezone.now() + datetime.timedelta(hours=1)
+        )
+        self.pages = {
+            None: FakeResponse(200, {'items': [liked_item('v1'), liked_item('v2')], 'nextPageToken': 'p2'}),
+            'p2': FakeResponse(500, {'error': 'backend error'}),
+        }
+        self.requested = []
+
+    def fake_get(self, api, url, params=None, headers=None, public=False):
+        token = (params or {}).get('pageToken')
+        self.requested.append(token)
+        return self.pages[token]
+
+    def sync_liked(self):
+        with mock.patch.object(YouTubeAPI, '_get', autospec=True, side_effect=self.fake_get):
+            return YouTubeAPI(user=self.user).sync_source('liked')
+
+    def test_failed_sync_resumes_from_its_checkpoint(self):
+        # Liked before the sync but missing from the pages the resumed run sees
+        make_video(self.user, 'old', is_liked=True)
+
+        self.assertFalse(self.sync_liked())
+        checkpoint = SyncCheckpoint.objects.get(user=self.user, source='liked')
+        self.assertEqual(checkpoint.page_token, 'p2')
+        self.assertEqual(checkpoint.items_written, 2)
+
+        self.pages['p2'] = FakeResponse(200, {'items': [liked_item('v3')]})
+        self.requested = []
+        self.assertTrue(self.sync_liked())
+
+        self.assertEqual(self.requested, ['p2'])
+        self.assertFalse(SyncCheckpoint.objects.filter(user=self.user, source='liked').exists())
+        self.assertEqual(
+            set(Video.objects.filter(user=self.user, is_liked=True).values_list('video_id', flat=True)),
+            {'old', 'v1', 'v2', 'v3'}
+        )
+
+        # A full run from the first page unmarks what's no longer liked
+        self.pages[None] = FakeResponse(200, {'items': [liked_item('v1')]})
+        self.requested = []
+        self.assertTrue(self.sync_liked())
+        self.assertEqual(self.requested, [None])
+        self.assertEqual(
+            set(Video.objects.filter(user=self.user, is_liked=True).values_list('video_id', flat=True)), {'v1'}
+        )
+
+    def test_stale_checkpoint_is_discarded(self):
+        SyncCheckpoint.objects.create(
+            user=self.user, source='liked', page_token='p2', items_written=50,
+            started_at=timezone.now() - CHECKPOINT_MAX_AGE - datetime.timedelta(minutes=1),
+        )
+        checkpoint = resume_checkpoint(self.user.id, 'liked')
+        self.assertFalse(checkpoint.resumed)
+        self.assertEqual(checkpoint.page_token, '')
+        self.assertEqual(checkpoint.items_written, 0)
@@ -0,0 +1,76 @@
+import datetime
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from videos.models import SyncLock, SyncState, UserToken
+from videos.scheduler import SyncScheduler
+from videos.sync_lock import acquire_sync_lock, get_sync_status, release_sync_lock, renew_sync_lock, run_exclusive_sync
+
+
+class SyncLockTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+
+    def test_second_acquire_misses_while_lease_is_live(self):
+        token = acquire_sync_lock(self.user.id, 'all')
+        self.assertIsNotNone(token)
+        self.assertIsNone(acquire_sync_lock(self.user.id, 'liked'))
+        self.assertTrue(get_sync_status(self.user.id)['running'])
+
+        sync = mock.Mock(return_value=True)
+        self.assertEqual(run_exclusive_sync(self.user.id, 'liked', sync), (False, None))
+        sync.assert_not_called()
+
+        release_sync_lock(self.user.id, token, True)
+        status = get_sync_status(self.user.id)
+        self.assertFalse(status['running'])
+        self.assertTrue(status['success'])
+
+    def test_expired_lease_can_be_taken_over(self):
+        stale = acquire_sync_lock(self.user.id, 'all')
+        SyncLock.objects.filter(user=self.user).update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertFalse(get_sync_status(self.user.id)['running'])
+
+        token = acquire_sync_lock(self.user.id, 'liked')
+        self.assertIsNotNone(token)
+        self.assertNotEqual(token, stale)
+        # The process that lost the lease can neither renew nor release it
+        self.assertFalse(renew_sync_lock(self.user.id, stale))
+        release_sync_lock(self.user.id, stale, False)
+        self.assertTrue(get_sync_status(self.user.id)['running'])
+        self.assertEqual(get_sync_status(self.user.id)['sync_type'], 'liked')
+
+    def test_run_exclusive_sync_releases_with_outcome(self):
+        self.assertEqual(run_exclusive_sync(self.user.id, 'all', lambda: False), (True, False))
+        status = get_sync_status(self.user.id)
+        self.assertFalse(status['running'])
+        self.assertFalse(status['success'])
+        with self.assertRaises(RuntimeError):
+            run_exclusive_sync(self.user.id, 'all', mock.Mock(side_effect=RuntimeError))
+        self.assertFalse(get_sync_status(self.user.id)['running'])
+
+
+class SyncSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        UserToken.objects.create(user=self.user, access_token='token', expires_at=timezone.now())
+        self.scheduler = SyncScheduler(max_concurrent_syncs=1, poll_seconds=30)
+        self.addCleanup(self.scheduler.shutdown)
+
+    def test_locked_users_are_not_picked(self):
+        SyncState.objects.create(user=self.user, source='liked', next_sync_at=timezone.now())
+        acquire_sync_lock(self.user.id, 'all')
+        with mock.patch.object(SyncScheduler, 'sync') as sync:
+            self.assertEqual(self.scheduler.run_once(), 0)
+        sync.assert_not_called()
+
+    def test_lock_miss_postpones_the_source(self):
+        state = SyncState.objects.create(user=self.user, source='liked', next_sync_at=timezone.now())
+        acquire_sync_lock(self.user.id, 'all')
+        self.assertFalse(self.scheduler.sync(self.user.id, 'liked'))
+
+        state.refresh_from_db()
+        self.assertGreater(state.next_sync_at, timezone.now() + datetime.timedelta(seconds=20))
+        self.assertEqual(state.consecutive_failures, 0)
+        self.assertEqual(self.scheduler.due_states(10), [])
@@ -0,0 +1,17 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from videos.sync_lock import get_sync_status
+
+
+class SyncStreamTests(TestCase):
+    def test_stream_only_follows_a_running_sync(self):
+        user = User.objects.create_user('alice')
+        self.client.force_login(user)
+        with mock.patch('videos.views.SSE_SYNC_START_SECONDS', 0), \
+                mock.patch('videos.views._run_sync') as run_sync:
+            response = self.client.get('/api/sync-videos/stream/')
+            body = b''.join(response.streaming_content).decode()
+        run_sync.assert_not_called()
+        self.assertIn('event: done', body)
+        self.assertFalse(get_sync_status(user.id)['running'])
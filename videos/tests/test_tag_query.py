@@ -0,0 +1,83 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from videos.counters import refresh_tag_counts
+from videos.models import Tag, VideoTag
+from videos.tag_query import TagQueryError, parse_query, run_query
+from videos.tagging import apply_bulk_tags
+from .utils import make_video
+
+
+def term(value, field='text'):
+    return ('term', (field, value))
+
+
+class TagQueryParserTests(TestCase):
+    def test_and_binds_tighter_than_or(self):
+        self.assertEqual(
+            parse_query('a OR b AND c'),
+            ('or', term('a'), ('and', term('b'), term('c')))
+        )
+
+    def test_adjacent_terms_are_anded(self):
+        self.assertEqual(parse_query('a b OR c'), ('or', ('and', term('a'), term('b')), term('c')))
+
+    def test_not_binds_tightest(self):
+        self.assertEqual(parse_query('NOT a b'), ('and', ('not', term('a')), term('b')))
+        self.assertEqual(parse_query('-a b'), parse_query('NOT a b'))
+
+    def test_parentheses_override_precedence(self):
+        self.assertEqual(
+            parse_query('tag:music AND (tag:live OR channel:foo) NOT liked'),
+            ('and',
+             ('and', term('music', 'tag'), ('or', term('live', 'tag'), term('foo', 'channel'))),
+             ('not', term('liked', 'is')))
+        )
+
+    def test_or_is_left_associative(self):
+        self.assertEqual(parse_query('a OR b OR c'), ('or', ('or', term('a'), term('b')), term('c')))
+
+    def test_quoted_values(self):
+        self.assertEqual(parse_query('tag:"Live Music" "exact phrase"'),
+                         ('and', term('live music', 'tag'), term('exact phrase')))
+
+    def test_errors(self):
+        for text, message in (
+            ('', 'Empty query'),
+            ('(a OR b', "Missing ')'"),
+            ('a OR', 'Query ends too early'),
+            ('NOT', 'Query ends too early'),
+            ('a )', "Unexpected ')'"),
+            ('AND a', "Unexpected 'AND'"),
+            ('genre:rock', "Unknown field 'genre:'"),
+        ):
+            with self.subTest(text=text):
+                with self.assertRaisesMessage(TagQueryError, message):
+                    parse_query(text)
+
+    def test_query_evaluation(self):
+        user = User.objects.create_user('alice')
+        music = make_video(user, 'v1', is_liked=True)
+        live = make_video(user, 'v2')
+        make_video(user, 'v3', is_liked=True)
+        apply_bulk_tags(user, [music.id], tag_names=['music'])
+        apply_bulk_tags(user, [live.id], tag_names=['live'])
+
+        total, videos = run_query(user.id, 1, 'tag:music OR tag:live NOT liked')
+        self.assertEqual(total, 2)
+        self.assertEqual({video.video_id for video in videos}, {'v1', 'v2'})
+        total, _ = run_query(user.id, 1, '(tag:music OR tag:live) NOT liked')
+        self.assertEqual(total, 1)
+
+    def test_tag_terms_agree_with_tag_counts(self):
+        user = User.objects.create_user('alice')
+        tagged = make_video(user, 'v1')
+        make_video(user, 'v2')
+        # As written by the single-tag endpoint, which only writes VideoTag
+        tag = Tag.objects.create(user=user, name='music')
+        VideoTag.objects.create(video=tagged, tag=tag)
+        refresh_tag_counts([tag.id])
+
+        total, videos = run_query(user.id, 1, 'tag:music')
+        self.assertEqual(total, Tag.objects.get(id=tag.id).video_count)
+        self.assertEqual([video.video_id for video in videos], ['v1'])
+        self.assertEqual(run_query(user.id, 1, 'is:tagged')[0], 1)
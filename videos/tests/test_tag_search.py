@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from videos import tag_search
+from videos.models import Tag
+from videos.tag_search import TagIndex
+
+TAGS = [
+    (1, 'music', 3),
+    (2, 'Music Videos', 10),
+    (3, 'musicals', 1),
+    (4, 'museum', 5),
+    (5, 'jazz', 2),
+    (6, 'mushrooms', 0),
+]
+
+
+def names(results):
+    return [result['name'] for result in results]
+
+
+class TagIndexTests(TestCase):
+    def setUp(self):
+        self.index = TagIndex(TAGS)
+
+    def test_prefix_matches_rank_most_used_first(self):
+        self.assertEqual(
+            names(self.index.search('MUS')), ['Music Videos', 'museum', 'music', 'musicals', 'mushrooms']
+        )
+        self.assertEqual(names(self.index.search('mus', limit=2)), ['Music Videos', 'museum'])
+
+    def test_typos_match_fewest_first(self):
+        self.assertEqual(names(self.index.search('musci'))[0], 'music')
+        self.assertEqual(names(self.index.search('mushroms'))[0], 'mushrooms')
+
+    def test_prefix_matches_come_before_fuzzy_ones(self):
+        results = names(self.index.search('musi'))
+        self.assertEqual(results[:3], ['Music Videos', 'music', 'musicals'])
+        self.assertEqual(results.count('music'), 1)
+
+    def test_substring_matches(self):
+        self.assertEqual(names(self.index.search('videos')), ['Music Videos'])
+
+    def test_nothing_for_blank_queries_or_unrelated_text(self):
+        self.assertEqual(self.index.search('  '), [])
+        self.assertEqual(self.index.search('mus', limit=0), [])
+        self.assertEqual(self.index.search('xylophone'), [])
+
+
+class TagSearchApiTests(TestCase):
+    def setUp(self):
+        # Ids and versions restart with each test, so no index may outlive one
+        tag_search._indexes.clear()
+        self.user = User.objects.create_user('alice')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_search_sees_new_tags(self):
+        Tag.objects.create(user=self.user, name='music', video_count=3)
+        self.assertEqual(names(self.api.get('/api/tags/?search=mus').json()), ['music'])
+
+        self.api.post('/api/tags/', {'name': 'museum'})
+        # As on a new request, whose user hasn't read the old library version
+        self.api.force_authenticate(User.objects.get(id=self.user.id))
+        self.assertEqual(names(self.api.get('/api/tags/?search=mus').json()), ['music', 'museum'])
+        self.assertEqual(self.api.get('/api/tags/?search=mus&limit=x').status_code, 400)
@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from videos.models import Tag
+from videos.tagging import BulkTagError, apply_bulk_tags
+from .utils import make_video
+
+
+class BulkTagTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.video = make_video(self.alice, 'v1')
+
+    def test_remove_never_creates_tags(self):
+        with self.assertRaises(BulkTagError) as raised:
+            apply_bulk_tags(self.alice, [self.video.id], tag_names=['missing'], operation='remove')
+        self.assertEqual(raised.exception.names, ['missing'])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_names_taken_by_another_user_are_reported(self):
+        Tag.objects.create(user=User.objects.create_user('bob'), name='taken')
+        with self.assertRaises(BulkTagError) as raised:
+            apply_bulk_tags(self.alice, [self.video.id], tag_names=['new', 'taken'])
+        self.assertEqual(raised.exception.names, ['taken'])
+        self.assertFalse(Tag.objects.filter(user=self.alice).exists())
@@ -0,0 +1,54 @@
+import json
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from videos.models import Tag, VideoTag
+from videos.tagging import apply_bulk_tags
+from .utils import make_video
+
+
+class VideoListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.music = Tag.objects.create(user=self.user, name='music')
+        self.talks = Tag.objects.create(user=self.user, name='talks')
+
+    def get_rows(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            rows = json.loads(b''.join(response.streaming_content))
+        return rows, len(queries)
+
+    def test_list_uses_list_serializer(self):
+        video = make_video(self.user, 'v1')
+        apply_bulk_tags(self.user, [video.id], tag_ids=[self.music.id], operation='add')
+
+        rows, _ = self.get_rows('/api/videos/')
+        self.assertEqual(rows[0]['video_id'], 'v1')
+        self.assertEqual([row['tag']['name'] for row in rows[0]['tags']], ['music'])
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        video = make_video(self.user, 'v1')
+        apply_bulk_tags(self.user, [video.id], tag_ids=[self.music.id], operation='add')
+        _, one_row = self.get_rows('/api/videos/')
+
+        for n in range(2, 6):
+            video = make_video(self.user, f'v{n}')
+            apply_bulk_tags(self.user, [video.id], tag_ids=[self.music.id, self.talks.id], operation='add')
+        rows, many_rows = self.get_rows('/api/videos/')
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(many_rows, one_row)
+
+    def test_by_tag_reads_video_tags(self):
+        tagged = make_video(self.user, 'v1')
+        make_video(self.user, 'v2')
+        # Only a VideoTag link, as written by the single-tag endpoint
+        VideoTag.objects.create(video=tagged, tag=self.talks)
+
+        rows, _ = self.get_rows(f'/api/videos/by_tag/?tag_id={self.talks.id}')
+        self.assertEqual([row['video_id'] for row in rows], ['v1'])
+        self.assertEqual([row['tag']['name'] for row in rows[0]['tags']], ['talks'])
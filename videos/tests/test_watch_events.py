@@ -0,0 +1,66 @@
+import datetime
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from videos.models import UserLibraryStats, WatchEvent, WatchRollup
+from videos.recent import HISTORY, recent_videos
+from videos.watch_events import WatchEventBuffer, compact_watch_events, most_watched, refresh_rollups
+from .utils import make_video
+
+
+class WatchEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.first = make_video(self.user, 'v1')
+        self.second = make_video(self.user, 'v2')
+        # Flushed by size in these tests; the hour-long timer never fires
+        self.buffer = WatchEventBuffer(max_events=3, max_age_seconds=3600)
+        self.addCleanup(self.buffer.flush)
+
+    def counts(self, period):
+        return dict(
+            WatchRollup.objects.filter(user=self.user, period=period).values_list('video_id', 'watch_count')
+        )
+
+    def test_flushes_when_full(self):
+        self.buffer.add(self.user.id, self.first.id, 'detail')
+        self.buffer.add(self.user.id, self.second.id, 'card')
+        self.assertEqual(WatchEvent.objects.count(), 0)
+
+        self.buffer.add(self.user.id, self.first.id, 'detail')
+        self.assertEqual(WatchEvent.objects.count(), 3)
+        self.assertEqual(self.counts(WatchRollup.HOUR), {self.first.id: 2, self.second.id: 1})
+        self.assertEqual(self.counts(WatchRollup.DAY), {self.first.id: 2, self.second.id: 1})
+        self.assertEqual(UserLibraryStats.objects.get(user=self.user).watch_version, 1)
+        self.assertEqual([video.video_id for video in recent_videos(self.user.id, HISTORY)], ['v1', 'v2'])
+
+    def test_flush_skips_deleted_videos(self):
+        self.buffer.add(self.user.id, self.first.id, 'detail')
+        self.buffer.add(self.user.id, self.second.id, 'detail')
+        self.second.delete()
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.counts(WatchRollup.DAY), {self.first.id: 1})
+
+    def test_rollups_are_recomputed_not_incremented(self):
+        now = timezone.now()
+        WatchEvent.objects.create(user=self.user, video=self.first, watched_at=now)
+        refresh_rollups([self.user.id], now, now + datetime.timedelta(hours=1))
+        refresh_rollups([self.user.id], now, now + datetime.timedelta(hours=1))
+        self.assertEqual(self.counts(WatchRollup.HOUR), {self.first.id: 1})
+        self.assertEqual(self.counts(WatchRollup.DAY), {self.first.id: 1})
+
+    def test_most_watched_reads_daily_rollups(self):
+        for video in (self.second, self.first, self.second):
+            self.buffer.add(self.user.id, video.id, 'detail')
+        self.assertEqual([video.video_id for video in most_watched(self.user.id)], ['v2', 'v1'])
+        self.assertEqual(most_watched(self.user.id, limit=1), [self.second])
+
+    def test_compaction_keeps_counts_of_dropped_events(self):
+        old = timezone.now() - datetime.timedelta(days=40)
+        WatchEvent.objects.create(user=self.user, video=self.first, watched_at=old)
+        refresh_rollups([self.user.id], old, old + datetime.timedelta(hours=1))
+
+        self.assertEqual(compact_watch_events(event_days=30, hourly_days=30, daily_days=365), (1, 1, 0))
+        self.assertEqual(self.counts(WatchRollup.DAY), {self.first.id: 1})
+        self.assertEqual(most_watched(self.user.id, days=60), [self.first])
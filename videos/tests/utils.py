@@ -0,0 +1,24 @@
+from django.utils import timezone
+from videos.models import Video
+
+
+def make_video(user, video_id, **fields):
+    return Video.objects.create(user=user, video_id=video_id, title=fields.pop('title', video_id),
+                                published_at=fields.pop('published_at', timezone.now()), **fields)
+
+
+# Keep the shared YouTube response cache out of the working tree
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'youtube': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-youtube'},
+}
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.text = str(self._data)
+
+    def json(self):
+        return self._data
@@ -0,0 +1,186 @@
+import hashlib
+import io
+import logging
+import os
+import shutil
+from pathlib import Path
+import requests
+from django.conf import settings
+from .models import Video
+from .counters import bump_library_version
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is optional; cards fall back to hot-linked thumbnails
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Card-sized widths generated for every cached thumbnail
+THUMBNAIL_WIDTHS = (160, 320, 480)
+THUMBNAIL_FORMATS = ('webp', 'avif')
+FETCH_TIMEOUT_SECONDS = 10
+
+
+def available_formats():
+    """Variant formats this Pillow build can encode, best first"""
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in reversed(THUMBNAIL_FORMATS) if features.check(fmt))
+
+
+def _cache_root():
+    return Path(settings.THUMBNAIL_CACHE_DIR)
+
+
+def digest_dir(digest):
+    """Content-addressed directory for a thumbnail: <root>/<ab>/<digest>/"""
+    return _cache_root() / digest[:2] / digest
+
+
+def variant_path(digest, width, fmt):
+    return digest_dir(digest) / f"{width}.{fmt}"
+
+
+def store_thumbnail(data):
+    """
+    Store card-sized variants of an image under its content hash; returns the digest
+
+    Identical images (common across users) share one directory.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    target = digest_dir(digest)
+    formats = available_formats()
+
+    if all(variant_path(digest, w, f).exists() for w in THUMBNAIL_WIDTHS for f in formats):
+        return digest
+
+    target.mkdir(parents=True, exist_ok=True)
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+
+    for width in THUMBNAIL_WIDTHS:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS) if width < image.width else image
+        for fmt in formats:
+            path = variant_path(digest, width, fmt)
+            tmp_path = path.with_suffix(f".{fmt}.tmp")
+            resized.save(tmp_path, format=fmt.upper(), quality=70)
+            os.replace(tmp_path, path)
+
+    return digest
+
+
+def fetch_and_store(url, session=None):
+    """Download a thumbnail and store it, returning its digest or None"""
+    if not url or Image is None:
+        return None
+    try:
+        response = (session or requests).get(url, timeout=FETCH_TIMEOUT_SECONDS)
+        if response.status_code != 200:
+            logger.warning(f"Failed to fetch thumbnail {url}: {response.status_code}")
+            return None
+        return store_thumbnail(response.content)
+    except Exception as e:
+        logger.warning(f"Error caching thumbnail {url}: {str(e)}")
+        return None
+
+
+def cache_thumbnails_for_user(user_id, limit=None):
+    """
+    Fetch and store thumbnails for a user's videos that aren't cached yet
+
+    Rows sharing a thumbnail URL are fetched once and updated together.
+    """
+    if Image is None:
+        return 0
+
+    pending = (
+        Video.objects.filter(user_id=user_id, thumbnail_hash='')
+        .exclude(thumbnail_url__isnull=True).exclude(thumbnail_url='')
+        .order_by().values_list('thumbnail_url', flat=True).distinct()
+    )
+    if limit:
+        pending = pending[:limit]
+
+    cached = 0
+    with requests.Session() as session:
+        for url in pending:
+            digest = fetch_and_store(url, session=session)
+            if digest:
+                cached += Video.objects.filter(
+                    user_id=user_id, thumbnail_url=url
+                ).update(thumbnail_hash=digest)
+
+    if cached:
+        logger.info(f"Cached {cached} thumbnails for user id {user_id}")
+        bump_library_version(user_id)
+        evict_thumbnails()
+    return cached
+
+
+def ensure_variant(digest, width, fmt):
+    """
+    Return the path of a variant, regenerating it if it was evicted
+
+    Returns None if the digest is unknown or can't be refetched.
+    """
+    path = variant_path(digest, width, fmt)
+    if path.exists():
+        return path
+
+    url = Video.objects.filter(thumbnail_hash=digest).values_list('thumbnail_url', flat=True).first()
+    if url and fetch_and_store(url) == digest and path.exists():
+        return path
+    return None
+
+
+def touch(path):
+    """Mark a variant as recently used for LRU eviction"""
+    try:
+        os.utime(path.parent)
+    except OSError:
+        pass
+
+
+def cache_size():
+    total = 0
+    for root, _, files in os.walk(_cache_root()):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def evict_thumbnails(max_bytes=None):
+    """
+    Delete least recently used thumbnails until the cache fits its disk budget
+
+    A digest directory's mtime is bumped whenever one of its variants is
+    served, so it orders entries by last use. Returns the bytes freed.
+    """
+    max_bytes = settings.THUMBNAIL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    root = _cache_root()
+    if not root.exists():
+        return 0
+
+    entries = []
+    total = 0
+    for shard in root.iterdir():
+        if not shard.is_dir():
+            continue
+        for entry in shard.iterdir():
+            size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+            entries.append((entry.stat().st_mtime, size, entry))
+            total += size
+
+    freed = 0
+    for _, size, entry in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        freed += size
+
+    if freed:
+        logger.info(f"Evicted {freed} bytes of cached thumbnails")
+    return freed
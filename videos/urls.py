@@ -20,13 +20,24 @@ urlpatterns = [
     path('category/<str:category>/', views.video_category_view, name='video_category'),
     path('tag/<int:tag_id>/videos/', views.tag_videos_view, name='tag_videos'),
     path('playlist/<str:playlist_id>/', views.playlist_videos_view, name='playlist_videos'),
+    path('channels/', views.channel_list_view, name='channel_list'),
+    path('channel/<str:channel_id>/', views.channel_videos_view, name='channel_videos'),
+    path('thumbs/<str:digest>/<int:width>.<str:fmt>', views.thumbnail_view, name='thumbnail'),
     
     # API endpoints
     path('api/', include(router.urls)),
     path('api/videos/<int:video_id>/description/', views.update_video_description, name='update_video_description'),
     path('api/videos/add-tag/', views.add_tag_to_video, name='add_tag_to_video'),
     path('api/videos/remove-tag/', views.remove_tag_from_video, name='remove_tag_from_video'),
+    path('api/watch/', views.record_watch, name='record_watch'),
     path('api/sync-videos/', views.sync_videos, name='sync_videos'),
+    path('api/sync-videos/stream/', views.sync_videos_stream, name='sync_videos_stream'),
+    path('api/sync-videos/status/', views.sync_status, name='sync_status'),
+    path('api/export/library.<str:fmt>', views.export_library, name='export_library'),
+    path('api/import/library/', views.import_library, name='import_library'),
     path('api/save-to-drive/', views.save_to_drive, name='save_to_drive'),
     path('api/load-from-drive/', views.load_from_drive, name='load_from_drive'),
+    path('api/async/sync-videos/', views.sync_videos_async, name='sync_videos_async'),
+    path('api/async/save-to-drive/', views.save_to_drive_async, name='save_to_drive_async'),
+    path('api/async/load-from-drive/', views.load_from_drive_async, name='load_from_drive_async'),
 ] 
\ No newline at end of file
@@ -2,10 +2,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import login
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponseRedirect, StreamingHttpResponse, FileResponse, Http404
 from django.conf import settings
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.db import transaction
 from django.urls import reverse
 from rest_framework import viewsets, permissions, status
@@ -13,22 +14,60 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 import datetime
+import json
 import logging
+import queue
+import time
 import requests
 from django.db import models
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 
-from .models import UserToken, Video, Tag, VideoTag, Playlist
+from .models import UserToken, Video, Tag, VideoTag, Playlist, Channel
 from .serializers import (
     VideoListSerializer, VideoDetailSerializer, VideoUpdateSerializer,
     TagSerializer, TagCreateSerializer, VideoTagCreateSerializer,
-    VideoSerializer
+    VideoSerializer, BulkTagSerializer
+)
+from .tagging import apply_bulk_tags, BulkTagError
+from .counters import (
+    refresh_tag_counts, refresh_video_channel_counts, refresh_channel_counts, refresh_playlist_counts,
+    refresh_library_stats, bump_library_version
+)
+from .conditional import (
+    library_conditional, library_conditional_method, similarity_conditional_method,
+    user_library_version, user_similarity_version
+)
+from . import thumbnails
+from .related import get_related_videos
+from .similarity import suggest_tags
+from .watch_events import watch_event_buffer, most_watched, WATCH_SOURCES, SHELF_SIZE
+from .recent import recent_videos, HISTORY, RECENT
+from .sync_checkpoint import pending_dead_letters
+from .tag_search import search_tags, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT
+from .tag_query import is_boolean_query, run_query, TagQueryError
+from .exports import (
+    stream_queryset, json_array_lines, export_rows, EXPORT_WRITERS, EXPORT_CONTENT_TYPES
+)
+from .library_transfer import (
+    LIBRARY_CONTENT_TYPES, LibraryTransferError, library_export_chunks, library_format_for,
+    read_library_rows, import_library as import_library_rows
 )
 from .youtube_api import YouTubeAPI
 from .drive_service import GoogleDriveService
+from .async_youtube_api import AsyncYouTubeAPI
+from .async_drive_service import AsyncGoogleDriveService
+from .sync_events import sync_event_bus, format_sse
+from .sync_lock import (
+    run_exclusive_sync, wait_for_sync, get_sync_status, arun_exclusive_sync, await_sync
+)
 
 logger = logging.getLogger(__name__)
 
+SSE_KEEPALIVE_SECONDS = 15
+
+# How long a progress stream waits for a sync to take the lock before giving up
+SSE_SYNC_START_SECONDS = 5
+
 # Web Views
 def login_view(request):
     """Render the login page with Google OAuth link"""
@@ -39,50 +78,72 @@ def login_view(request):
     return render(request, 'videos/login.html', {'auth_url': auth_url})
 
 @login_required
+@library_conditional
 def dashboard_view(request):
     """Render the dashboard with user's videos and search functionality"""
     # Get search query
     query = request.GET.get('q', '').strip()
     videos = Video.objects.filter(user=request.user)
+    boolean_query = bool(query) and is_boolean_query(query)
+    
+    if boolean_query:
+        # e.g. tag:music AND (tag:live OR channel:foo) NOT liked, evaluated on bitmaps
+        try:
+            match_count, matches = run_query(request.user.id, user_library_version(request.user), query)
+            query_error = None
+        except TagQueryError as e:
+            match_count, matches, query_error = 0, [], str(e)
+    elif query:
+        # Search in title, description, and channel
+        videos = videos.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(youtube_description__icontains=query) |
+            Q(channel_title__icontains=query)
+        ).distinct()
     
-    if query:
-        if query.startswith('tag:'):
-            # Search by tag
-            tag_name = query[4:].strip()
-            videos = videos.filter(tags__name__icontains=tag_name)
-        else:
-            # Search in title, description, and channel
-            videos = videos.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(youtube_description__icontains=query) |
-                Q(channel_title__icontains=query)
-            ).distinct()
-    
-    # Get user tags for sidebar
-    user_tags = Tag.objects.filter(user=request.user).order_by('name')
-    
-    # Get user playlists for sidebar
+    # Get user playlists for their dashboard shelves
     user_playlists = Playlist.objects.filter(user=request.user).order_by('title')
     
     # Get video categories
     video_categories = {}
     
-    if query:
+    if boolean_query:
+        video_categories[f'Search Results ({match_count})'] = {
+            'videos': matches,
+            'view_all_url': None,
+            'empty_message': query_error or f'No results found for "{query}"',
+            'icon': 'fa-search'
+        }
+    elif query:
         # If searching, show results in a single category
         if videos.exists():
             video_categories['Search Results'] = {
-                'videos': videos.order_by('-published_at'),
+                'videos': videos.order_by('-published_at').for_list(),
                 'view_all_url': None,
                 'empty_message': f'No results found for "{query}"',
                 'icon': 'fa-search'
             }
     else:
         # Regular dashboard categories
+        # Recency shelves read one ring row each; most watched reads the daily rollups
+        for title, shelf, category, icon in (
+            ('Recently Watched', recent_videos(request.user.id, HISTORY, SHELF_SIZE), 'history', 'fa-history'),
+            ('Most Watched', most_watched(request.user.id), None, 'fa-fire'),
+            ('Recently Added', recent_videos(request.user.id, RECENT, SHELF_SIZE), 'recent', 'fa-clock'),
+        ):
+            if shelf:
+                video_categories[title] = {
+                    'videos': shelf,
+                    'view_all_url': reverse('video_category', kwargs={'category': category}) if category else None,
+                    'empty_message': 'No videos yet',
+                    'icon': icon
+                }
+
         # Get liked videos
         has_liked_playlist = Playlist.objects.filter(user=request.user, playlist_id='LL').exists()
         if not has_liked_playlist:
-            liked_videos = Video.objects.filter(user=request.user, is_liked=True).order_by('-published_at')[:12]
+            liked_videos = Video.objects.filter(user=request.user, is_liked=True).order_by('-published_at').for_list()[:12]
             if liked_videos.exists():
                 video_categories['Liked Videos'] = {
                     'videos': liked_videos,
@@ -100,7 +161,7 @@ def dashboard_view(request):
                 models.Q(is_saved=True) | ~models.Q(playlist_id='')
             ).exclude(
                 is_liked=True
-            ).order_by('-published_at')[:12]
+            ).order_by('-published_at').for_list()[:12]
             
             if saved_videos.exists():
                 video_categories['Saved Videos'] = {
@@ -110,16 +171,16 @@ def dashboard_view(request):
                     'icon': 'fa-bookmark'
                 }
         
-        # Get videos by tag
-        tags_with_counts = Tag.objects.filter(user=request.user).annotate(
-            video_count=models.Count('tagged_videos')
+        # Get videos by tag (top tags by their maintained video_count)
+        tags_with_counts = Tag.objects.filter(
+            user=request.user, video_count__gt=0
         ).order_by('-video_count')[:3]
         
         for tag in tags_with_counts:
             tag_videos = Video.objects.filter(
                 user=request.user, 
                 video_tags__tag=tag
-            ).order_by('-published_at')[:12]
+            ).order_by('-published_at').for_list()[:12]
             
             if tag_videos.exists():
                 video_categories[f'Tagged: {tag.name}'] = {
@@ -138,7 +199,7 @@ def dashboard_view(request):
             playlist_videos = Video.objects.filter(
                 user=request.user,
                 playlist_id=playlist.playlist_id
-            ).order_by('-published_at')[:12]
+            ).order_by('-published_at').for_list()[:12]
             
             if playlist_videos.exists():
                 video_categories[f'Playlist: {playlist.title}'] = {
@@ -150,29 +211,28 @@ def dashboard_view(request):
     
     return render(request, 'videos/dashboard.html', {
         'video_categories': video_categories,
-        'user_tags': user_tags,
-        'user_playlists': user_playlists,
         'search_query': query,
     })
 
 @login_required
 def video_detail_view(request, video_id):
     """Render the detail page for a specific video"""
-    video = get_object_or_404(Video, user=request.user, id=video_id)
+    # The video's tags are loaded once here and reused by every part of the page
+    video = get_object_or_404(
+        Video.objects.prefetch_related(models.Prefetch('tags', Tag.objects.only('id', 'name'))),
+        user=request.user, id=video_id
+    )
+    video_tags = [tag.id for tag in video.tags.all()]
     
-    # Get all user tags and video tags
-    user_tags = Tag.objects.filter(user=request.user).order_by('name')
-    video_tags = VideoTag.objects.filter(video=video).values_list('tag_id', flat=True)
-    
-    # Get user playlists for sidebar
-    user_playlists = Playlist.objects.filter(user=request.user).order_by('title')
+    # The sidebar reads the same stats row, so the versions cost no extra query
+    library_version = user_library_version(request.user)
+    similarity_version = user_similarity_version(request.user)
     
     return render(request, 'videos/video_detail.html', {
         'video': video,
-        'user_tags': user_tags,
-        'tags': user_tags,  # For backward compatibility
-        'user_playlists': user_playlists,
-        'video_tags': list(video_tags),
+        'video_tags': video_tags,
+        'related_videos': get_related_videos(video, library_version, similarity_version),
+        'suggested_tags': suggest_tags(video, video_tags, similarity_version),
     })
 
 def oauth_callback(request):
@@ -266,48 +326,145 @@ def oauth_callback(request):
     # Log the user in
     login(request, user)
     
-    # Sync videos for the user
+    # Sync videos for the user, unless a sync is already running for them
     youtube_api = YouTubeAPI(user=user)
-    youtube_api.sync_videos_for_user()
+    started, _ = run_exclusive_sync(user.id, 'all', youtube_api.sync_videos_for_user)
+    if not started:
+        logger.info(f"Sync already running for user {user.username}; skipping login sync")
     
     return redirect('dashboard')
 
 # API Views
-class VideoViewSet(viewsets.ModelViewSet):
+class LibraryVersionMixin:
+    """Viewset writes bump the user's library version; list responses carry ETags"""
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+        bump_library_version(self.request.user.id)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        bump_library_version(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_library_version(self.request.user.id)
+
+    @library_conditional_method
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+class StreamingListMixin:
+    """
+    List responses are streamed as a JSON array one row at a time
+
+    Rows are read in chunks with a server-side cursor where available, so
+    memory use stays flat however large the list is.
+    """
+
+    def stream_list(self, queryset):
+        serializer = self.get_serializer()
+        rows = (serializer.to_representation(obj) for obj in stream_queryset(queryset))
+        return StreamingHttpResponse(json_array_lines(rows), content_type='application/json')
+
+    def list(self, request, *args, **kwargs):
+        return self.stream_list(self.filter_queryset(self.get_queryset()))
+
+class VideoViewSet(LibraryVersionMixin, StreamingListMixin, viewsets.ModelViewSet):
     """API viewset for listing and retrieving videos"""
     serializer_class = VideoSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Video.objects.filter(user=self.request.user).order_by('-published_at')
-    
+        videos = Video.objects.filter(user=self.request.user).order_by('-published_at')
+        if self.action in ('list', 'by_tag'):
+            videos = videos.prefetch_related(Prefetch('video_tags', VideoTag.objects.select_related('tag')))
+        return videos
+
+    def get_serializer_class(self):
+        if self.action in ('list', 'by_tag'):
+            return VideoListSerializer
+        return super().get_serializer_class()
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # Tag counts are refreshed by the serializer; a failed tag change rolls the video back
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+            refresh_library_stats(self.request.user.id)
+            bump_library_version(self.request.user.id)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            refresh_library_stats(self.request.user.id)
+            bump_library_version(self.request.user.id)
+
+    def perform_destroy(self, instance):
+        """Delete a video and refresh every counter it was counted in"""
+        user_id = self.request.user.id
+        tag_ids = list(VideoTag.objects.filter(video=instance).values_list('tag_id', flat=True))
+        with transaction.atomic():
+            instance.delete()
+            refresh_tag_counts(tag_ids)
+            if instance.playlist_id:
+                refresh_playlist_counts(user_id)
+            if instance.channel_id:
+                refresh_channel_counts(user_id, [instance.channel_id])
+            refresh_library_stats(user_id)
+            bump_library_version(user_id)
 
     @action(detail=True, methods=['post'])
     def add_tags(self, request, pk=None):
         video = self.get_object()
-        tag_ids = request.data.get('tag_ids', [])
-        
-        # Create new tags if they don't exist
-        for tag_name in request.data.get('new_tags', []):
-            tag, created = Tag.objects.get_or_create(
-                name=tag_name,
-                user=request.user
+        try:
+            apply_bulk_tags(
+                request.user, [video.id],
+                tag_ids=request.data.get('tag_ids', []),
+                tag_names=request.data.get('new_tags', []),
+                operation='add'
             )
-            tag_ids.append(tag.id)
-        
-        # Add tags to video
-        video.tags.add(*tag_ids)
+        except (BulkTagError, ValueError, TypeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.get_serializer(video).data)
 
     @action(detail=True, methods=['post'])
     def remove_tags(self, request, pk=None):
         video = self.get_object()
-        tag_ids = request.data.get('tag_ids', [])
-        video.tags.remove(*tag_ids)
+        try:
+            apply_bulk_tags(
+                request.user, [video.id],
+                tag_ids=request.data.get('tag_ids', []),
+                operation='remove'
+            )
+        except (BulkTagError, ValueError, TypeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.get_serializer(video).data)
 
+    @action(detail=True, methods=['get'])
+    @similarity_conditional_method
+    def suggested_tags(self, request, pk=None):
+        """Tags the user is likely to add to this video, best first"""
+        video = self.get_object()
+        tag_ids = list(video.tags.values_list('id', flat=True))
+        return Response(suggest_tags(video, tag_ids, user_similarity_version(request.user)))
+
+    @action(detail=False, methods=['post'], url_path='bulk-tags')
+    def bulk_tags(self, request):
+        """Add, remove or replace tags on many videos in one call"""
+        serializer = BulkTagSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            tag_state = apply_bulk_tags(request.user, **serializer.validated_data)
+        except BulkTagError as e:
+            return Response({'error': str(e), 'unresolved_tags': e.names}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'success': True,
+            'videos': [{'id': video_id, 'tags': tags} for video_id, tags in tag_state.items()]
+        })
+
     @action(detail=False, methods=['get'])
     def by_tag(self, request):
         tag_id = request.query_params.get('tag_id')
@@ -318,19 +475,30 @@ class VideoViewSet(viewsets.ModelViewSet):
             )
         
         tag = get_object_or_404(Tag, id=tag_id, user=request.user)
-        videos = self.get_queryset().filter(tags=tag)
-        return Response(self.get_serializer(videos, many=True).data)
+        return self.stream_list(self.get_queryset().filter(video_tags__tag=tag))
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(LibraryVersionMixin, viewsets.ModelViewSet):
     """API viewset for managing tags"""
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         return Tag.objects.filter(user=self.request.user).order_by('name')
-    
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        """List the user's tags, or autocomplete them with ?search=<text>[&limit=<n>]"""
+        query = request.query_params.get('search', '').strip()
+        if not query:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            limit = min(int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(search_tags(request.user, query, limit))
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -355,7 +523,12 @@ def add_tag_to_video(request):
         )
     
     # Create the relation if it doesn't exist
-    video_tag, created = VideoTag.objects.get_or_create(video=video, tag=tag)
+    with transaction.atomic():
+        video_tag, created = VideoTag.objects.get_or_create(video=video, tag=tag)
+        if created:
+            refresh_tag_counts([tag.id])
+            refresh_video_channel_counts(request.user.id, [video.id])
+            bump_library_version(request.user.id)
     
     return Response(
         {'success': True, 'created': created},
@@ -376,11 +549,16 @@ def remove_tag_from_video(request):
         )
     
     try:
-        VideoTag.objects.filter(
-            video__id=video_id,
-            tag__id=tag_id,
-            video__user=request.user
-        ).delete()
+        with transaction.atomic():
+            deleted, _ = VideoTag.objects.filter(
+                video__id=video_id,
+                tag__id=tag_id,
+                video__user=request.user
+            ).delete()
+            if deleted:
+                refresh_tag_counts([tag_id])
+                refresh_video_channel_counts(request.user.id, [video_id])
+                bump_library_version(request.user.id)
         return Response({'success': True}, status=status.HTTP_200_OK)
     except Exception as e:
         return Response(
@@ -403,29 +581,63 @@ def update_video_description(request, video_id):
     serializer = VideoUpdateSerializer(video, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        bump_library_version(request.user.id)
         return Response(serializer.data)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def sync_videos(request):
-    """Manually trigger a sync of the user's YouTube videos"""
-    sync_type = request.data.get('sync_type', 'all')
-    youtube_api = YouTubeAPI(user=request.user)
-    
+def record_watch(request):
+    """
+    Beacon sent when a video is opened from the app
+
+    The event is only buffered here; watch_events.py writes buffered events
+    in batches, so a beacon costs one indexed lookup and no write.
+    """
+    source = request.data.get('source', 'detail')
+    if source not in WATCH_SOURCES:
+        return Response({'error': f"source must be one of {', '.join(WATCH_SOURCES)}"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        video_id = int(request.data.get('video'))
+    except (TypeError, ValueError):
+        return Response({'error': 'video must be a video id'}, status=status.HTTP_400_BAD_REQUEST)
+    if not Video.objects.filter(id=video_id, user=request.user).exists():
+        return Response({'error': 'Video not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    watch_event_buffer.add(request.user.id, video_id, source)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+def _run_sync(user, sync_type):
+    """
+    Run a sync of the given type for a user, returning (success, message)
+
+    If another request or worker is already syncing the user, waits for
+    that sync and returns its outcome instead of starting a second one.
+    """
+    youtube_api = YouTubeAPI(user=user)
+
     if sync_type == 'liked':
-        # Only sync liked videos
-        success = youtube_api._sync_liked_videos()
-        message = "Liked videos synced successfully"
+        sync, message = lambda: youtube_api.sync_source('liked'), "Liked videos synced successfully"
     elif sync_type == 'saved':
-        # Only sync watch later videos
-        success = youtube_api._sync_watch_later_videos()
-        message = "Saved videos synced successfully"
+        sync, message = lambda: youtube_api.sync_source('saved'), "Saved videos synced successfully"
     else:
-        # Sync all videos
-        success = youtube_api.sync_videos_for_user()
-        message = "All videos synced successfully"
+        sync, message = youtube_api.sync_videos_for_user, "All videos synced successfully"
+
+    started, success = run_exclusive_sync(user.id, sync_type, sync)
+    if not started:
+        running = wait_for_sync(user.id)
+        return bool(running['success']), "Joined the sync already in progress"
+    # Ends any progress streams following this sync
+    sync_event_bus.publish(user.id, 'done', success=success, message=message)
+    return success, message
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def sync_videos(request):
+    """Manually trigger a sync of the user's YouTube videos"""
+    sync_type = request.data.get('sync_type', 'all')
+    success, message = _run_sync(request.user, sync_type)
     
     if success:
         return Response({'success': True, 'message': message})
@@ -435,26 +647,118 @@ def sync_videos(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_status(request):
+    """
+    Whether a sync is running for the user, and the outcome of the latest one
+
+    failed_items counts items syncs couldn't save that are still due a retry.
+    """
+    return Response({
+        **get_sync_status(request.user.id),
+        'failed_items': pending_dead_letters(request.user.id).count(),
+    })
+
+@login_required
+def export_library(request, fmt):
+    """Stream the user's whole library as NDJSON or CSV, or as a gzip NDJSON / Parquet backup"""
+    if fmt in EXPORT_WRITERS:
+        chunks = EXPORT_WRITERS[fmt](export_rows(request.user.id))
+        content_type = EXPORT_CONTENT_TYPES[fmt]
+    elif fmt in LIBRARY_CONTENT_TYPES:
+        try:
+            chunks = library_export_chunks(request.user.id, fmt)
+        except LibraryTransferError as e:
+            raise Http404(str(e))
+        content_type = LIBRARY_CONTENT_TYPES[fmt]
+    else:
+        raise Http404(f"Unknown export format '{fmt}'")
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="youtuboxd-library.{fmt}"'
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_library(request):
+    """Merge an uploaded library backup (.ndjson.gz or .parquet) into the user's library"""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        fmt = library_format_for(upload.name)
+        imported = import_library_rows(request.user, read_library_rows(upload, fmt))
+    except LibraryTransferError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'success': True, 'imported': imported})
+
 @login_required
+def sync_videos_stream(request):
+    """
+    Stream the progress of the user's running sync as server-sent events
+
+    Only subscribes to the sync event bus; syncs are started through the
+    POST sync endpoint. A client may connect just before its POST takes the
+    sync lock, so the stream waits SSE_SYNC_START_SECONDS for a sync to
+    start, then ends with a 'done' event once none is running.
+    """
+    user = request.user
+    events = sync_event_bus.subscribe(user.id)
+
+    def finished():
+        status = get_sync_status(user.id)
+        return {'event': 'done', 'success': bool(status['success'])}
+
+    def stream():
+        try:
+            running = get_sync_status(user.id)['running']
+            deadline = time.monotonic() + SSE_SYNC_START_SECONDS
+            while True:
+                try:
+                    message = events.get(timeout=SSE_KEEPALIVE_SECONDS if running else 1)
+                except queue.Empty:
+                    if get_sync_status(user.id)['running']:
+                        running = True
+                    elif running or time.monotonic() > deadline:
+                        # Finished in another process, or never started
+                        yield format_sse(finished())
+                        break
+                    # Comment frame keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                running = True
+                yield format_sse(message)
+                if message['event'] == 'done':
+                    break
+        finally:
+            sync_event_bus.unsubscribe(user.id, events)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+@library_conditional
 def video_category_view(request, category):
     """View for a specific category of videos"""
-    # Get all user tags
-    user_tags = Tag.objects.filter(user=request.user).order_by('name')
-    
-    # Get user playlists for sidebar
-    user_playlists = Playlist.objects.filter(user=request.user).order_by('title')
-    
     # Get videos based on category
     if category == 'liked':
-        videos = Video.objects.filter(user=request.user, is_liked=True).order_by('-published_at')
+        videos = Video.objects.filter(user=request.user, is_liked=True).order_by('-published_at').for_list()
         title = "Liked Videos"
         icon = "fa-heart"
     elif category == 'history':
-        # Redirect to dashboard if history category is accessed directly
-        return redirect('dashboard')
+        # Bounded rings, newest first; never a sort over the whole library
+        videos = recent_videos(request.user.id, HISTORY)
+        title = "Watch History"
+        icon = "fa-history"
     elif category == 'recent':
-        # Redirect to dashboard if recent category is accessed directly
-        return redirect('dashboard')
+        videos = recent_videos(request.user.id, RECENT)
+        title = "Recently Added"
+        icon = "fa-clock"
     elif category == 'saved':
         # For saved videos, show videos in playlists or marked as saved, but exclude liked videos
         videos = Video.objects.filter(
@@ -463,53 +767,73 @@ def video_category_view(request, category):
             models.Q(is_saved=True) | ~models.Q(playlist_id='')
         ).exclude(
             is_liked=True
-        ).order_by('-published_at')
+        ).order_by('-published_at').for_list()
         title = "Saved Videos"
         icon = "fa-bookmark"
     else:
         # Default to all videos
-        videos = Video.objects.filter(user=request.user).order_by('-published_at')
+        videos = Video.objects.filter(user=request.user).order_by('-published_at').for_list()
         title = "All Videos"
         icon = "fa-video"
     
     return render(request, 'videos/category.html', {
         'videos': videos,
-        'user_tags': user_tags,
-        'tags': user_tags,  # For backward compatibility
-        'user_playlists': user_playlists,
         'title': title,
         'icon': icon,
         'category': category
     })
 
 @login_required
+@library_conditional
 def tag_videos_view(request, tag_id):
     """View for videos with a specific tag"""
     # Get the tag
     tag = get_object_or_404(Tag, id=tag_id, user=request.user)
     
-    # Get all user tags
-    user_tags = Tag.objects.filter(user=request.user).order_by('name')
-    
-    # Get user playlists for sidebar
-    user_playlists = Playlist.objects.filter(user=request.user).order_by('title')
-    
     # Get videos with this tag
     videos = Video.objects.filter(
         user=request.user,
         video_tags__tag=tag
-    ).order_by('-published_at')
+    ).order_by('-published_at').for_list()
     
     return render(request, 'videos/category.html', {
         'videos': videos,
-        'user_tags': user_tags,
-        'tags': user_tags,  # For backward compatibility
-        'user_playlists': user_playlists,
         'title': f"Videos Tagged: {tag.name}",
         'icon': "fa-tag",
         'category': f"tag-{tag.id}"
     })
 
+@login_required
+@library_conditional
+def channel_list_view(request):
+    """View listing the channels in the user's library, biggest first"""
+    # Counts are precomputed on Channel, so this is one indexed read
+    channels = Channel.objects.filter(
+        user=request.user, video_count__gt=0
+    ).order_by('-video_count', 'title')
+
+    return render(request, 'videos/channels.html', {
+        'channels': channels,
+    })
+
+@login_required
+@library_conditional
+def channel_videos_view(request, channel_id):
+    """View for videos from a specific channel"""
+    channel = get_object_or_404(Channel, user=request.user, channel_id=channel_id)
+    videos = Video.objects.filter(
+        user=request.user,
+        channel_id=channel_id
+    ).order_by('-published_at').for_list()
+
+    return render(request, 'videos/category.html', {
+        'videos': videos,
+        'channel': channel,
+        'title': f"Channel: {channel.title}",
+        'icon': "fa-user",
+        'category': f"channel-{channel_id}"
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def save_to_drive(request):
@@ -546,6 +870,27 @@ def load_from_drive(request):
             'message': 'Failed to load tags from Google Drive'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def thumbnail_view(request, digest, width, fmt):
+    """
+    Serve a resized thumbnail variant from the local content-addressed cache
+
+    The URL includes the image's content hash, so responses never change and
+    can be cached by browsers and proxies indefinitely.
+    """
+    if (len(digest) != 64 or not all(c in '0123456789abcdef' for c in digest)
+            or width not in thumbnails.THUMBNAIL_WIDTHS
+            or fmt not in thumbnails.available_formats()):
+        raise Http404("Unknown thumbnail")
+
+    path = thumbnails.ensure_variant(digest, width, fmt)
+    if path is None:
+        raise Http404("Thumbnail not available")
+
+    thumbnails.touch(path)
+    response = FileResponse(open(path, 'rb'), content_type=f'image/{fmt}')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 def logout_view(request):
     """
     Custom logout view that properly handles OAuth sessions
@@ -587,14 +932,9 @@ def logout_view(request):
     return redirect('login')
 
 @login_required
+@library_conditional
 def playlist_videos_view(request, playlist_id):
     """View for videos in a specific playlist"""
-    # Get all user tags
-    user_tags = Tag.objects.filter(user=request.user).order_by('name')
-    
-    # Get all user playlists
-    user_playlists = Playlist.objects.filter(user=request.user).order_by('title')
-    
     # Handle special playlists
     if playlist_id == 'LL':
         return redirect('video_category', category='liked')
@@ -613,13 +953,95 @@ def playlist_videos_view(request, playlist_id):
     videos = Video.objects.filter(
         user=request.user,
         playlist_id=playlist_id
-    ).order_by('-published_at')
+    ).order_by('-published_at').for_list()
     
     return render(request, 'videos/category.html', {
         'videos': videos,
-        'user_tags': user_tags,
-        'user_playlists': user_playlists,
         'title': title,
         'icon': "fa-list",
         'category': f"playlist-{playlist_id}"
     })
+
+
+# Async API views (serve these under ASGI, e.g. uvicorn youtuboxd.asgi:application)
+async def _get_authenticated_user(request):
+    """Return the request's user, or None if not logged in"""
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+def _unauthenticated_response():
+    return JsonResponse(
+        {'detail': 'Authentication credentials were not provided.'},
+        status=status.HTTP_403_FORBIDDEN
+    )
+
+@require_POST
+async def sync_videos_async(request):
+    """Async variant of sync_videos that does not tie up a worker thread"""
+    user = await _get_authenticated_user(request)
+    if user is None:
+        return _unauthenticated_response()
+
+    try:
+        sync_type = json.loads(request.body or '{}').get('sync_type', 'all')
+    except ValueError:
+        sync_type = 'all'
+
+    youtube_api = await AsyncYouTubeAPI.for_user(user)
+
+    if sync_type == 'liked':
+        sync, message = lambda: youtube_api.sync_source('liked'), "Liked videos synced successfully"
+    elif sync_type == 'saved':
+        sync, message = lambda: youtube_api.sync_source('saved'), "Saved videos synced successfully"
+    else:
+        sync, message = youtube_api.sync_videos_for_user, "All videos synced successfully"
+
+    started, success = await arun_exclusive_sync(user.id, sync_type, sync)
+    if not started:
+        # Attach to the sync another request or worker is running
+        running = await await_sync(user.id)
+        success = bool(running['success'])
+        message = "Joined the sync already in progress"
+
+    if success:
+        return JsonResponse({'success': True, 'message': message})
+    return JsonResponse(
+        {'success': False, 'message': 'Failed to sync videos'},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
+
+@require_POST
+async def save_to_drive_async(request):
+    """Async variant of save_to_drive"""
+    user = await _get_authenticated_user(request)
+    if user is None:
+        return _unauthenticated_response()
+
+    drive_service = await AsyncGoogleDriveService.for_user(user)
+    if await drive_service.save_tags_to_drive():
+        return JsonResponse({
+            'success': True,
+            'message': 'Successfully saved tags to Google Drive'
+        })
+    return JsonResponse({
+        'success': False,
+        'message': 'Failed to save tags to Google Drive'
+    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@require_POST
+async def load_from_drive_async(request):
+    """Async variant of load_from_drive"""
+    user = await _get_authenticated_user(request)
+    if user is None:
+        return _unauthenticated_response()
+
+    drive_service = await AsyncGoogleDriveService.for_user(user)
+    if await drive_service.load_tags_from_drive():
+        return JsonResponse({
+            'success': True,
+            'message': 'Successfully loaded tags from Google Drive'
+        })
+    return JsonResponse({
+        'success': False,
+        'message': 'Failed to load tags from Google Drive'
+    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
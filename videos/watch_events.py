@@ -0,0 +1,177 @@
+import atexit
+import datetime
+import logging
+import threading
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from .models import Video, WatchEvent, WatchRollup
+from .counters import bump_watch_versions
+from .recent import push_recent, HISTORY
+
+logger = logging.getLogger(__name__)
+
+# Where a beacon can come from: the detail page, or a card's link to YouTube
+WATCH_SOURCES = ('detail', 'card')
+
+SHELF_SIZE = 12
+MOST_WATCHED_DAYS = 30
+
+HOUR = datetime.timedelta(hours=1)
+DAY = datetime.timedelta(days=1)
+
+
+def refresh_rollups(user_ids, start, end):
+    """
+    Recompute the hourly and daily rollups covering [start, end)
+
+    Rollups are recomputed from the rows below them rather than incremented,
+    so running this twice, or from two processes at once, can't double count.
+    user_ids of None covers every user.
+    """
+    hour_start = start.replace(minute=0, second=0, microsecond=0)
+    day_start = hour_start.replace(hour=0)
+    events = WatchEvent.objects.filter(watched_at__gte=hour_start, watched_at__lt=end)
+    hours = WatchRollup.objects.filter(period=WatchRollup.HOUR, period_start__gte=day_start, period_start__lt=end)
+    if user_ids is not None:
+        events = events.filter(user_id__in=user_ids)
+        hours = hours.filter(user_id__in=user_ids)
+
+    hourly = events.annotate(start=TruncHour('watched_at')).values('user_id', 'video_id', 'start').annotate(
+        count=Count('id'), last=Max('watched_at')
+    ).order_by()
+    _save_rollups(WatchRollup.HOUR, hourly)
+
+    daily = hours.annotate(start=TruncDay('period_start')).values('user_id', 'video_id', 'start').annotate(
+        count=Sum('watch_count'), last=Max('last_watched_at')
+    ).order_by()
+    _save_rollups(WatchRollup.DAY, daily)
+
+
+def _save_rollups(period, rows):
+    WatchRollup.objects.bulk_create(
+        [
+            WatchRollup(
+                user_id=row['user_id'], video_id=row['video_id'], period=period,
+                period_start=row['start'], watch_count=row['count'], last_watched_at=row['last'],
+            )
+            for row in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'video', 'period', 'period_start'],
+        update_fields=['watch_count', 'last_watched_at'],
+        batch_size=500,
+    )
+
+
+class WatchEventBuffer:
+    """
+    In-process buffer of watch events
+
+    Beacons only append to a list; the events are written with one
+    bulk_create, and their rollups refreshed, once max_events have queued
+    up or the oldest has waited max_age_seconds, whichever comes first.
+    Events still buffered when a process dies are lost, which is an
+    acceptable price for counts that feed shelves, not billing.
+    """
+
+    def __init__(self, max_events, max_age_seconds):
+        self.max_events = max_events
+        self.max_age_seconds = max_age_seconds
+        self._events = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, user_id, video_id, source):
+        with self._lock:
+            self._events.append(WatchEvent(user_id=user_id, video_id=video_id, source=source, watched_at=timezone.now()))
+            full = len(self._events) >= self.max_events
+            if not full and self._timer is None:
+                # The first event of a batch starts its clock
+                self._timer = threading.Timer(self.max_age_seconds, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+    def flush(self):
+        """Write every buffered event, returning how many were saved"""
+        with self._lock:
+            events, self._events = self._events, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not events:
+            return 0
+
+        try:
+            # Videos deleted since their beacon would fail the whole batch
+            existing = set(Video.objects.filter(id__in={event.video_id for event in events}).values_list('id', flat=True))
+            events = [event for event in events if event.video_id in existing]
+            if not events:
+                return 0
+            user_ids = {event.user_id for event in events}
+            with transaction.atomic():
+                WatchEvent.objects.bulk_create(events, batch_size=500)
+                refresh_rollups(user_ids, min(event.watched_at for event in events), timezone.now() + HOUR)
+                for user_id in user_ids:
+                    push_recent(user_id, HISTORY, [event.video_id for event in events if event.user_id == user_id])
+                bump_watch_versions(user_ids)
+        except DatabaseError as e:
+            logger.exception(f"Dropping {len(events)} watch events: {str(e)}")
+            return 0
+        return len(events)
+
+
+watch_event_buffer = WatchEventBuffer(settings.WATCH_EVENT_BUFFER_SIZE, settings.WATCH_EVENT_FLUSH_SECONDS)
+atexit.register(watch_event_buffer.flush)
+
+
+def most_watched(user_id, days=MOST_WATCHED_DAYS, limit=SHELF_SIZE):
+    """The user's most watched videos over the last days, read from daily rollups"""
+    since = (timezone.now() - datetime.timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    ids = list(
+        WatchRollup.objects.filter(user_id=user_id, period=WatchRollup.DAY, period_start__gte=since)
+        .values('video_id').annotate(total=Sum('watch_count'), last=Max('last_watched_at'))
+        .order_by('-total', '-last').values_list('video_id', flat=True)[:limit]
+    )
+    videos = Video.objects.filter(id__in=ids).for_list().in_bulk()
+    return [videos[video_id] for video_id in ids if video_id in videos]
+
+
+def compact_watch_events(event_days, hourly_days, daily_days, batch_size=5000):
+    """
+    Apply retention, returning (events, hourly rollups, daily rollups) deleted
+
+    Before anything is deleted, the rollups of the last day are recomputed
+    from raw events, which reconciles flushes from several processes that
+    raced on the same hour. Raw events are always rolled up as they're
+    written, so dropping old ones loses no counts; hourly rollups go next
+    and daily rollups last. Deletes run in batches to keep each transaction
+    short.
+    """
+    now = timezone.now()
+    refresh_rollups(None, now - DAY, now + HOUR)
+
+    def delete_before(queryset, field, days):
+        cutoff = now - datetime.timedelta(days=days)
+        deleted = 0
+        while True:
+            ids = list(queryset.filter(**{f'{field}__lt': cutoff}).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += queryset.filter(id__in=ids).delete()[0]
+
+    return (
+        delete_before(WatchEvent.objects.all(), 'watched_at', event_days),
+        delete_before(WatchRollup.objects.filter(period=WatchRollup.HOUR), 'period_start', hourly_days),
+        delete_before(WatchRollup.objects.filter(period=WatchRollup.DAY), 'period_start', daily_days),
+    )
@@ -5,9 +5,43 @@ import logging
 from django.conf import settings
 from django.utils import timezone
 from .models import UserToken, Video, Playlist
+from .sync_events import sync_event_bus
+from .counters import refresh_playlist_counts, refresh_library_stats, bump_library_version, sync_channels
+from .recent import push_recent, HISTORY, RECENT
+from .sync_state import record_sync_started, record_sync_finished
+from .sync_archive import archiving_enabled, archive_response
+from .library_gc import remove_missing_playlists, unlink_playlist_videos
+from .shared_cache import is_shareable, response_key, shared_get, cache_video_snippets, cached_video_snippets
+from .sync_checkpoint import (
+    resume_checkpoint, save_checkpoint, record_page, clear_checkpoint, record_dead_letter,
+    pending_dead_letters, dead_letter_failed, RETRY_BATCH_SIZE
+)
 
 logger = logging.getLogger(__name__)
 
+
+def video_defaults_from_snippet(snippet):
+    """
+    Map a YouTube API snippet onto the Video fields shared by every sync source
+
+    Raises ValueError for a snippet without publishedAt, which the API
+    returns for some deleted and private videos.
+    """
+    if not snippet.get('publishedAt'):
+        raise ValueError("Snippet has no publishedAt")
+    return {
+        'title': snippet.get('title', 'Untitled Video'),
+        'description': snippet.get('description', ''),
+        'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
+        'published_at': datetime.datetime.fromisoformat(
+            snippet.get('publishedAt').replace('Z', '+00:00')
+        ),
+        'youtube_description': snippet.get('description', ''),
+        'channel_title': snippet.get('channelTitle', 'Unknown Channel'),
+        'channel_id': snippet.get('channelId', ''),
+    }
+
+
 class YouTubeAPI:
     """
     Utility class for interacting with the YouTube API
@@ -15,6 +49,9 @@ class YouTubeAPI:
     # YouTube API endpoints
     TOKEN_URL = 'https://oauth2.googleapis.com/token'
     WATCH_LATER_PLAYLIST_ID = 'WL'  # YouTube's Watch Later playlist ID
+
+    # Shared limiter every Data API call waits on; set by the sync scheduler
+    rate_limiter = None
     
     def __init__(self, user=None, user_token=None):
         """
@@ -31,6 +68,12 @@ class YouTubeAPI:
         self.client_id = settings.GOOGLE_CLIENT_ID
         self.client_secret = settings.GOOGLE_CLIENT_SECRET
         self.redirect_uri = settings.GOOGLE_REDIRECT_URI
+        # {channel_id: channel_title} seen by this sync, saved to Channel in one upsert
+        self.channel_titles = {}
+        # Videos new to the library this sync, in the order the API listed them
+        self.added_video_ids = []
+        # Items of the current source sent to the dead-letter table
+        self.failed_items = 0
     
     @staticmethod
     def get_auth_url():
@@ -128,6 +171,36 @@ class YouTubeAPI:
             return self.refresh_access_token()
             
         return True
+
+    def _get(self, url, params=None, headers=None, public=False):
+        """
+        GET a YouTube API endpoint, waiting on the shared rate limiter if one is set
+
+        Requests for public resources (public=True, see shared_cache.py) are
+        answered from the cache shared by every user when possible, and
+        concurrent identical ones make a single call. Successful pages are
+        archived for replay_sync when SYNC_ARCHIVE_DIR is set.
+        """
+        def fetch():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            return requests.get(url, params=params, headers=headers)
+
+        endpoint = url.rstrip('/').rsplit('/', 1)[-1]
+        if is_shareable(endpoint, params, public):
+            response = shared_get(response_key(endpoint, params), fetch)
+        else:
+            response = fetch()
+        if response.status_code == 200 and archiving_enabled():
+            archive_response(self.user_token.user_id, url, params, response.content)
+        return response
+
+    def _publish(self, event, **data):
+        """
+        Publish a sync progress event for this user
+        """
+        if self.user_token:
+            sync_event_bus.publish(self.user_token.user_id, event, **data)
     
     def get_watch_later_videos(self):
         """
@@ -154,7 +227,7 @@ class YouTubeAPI:
         
         try:
             # First, check if we can actually access the Watch Later playlist
-            response = requests.get(base_url, params=params, headers=headers)
+            response = self._get(base_url, params=params, headers=headers)
             
             # Log the full response for debugging
             logger.info(f"Watch Later API response status: {response.status_code}")
@@ -167,12 +240,14 @@ class YouTubeAPI:
             
             if response.status_code != 200:
                 logger.error(f"Failed to fetch Watch Later videos: {response.text}")
+                self._publish('error', source='WL', message=f"Failed to fetch Watch Later videos ({response.status_code})")
                 return None
             
             data = response.json()
             items = data.get('items', [])
             logger.info(f"First page has {len(items)} items")
             all_items.extend(items)
+            self._publish('page_fetched', source='WL', page=1, items=len(items))
             
             next_page_token = data.get('nextPageToken')
             page_count = 1
@@ -182,16 +257,19 @@ class YouTubeAPI:
                 logger.info(f"Fetching page {page_count} of Watch Later videos")
                 params['pageToken'] = next_page_token
                 
-                response = requests.get(base_url, params=params, headers=headers)
+                response = self._get(base_url, params=params, headers=headers)
                 
                 if response.status_code != 200:
                     logger.error(f"Failed to fetch page {page_count} of Watch Later videos: {response.text}")
-                    break
+                    self._publish('error', source='WL', message=f"Failed to fetch page {page_count} ({response.status_code})")
+                    # A partial list would unsave every video on the missing pages
+                    return None
                 
                 data = response.json()
                 items = data.get('items', [])
                 logger.info(f"Page {page_count} has {len(items)} items")
                 all_items.extend(items)
+                self._publish('page_fetched', source='WL', page=page_count, items=len(items))
                 
                 next_page_token = data.get('nextPageToken')
             
@@ -200,6 +278,7 @@ class YouTubeAPI:
             
         except Exception as e:
             logger.exception(f"Exception while fetching Watch Later videos: {str(e)}")
+            self._publish('error', source='WL', message=str(e))
             return None
     
     def sync_videos_for_user(self):
@@ -211,20 +290,143 @@ class YouTubeAPI:
             return False
             
         logger.info(f"Starting video sync for user: {self.user_token.user.username}")
+        self._publish('sync_started', sync_type='all')
         
-        # First sync user playlists
-        self.sync_user_playlists()
-        
-        # Sync liked videos
-        self._sync_liked_videos()
+        # First sync user playlists, then liked and watch later videos
+        for source in ('playlists', 'liked', 'saved'):
+            self.sync_source(source)
         
-        # Sync watch later videos
-        self._sync_watch_later_videos()
+        # Watch history is best effort: the API usually refuses it
+        self._sync_watch_history()
         
         return True
 
-    def _sync_playlist_videos(self, playlist_id, playlist_name):
-        """Sync videos from a specific playlist"""
+    def _video_defaults(self, snippet):
+        """video_defaults_from_snippet, remembering the video's channel"""
+        defaults = video_defaults_from_snippet(snippet)
+        self.channel_titles[defaults['channel_id']] = defaults['channel_title']
+        return defaults
+
+    def sync_source(self, source):
+        """
+        Sync one source ('playlists', 'liked' or 'saved') and record the outcome
+
+        The recorded SyncState is what the background scheduler uses to decide
+        when the source is next due.
+        """
+        if not self.user_token:
+            logger.error("No user token available")
+            return False
+
+        sync_methods = {
+            'playlists': self.sync_user_playlists,
+            'liked': self._sync_liked_videos,
+            'saved': self._sync_watch_later_videos,
+        }
+        user_id = self.user_token.user_id
+        record_sync_started(user_id, source)
+        self.failed_items = 0
+        success = False
+        try:
+            success = self.ensure_valid_token() and bool(sync_methods[source]())
+            if success:
+                # A failed run keeps its checkpoint for the next one to resume from
+                clear_checkpoint(user_id, source)
+                sync_channels(user_id, self.channel_titles)
+                # The API lists newest first, so the first new video ends up at the front
+                push_recent(user_id, RECENT, reversed(self.added_video_ids))
+                self.added_video_ids = []
+                self.retry_dead_letters(source)
+        finally:
+            record_sync_finished(user_id, source, success)
+        if self.failed_items:
+            self._publish('items_failed', source=source, items=self.failed_items)
+        return success
+
+    def _dead_letter(self, source, video_id, snippet, extra, error):
+        """Keep an item that couldn't be saved for retry_dead_letters"""
+        record_dead_letter(self.user_token.user_id, source, video_id, snippet, extra, error)
+        self.failed_items += 1
+
+    def retry_dead_letters(self, source=None):
+        """
+        Try to save the user's dead-lettered items again, returning (saved, failed)
+
+        Items are refetched from the videos endpoint, RETRY_BATCH_SIZE ids per
+        request, unless their snippets are in the shared cache, falling back
+        to the stored snippet for any the API no longer returns. Letters that save are deleted; the rest count another attempt.
+        """
+        letters = pending_dead_letters(self.user_token.user_id)
+        if source is not None:
+            letters = letters.filter(source=source)
+        letters = list(letters)
+        if not letters or not self.ensure_valid_token():
+            return 0, len(letters)
+
+        headers = {
+            'Authorization': f'Bearer {self.user_token.access_token}'
+        }
+        video_ids = list(dict.fromkeys(letter.video_id for letter in letters))
+        # Snippets another sync cached are as good as fresh ones, unless they're the broken kind
+        snippets = {
+            video_id: snippet for video_id, snippet in cached_video_snippets(video_ids).items()
+            if snippet.get('publishedAt')
+        }
+        video_ids = [video_id for video_id in video_ids if video_id not in snippets]
+        try:
+            for start in range(0, len(video_ids), RETRY_BATCH_SIZE):
+                response = self._get(
+                    "https://www.googleapis.com/youtube/v3/videos",
+                    params={'part': 'snippet', 'id': ','.join(video_ids[start:start + RETRY_BATCH_SIZE])},
+                    headers=headers
+                )
+                if response.status_code != 200:
+                    logger.error(f"Failed to refetch dead-lettered videos: {response.text}")
+                    break
+                items = response.json().get('items', [])
+                cache_video_snippets(items)
+                for item in items:
+                    snippets[item.get('id')] = item.get('snippet', {})
+        except Exception as e:
+            logger.exception(f"Exception while refetching dead-lettered videos: {str(e)}")
+
+        saved = failed = 0
+        added = []
+        for letter in letters:
+            snippet = snippets.get(letter.video_id) or letter.payload
+            try:
+                video, created = Video.objects.update_or_create(
+                    user=self.user_token.user,
+                    video_id=letter.video_id,
+                    defaults={**self._video_defaults(snippet), **letter.extra}
+                )
+            except Exception as e:
+                dead_letter_failed(letter, e)
+                failed += 1
+                continue
+            letter.delete()
+            saved += 1
+            if created:
+                added.append(video.id)
+
+        if saved:
+            user_id = self.user_token.user_id
+            sync_channels(user_id, self.channel_titles)
+            refresh_library_stats(user_id)
+            refresh_playlist_counts(user_id)
+            push_recent(user_id, RECENT, added)
+            bump_library_version(user_id)
+        logger.info(f"Retried {len(letters)} dead-lettered items: {saved} saved, {failed} still failing")
+        return saved, failed
+
+    def _sync_playlist_videos(self, playlist_id, playlist_name, checkpoint=None, public=False):
+        """
+        Sync videos from a specific playlist
+
+        With a checkpoint, the next page token is saved after every page, and
+        a checkpoint left on this playlist by a failed run is resumed from.
+        Pages of a public playlist come from the cache shared between users.
+        """
         logger.info(f"Syncing videos from playlist: {playlist_name} (ID: {playlist_id})")
         
         base_url = "https://www.googleapis.com/youtube/v3/playlistItems"
@@ -236,59 +438,92 @@ class YouTubeAPI:
         headers = {
             'Authorization': f'Bearer {self.user_token.access_token}'
         }
+        if checkpoint is not None and checkpoint.playlist_id == playlist_id and checkpoint.page_token:
+            logger.info(f"Resuming playlist {playlist_id} from a saved page token")
+            params['pageToken'] = checkpoint.page_token
+        # Only a run from the first page sees the whole playlist
+        listed = set() if 'pageToken' not in params else None
         
         try:
-            response = requests.get(base_url, params=params, headers=headers)
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch playlist videos: {response.text}")
-                return False
-            
-            data = response.json()
-            items = data.get('items', [])
-            
-            for item in items:
-                try:
+            written = 0
+            page_count = 0
+            while True:
+                page_count += 1
+                response = self._get(base_url, params=params, headers=headers, public=public)
+                
+                if response.status_code != 200:
+                    logger.error(f"Failed to fetch playlist videos: {response.text}")
+                    self._publish('error', source=playlist_id, message=f"Failed to fetch playlist videos ({response.status_code})")
+                    return False
+                
+                data = response.json()
+                items = data.get('items', [])
+                self._publish('page_fetched', source=playlist_id, page=page_count, items=len(items))
+                page_written = 0
+                failed_before = self.failed_items
+                
+                for item in items:
                     snippet = item.get('snippet', {})
                     video_id = snippet.get('resourceId', {}).get('videoId')
                     
                     if not video_id:
                         continue
+                    if listed is not None:
+                        listed.add(video_id)
+                    
+                    try:
+                        # Create or update video
+                        video, created = Video.objects.update_or_create(
+                            user=self.user_token.user,
+                            video_id=video_id,
+                            defaults={
+                                **self._video_defaults(snippet),
+                                'playlist_id': playlist_id,
+                                'playlist_name': playlist_name
+                            }
+                        )
                         
-                    # Create or update video
-                    video, created = Video.objects.update_or_create(
-                        user=self.user_token.user,
-                        video_id=video_id,
-                        defaults={
-                            'title': snippet.get('title', 'Untitled Video'),
-                            'description': snippet.get('description', ''),
-                            'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                            'published_at': datetime.datetime.fromisoformat(
-                                snippet.get('publishedAt').replace('Z', '+00:00')
-                            ),
-                            'youtube_description': snippet.get('description', ''),
-                            'channel_title': snippet.get('channelTitle', 'Unknown Channel'),
-                            'channel_id': snippet.get('channelId', ''),
+                        page_written += 1
+                        if created:
+                            self.added_video_ids.append(video.id)
+                            logger.info(f"Added playlist video: {snippet.get('title')}")
+                        
+                    except Exception as e:
+                        logger.error(f"Error processing playlist video {video_id}: {str(e)}")
+                        self._publish('error', source=playlist_id, message=f"Error processing playlist video: {str(e)}")
+                        self._dead_letter('playlists', video_id, snippet, {
                             'playlist_id': playlist_id,
                             'playlist_name': playlist_name
-                        }
-                    )
-                    
-                    if created:
-                        logger.info(f"Added playlist video: {snippet.get('title')}")
-                    
-                except Exception as e:
-                    logger.error(f"Error processing playlist video: {str(e)}")
-                    continue
+                        }, e)
                 
+                written += page_written
+                next_page_token = data.get('nextPageToken')
+                if checkpoint is not None:
+                    record_page(checkpoint, next_page_token, page_written, self.failed_items - failed_before, playlist_id)
+                if not next_page_token:
+                    break
+                params['pageToken'] = next_page_token
+            
+            if listed is not None:
+                # Videos removed from the playlist on YouTube
+                unlink_playlist_videos(self.user_token.user_id, playlist_id, listed)
+            self._publish('items_written', source=playlist_id, items=written)
             return True
             
         except Exception as e:
             logger.exception(f"Exception while fetching playlist videos: {str(e)}")
+            self._publish('error', source=playlist_id, message=str(e))
             return False
 
     def _sync_liked_videos(self):
-        """Sync liked videos for a user"""
+        """
+        Sync liked videos for a user
+
+        Each page is saved as it arrives and checkpointed, so a failed run
+        resumes from the page it stopped at. Videos are only unmarked as liked
+        by a run that saw every page, since a resumed one can't know about the
+        pages before its checkpoint.
+        """
         logger.info("Syncing liked videos")
         
         liked_videos_url = "https://www.googleapis.com/youtube/v3/videos"
@@ -300,6 +535,11 @@ class YouTubeAPI:
         headers = {
             'Authorization': f'Bearer {self.user_token.access_token}'
         }
+        checkpoint = resume_checkpoint(self.user_token.user_id, 'liked')
+        if checkpoint.page_token:
+            params['pageToken'] = checkpoint.page_token
+        # Track which videos are still liked
+        currently_liked_videos = set()
         
         try:
             # Get all currently liked videos from our database
@@ -310,49 +550,30 @@ class YouTubeAPI:
             existing_liked_videos = set(existing_liked_videos)
             logger.info(f"Found {len(existing_liked_videos)} existing liked videos in database")
             
-            # Track which videos are still liked
-            currently_liked_videos = set()
-            
-            # Fetch all pages of liked videos
-            all_items = []
-            next_page_token = None
-            
-            # First page
-            response = requests.get(liked_videos_url, params=params, headers=headers)
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch liked videos: {response.text}")
-                return False
-            
-            data = response.json()
-            items = data.get('items', [])
-            all_items.extend(items)
-            next_page_token = data.get('nextPageToken')
-            
-            # Fetch additional pages if available
-            page_count = 1
-            while next_page_token:
+            page_count = 0
+            while True:
                 page_count += 1
                 logger.info(f"Fetching page {page_count} of liked videos")
-                params['pageToken'] = next_page_token
-                
-                response = requests.get(liked_videos_url, params=params, headers=headers)
+                response = self._get(liked_videos_url, params=params, headers=headers)
                 
                 if response.status_code != 200:
                     logger.error(f"Failed to fetch page {page_count} of liked videos: {response.text}")
-                    break
+                    self._publish('error', source='LL', message=f"Failed to fetch page {page_count} ({response.status_code})")
+                    if currently_liked_videos:
+                        # Earlier pages were saved; the next run resumes after them
+                        refresh_library_stats(self.user_token.user_id)
+                        bump_library_version(self.user_token.user_id)
+                    return False
                 
                 data = response.json()
                 items = data.get('items', [])
-                all_items.extend(items)
+                self._publish('page_fetched', source='LL', page=page_count, items=len(items))
+                # Which videos a user likes is private, but the videos' snippets aren't
+                cache_video_snippets(items)
+                page_written = 0
+                failed_before = self.failed_items
                 
-                next_page_token = data.get('nextPageToken')
-            
-            logger.info(f"Total liked videos fetched from YouTube: {len(all_items)}")
-            
-            # Process all liked videos
-            for video in all_items:
-                try:
+                for video in items:
                     video_id = video.get('id')
                     snippet = video.get('snippet', {})
                     
@@ -361,41 +582,48 @@ class YouTubeAPI:
                     
                     # Add to the set of currently liked videos
                     currently_liked_videos.add(video_id)
-                        
-                    # Create or update video
-                    video_obj, created = Video.objects.update_or_create(
-                        user=self.user_token.user,
-                        video_id=video_id,
-                        defaults={
-                            'title': snippet.get('title', 'Untitled Video'),
-                            'description': snippet.get('description', ''),
-                            'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                            'published_at': datetime.datetime.fromisoformat(
-                                snippet.get('publishedAt').replace('Z', '+00:00')
-                            ),
-                            'youtube_description': snippet.get('description', ''),
-                            'channel_title': snippet.get('channelTitle', 'Unknown Channel'),
-                            'channel_id': snippet.get('channelId', ''),
-                            'is_liked': True
-                        }
-                    )
-                    
-                    if created:
-                        logger.info(f"Added new liked video: {snippet.get('title')}")
-                    else:
-                        # Make sure it's marked as liked
-                        if not video_obj.is_liked:
-                            video_obj.is_liked = True
-                            video_obj.save(update_fields=['is_liked'])
-                            logger.info(f"Marked existing video as liked: {snippet.get('title')}")
                     
-                except Exception as e:
-                    logger.error(f"Error processing liked video {video_id if 'video_id' in locals() else 'unknown'}: {str(e)}")
-                    continue
+                    try:
+                        # Create or update video
+                        video_obj, created = Video.objects.update_or_create(
+                            user=self.user_token.user,
+                            video_id=video_id,
+                            defaults={
+                                **self._video_defaults(snippet),
+                                'is_liked': True
+                            }
+                        )
+                        page_written += 1
+                        
+                        if created:
+                            self.added_video_ids.append(video_obj.id)
+                            logger.info(f"Added new liked video: {snippet.get('title')}")
+                        else:
+                            # Make sure it's marked as liked
+                            if not video_obj.is_liked:
+                                video_obj.is_liked = True
+                                video_obj.save(update_fields=['is_liked'])
+                                logger.info(f"Marked existing video as liked: {snippet.get('title')}")
+                        
+                    except Exception as e:
+                        logger.error(f"Error processing liked video {video_id}: {str(e)}")
+                        self._publish('error', source='LL', message=f"Error processing liked video: {str(e)}")
+                        self._dead_letter('liked', video_id, snippet, {'is_liked': True}, e)
+                
+                next_page_token = data.get('nextPageToken')
+                record_page(checkpoint, next_page_token, page_written, self.failed_items - failed_before)
+                if not next_page_token:
+                    break
+                params['pageToken'] = next_page_token
+            
+            logger.info(f"Total liked videos fetched from YouTube: {len(currently_liked_videos)}")
+            self._publish('items_written', source='LL', items=len(currently_liked_videos))
             
             # Find videos that were unliked
             unliked_videos = existing_liked_videos - currently_liked_videos
-            if unliked_videos:
+            if unliked_videos and checkpoint.resumed:
+                logger.info("Resumed from a checkpoint; leaving unliked videos for the next full run")
+            elif unliked_videos:
                 logger.info(f"Found {len(unliked_videos)} videos that are no longer liked")
                 # Update videos that are no longer liked
                 Video.objects.filter(
@@ -403,10 +631,16 @@ class YouTubeAPI:
                     video_id__in=unliked_videos
                 ).update(is_liked=False)
             
+            refresh_library_stats(self.user_token.user_id)
+            bump_library_version(self.user_token.user_id)
             return True
             
         except Exception as e:
             logger.exception(f"Exception while fetching liked videos: {str(e)}")
+            self._publish('error', source='LL', message=str(e))
+            if currently_liked_videos:
+                refresh_library_stats(self.user_token.user_id)
+                bump_library_version(self.user_token.user_id)
             return False
 
     def _sync_watch_history(self):
@@ -426,7 +660,7 @@ class YouTubeAPI:
         }
         
         try:
-            response = requests.get(history_url, params=params, headers=headers)
+            response = self._get(history_url, params=params, headers=headers)
             
             # Most likely this will fail with a 403 or 404
             if response.status_code != 200:
@@ -436,32 +670,26 @@ class YouTubeAPI:
             
             data = response.json()
             items = data.get('items', [])
+            watched = []
             
             for item in items:
+                snippet = item.get('snippet', {})
+                video_id = snippet.get('resourceId', {}).get('videoId')
+                
+                if not video_id:
+                    continue
+                
                 try:
-                    snippet = item.get('snippet', {})
-                    video_id = snippet.get('resourceId', {}).get('videoId')
-                    
-                    if not video_id:
-                        continue
-                        
                     # Create or update video
                     video_obj, created = Video.objects.update_or_create(
                         user=self.user_token.user,
                         video_id=video_id,
                         defaults={
-                            'title': snippet.get('title', 'Untitled Video'),
-                            'description': snippet.get('description', ''),
-                            'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                            'published_at': datetime.datetime.fromisoformat(
-                                snippet.get('publishedAt').replace('Z', '+00:00')
-                            ),
-                            'youtube_description': snippet.get('description', ''),
-                            'channel_title': snippet.get('channelTitle', 'Unknown Channel'),
-                            'channel_id': snippet.get('channelId', ''),
+                            **self._video_defaults(snippet),
                             'is_history': True
                         }
                     )
+                    watched.append(video_obj.id)
                     
                     if created:
                         logger.info(f"Added history video: {snippet.get('title')}")
@@ -473,9 +701,14 @@ class YouTubeAPI:
                             logger.info(f"Marked existing video as history: {snippet.get('title')}")
                     
                 except Exception as e:
-                    logger.error(f"Error processing history video: {str(e)}")
-                    continue
-                
+                    logger.error(f"Error processing history video {video_id}: {str(e)}")
+                    self._dead_letter('history', video_id, snippet, {'is_history': True}, e)
+            
+            # History is listed most recently watched first
+            push_recent(self.user_token.user_id, HISTORY, reversed(watched))
+            if watched:
+                sync_channels(self.user_token.user_id, self.channel_titles)
+                bump_library_version(self.user_token.user_id)
             return True
             
         except Exception as e:
@@ -483,16 +716,24 @@ class YouTubeAPI:
             return False
 
     def sync_user_playlists(self):
-        """Fetch and sync the user's playlists"""
+        """
+        Fetch and sync the user's playlists
+
+        Playlists whose videos are fully synced are recorded on the
+        checkpoint, so a run that fails part way is resumed by the next one
+        without resyncing them. Only a run that syncs every playlist succeeds.
+        """
         if not self.ensure_valid_token():
             logger.error("Failed to ensure valid token")
             return False
 
+        checkpoint = resume_checkpoint(self.user_token.user_id, 'playlists')
+        completed = set(checkpoint.completed_playlists)
         try:
             # Get user's playlists
             playlists_url = "https://www.googleapis.com/youtube/v3/playlists"
             params = {
-                'part': 'snippet,contentDetails',
+                'part': 'snippet,contentDetails,status',
                 'mine': 'true',
                 'maxResults': 50  # Maximum allowed by the API
             }
@@ -504,32 +745,39 @@ class YouTubeAPI:
             next_page_token = None
             
             # First page
-            response = requests.get(playlists_url, params=params, headers=headers)
+            response = self._get(playlists_url, params=params, headers=headers)
             
             if response.status_code != 200:
                 logger.error(f"Failed to fetch playlists: {response.text}")
+                self._publish('error', source='playlists', message=f"Failed to fetch playlists ({response.status_code})")
                 return False
                 
             data = response.json()
             playlists = data.get('items', [])
             all_playlists.extend(playlists)
             next_page_token = data.get('nextPageToken')
+            self._publish('page_fetched', source='playlists', page=1, items=len(playlists))
             
             # Fetch additional pages if available
             while next_page_token:
                 params['pageToken'] = next_page_token
-                response = requests.get(playlists_url, params=params, headers=headers)
+                response = self._get(playlists_url, params=params, headers=headers)
                 
                 if response.status_code != 200:
                     logger.error(f"Failed to fetch playlist page: {response.text}")
-                    break
+                    self._publish('error', source='playlists', message=f"Failed to fetch playlist page ({response.status_code})")
+                    return False
                     
                 data = response.json()
                 playlists = data.get('items', [])
                 all_playlists.extend(playlists)
                 next_page_token = data.get('nextPageToken')
+                self._publish('page_fetched', source='playlists', items=len(playlists))
+            
+            self._publish('playlists_discovered', count=len(all_playlists))
             
             # Import playlists to database
+            incomplete = 0
             for playlist_data in all_playlists:
                 playlist_id = playlist_data.get('id')
                 snippet = playlist_data.get('snippet', {})
@@ -559,14 +807,31 @@ class YouTubeAPI:
                 else:
                     logger.info(f"Updated playlist: {playlist.title}")
                     
+                if playlist_id in completed:
+                    logger.info(f"Skipping playlist synced before the checkpoint: {playlist.title}")
+                    continue
+                
                 # Sync videos from this playlist
-                self._sync_playlist_videos(playlist_id, snippet.get('title'))
-            
+                public = playlist_data.get('status', {}).get('privacyStatus') == 'public'
+                if self._sync_playlist_videos(playlist_id, snippet.get('title'), checkpoint, public):
+                    completed.add(playlist_id)
+                    save_checkpoint(checkpoint, completed_playlists=sorted(completed), playlist_id='', page_token='')
+                else:
+                    incomplete += 1
+            
+            # The listing is complete, so anything stored but not listed was deleted on YouTube
+            remove_missing_playlists(self.user_token.user_id, [playlist.get('id') for playlist in all_playlists])
+            refresh_playlist_counts(self.user_token.user_id)
+            bump_library_version(self.user_token.user_id)
+            if incomplete:
+                logger.error(f"{incomplete} of {len(all_playlists)} playlists failed to sync; the next run retries them")
+                return False
             logger.info(f"Successfully synced {len(all_playlists)} playlists")
             return True
             
         except Exception as e:
             logger.exception(f"Error syncing playlists: {str(e)}")
+            self._publish('error', source='playlists', message=str(e))
             return False
 
     def _sync_watch_later_videos(self):
@@ -599,31 +864,23 @@ class YouTubeAPI:
                 
                 # Process all Watch Later videos
                 for item in videos:
+                    snippet = item.get('snippet', {})
+                    video_id = snippet.get('resourceId', {}).get('videoId')
+                    
+                    if not video_id:
+                        logger.warning(f"No video ID in snippet: {snippet}")
+                        continue
+                    
+                    # Add to current saved videos set
+                    current_saved_videos.add(video_id)
+                    
                     try:
-                        snippet = item.get('snippet', {})
-                        video_id = snippet.get('resourceId', {}).get('videoId')
-                        
-                        if not video_id:
-                            logger.warning(f"No video ID in snippet: {snippet}")
-                            continue
-                            
-                        # Add to current saved videos set
-                        current_saved_videos.add(video_id)
-                        
                         # Create or update video
                         video, created = Video.objects.update_or_create(
                             user=self.user_token.user,
                             video_id=video_id,
                             defaults={
-                                'title': snippet.get('title', 'Untitled Video'),
-                                'description': snippet.get('description', ''),
-                                'thumbnail_url': snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                                'published_at': datetime.datetime.fromisoformat(
-                                    snippet.get('publishedAt').replace('Z', '+00:00')
-                                ),
-                                'youtube_description': snippet.get('description', ''),
-                                'channel_title': snippet.get('channelTitle', 'Unknown Channel'),
-                                'channel_id': snippet.get('channelId', ''),
+                                **self._video_defaults(snippet),
                                 'is_saved': True,
                                 'playlist_id': 'WL',
                                 'playlist_name': 'Watch Later'
@@ -631,13 +888,21 @@ class YouTubeAPI:
                         )
                         
                         if created:
+                            self.added_video_ids.append(video.id)
                             logger.info(f"Added new Watch Later video: {snippet.get('title')}")
                         else:
                             if not video.is_saved:
                                 logger.info(f"Marked existing video as saved: {snippet.get('title')}")
                     except Exception as e:
-                        logger.error(f"Error processing Watch Later video: {str(e)}")
-                        continue
+                        logger.error(f"Error processing Watch Later video {video_id}: {str(e)}")
+                        self._publish('error', source='WL', message=f"Error processing Watch Later video: {str(e)}")
+                        self._dead_letter('saved', video_id, snippet, {
+                            'is_saved': True,
+                            'playlist_id': 'WL',
+                            'playlist_name': 'Watch Later'
+                        }, e)
+                
+                self._publish('items_written', source='WL', items=len(current_saved_videos))
             
             # Find videos that have been removed from Watch Later
             removed_videos = existing_saved_videos - current_saved_videos
@@ -649,9 +914,12 @@ class YouTubeAPI:
                     video_id__in=removed_videos
                 ).update(is_saved=False)
             
+            refresh_library_stats(self.user_token.user_id)
+            bump_library_version(self.user_token.user_id)
             # Success even if playlist was empty (API limitation)
             return True
             
         except Exception as e:
             logger.exception(f"Exception while syncing Watch Later videos: {str(e)}")
+            self._publish('error', source='WL', message=str(e))
             return False 
\ No newline at end of file
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables from .env file
 load_dotenv()
@@ -72,6 +73,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'videos.sidebar.sidebar',
             ],
         },
     },
@@ -82,13 +84,67 @@ WSGI_APPLICATION = 'youtuboxd.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# DB_ENGINE=sqlite (default, for development) or DB_ENGINE=postgres for production
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite').lower()
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'youtuboxd'),
+            'USER': os.getenv('DB_USER', ''),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            # Keep connections open between requests instead of reconnecting each time
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            # QuerySet.iterator() streams through server-side cursors; these
+            # must be disabled behind a transaction-pooling pgbouncer
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False').lower() == 'true',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+                'options': f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))}",
+            },
+        }
+    }
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 0))
+    if DB_POOL_MAX_SIZE:
+        # Django's connection pool needs psycopg 3; requirements.txt only installs psycopg2
+        try:
+            import psycopg  # noqa: F401
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured(
+                'DB_POOL_MAX_SIZE needs psycopg 3 with its pool: pip install "psycopg[binary,pool]"'
+            ) from None
+        # The pool replaces persistent connections
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': DB_POOL_MAX_SIZE,
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so concurrent
+                # writers queue on busy_timeout instead of failing with
+                # "database is locked" when a read lock can't be upgraded
+                'transaction_mode': 'IMMEDIATE',
+                # WAL lets readers run alongside a writer
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA busy_timeout={int(os.getenv('DB_SQLITE_BUSY_TIMEOUT_MS', 20000))};"
+                ),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -131,6 +187,72 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# With DEBUG off, collectstatic fingerprints and pre-compresses the bundles and
+# WhiteNoise serves them with a far-future immutable Cache-Control. The manifest
+# storage can't resolve {% static %} until collectstatic has run, so development
+# serves the source files as they are
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Public YouTube API responses are shared between users (see videos/shared_cache.py); the
+# cache lives on disk so web workers and the sync scheduler all share it
+YOUTUBE_RESPONSE_CACHE_DIR = os.getenv('YOUTUBE_RESPONSE_CACHE_DIR', os.path.join(BASE_DIR, 'youtube_cache'))
+YOUTUBE_RESPONSE_CACHE_SECONDS = int(os.getenv('YOUTUBE_RESPONSE_CACHE_SECONDS', 15 * 60))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'youtube': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': YOUTUBE_RESPONSE_CACHE_DIR,
+        'TIMEOUT': YOUTUBE_RESPONSE_CACHE_SECONDS,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Local thumbnail cache (see videos/thumbnails.py)
+THUMBNAIL_CACHE_DIR = os.getenv('THUMBNAIL_CACHE_DIR', os.path.join(BASE_DIR, 'thumbnail_cache'))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv('THUMBNAIL_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+# Most thumbnails the sync scheduler caches for a user after each sync
+THUMBNAIL_CACHE_BATCH_SIZE = int(os.getenv('THUMBNAIL_CACHE_BATCH_SIZE', 200))
+
+# Per-user similar video and tag suggestion indexes (see videos/similarity.py)
+SIMILARITY_INDEX_DIR = os.getenv('SIMILARITY_INDEX_DIR', os.path.join(BASE_DIR, 'similarity_index'))
+
+# Watch events (see videos/watch_events.py): buffered per process, then written in batches
+WATCH_EVENT_BUFFER_SIZE = int(os.getenv('WATCH_EVENT_BUFFER_SIZE', 500))
+WATCH_EVENT_FLUSH_SECONDS = int(os.getenv('WATCH_EVENT_FLUSH_SECONDS', 10))
+# Retention applied by python manage.py compact_watch_events
+WATCH_EVENT_RETENTION_DAYS = int(os.getenv('WATCH_EVENT_RETENTION_DAYS', 90))
+WATCH_HOURLY_ROLLUP_RETENTION_DAYS = int(os.getenv('WATCH_HOURLY_ROLLUP_RETENTION_DAYS', 14))
+WATCH_DAILY_ROLLUP_RETENTION_DAYS = int(os.getenv('WATCH_DAILY_ROLLUP_RETENTION_DAYS', 730))
+
+# Deployed release identifier; part of page ETags so a deploy invalidates cached pages
+RELEASE_VERSION = os.getenv('RELEASE_VERSION', '')
+
+# Background resync scheduler (python manage.py run_sync_scheduler)
+SYNC_SCHEDULER_MAX_CONCURRENT_SYNCS = int(os.getenv('SYNC_SCHEDULER_MAX_CONCURRENT_SYNCS', 4))
+SYNC_SCHEDULER_MAX_API_CALLS_PER_MINUTE = int(os.getenv('SYNC_SCHEDULER_MAX_API_CALLS_PER_MINUTE', 120))
+SYNC_SCHEDULER_POLL_SECONDS = int(os.getenv('SYNC_SCHEDULER_POLL_SECONDS', 30))
+
+# Raw API pages archived by syncs for python manage.py replay_sync; archiving is off when unset
+SYNC_ARCHIVE_DIR = os.getenv('SYNC_ARCHIVE_DIR', '')
+# Retention applied by python manage.py prune_sync_archive
+SYNC_ARCHIVE_RETENTION_DAYS = int(os.getenv('SYNC_ARCHIVE_RETENTION_DAYS', 30))
+
+# A running sync renews its per-user lock; a crashed one releases it after this long
+SYNC_LOCK_LEASE_SECONDS = int(os.getenv('SYNC_LOCK_LEASE_SECONDS', 120))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 